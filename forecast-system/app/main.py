@@ -1,23 +1,55 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Literal, List
 import pandas as pd
+from fxshared.responses import FastJSONResponse, negotiated_response
 from app.services.data_fetcher import ForecastDataFetcher
 from app.services.forecast_predictor import ForecastPredictor
-from app.services.visualizer import ForecastVisualizer
-from config import TWELVE_DATA_API_KEY, FOREX_PAIRS, INTERVALS
+from app.services.visualizer import ForecastVisualizer, RenderCache, RENDER_FORMATS
+from app.services.metrics import REQUEST_LATENCY, series_labels, timed, render_metrics
+from config import (
+    TWELVE_DATA_API_KEY, FOREX_PAIRS, INTERVALS, LOG_LEVEL, DEFAULT_FORECAST_MODE, DEFAULT_RENDER, FORECAST_WORKERS,
+    BATCH_MAX_ITEMS
+)
 
-app = FastAPI()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+app = FastAPI(default_response_class=FastJSONResponse)
 data_fetcher = ForecastDataFetcher(TWELVE_DATA_API_KEY)
 predictor = ForecastPredictor()
+render_cache = RenderCache()
+# Bounded pool for torch inference and chart rendering; the event loop only awaits
+executor = ThreadPoolExecutor(max_workers=FORECAST_WORKERS, thread_name_prefix="forecast")
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+
+@app.on_event("shutdown")
+async def shutdown():
+    await data_fetcher.aclose()
+    executor.shutdown(wait=False)
 
-class ForecastRequest(BaseModel):
+class ForecastItem(BaseModel):
     pair: str
     interval: str
-    window_size: Optional[int] = 50
-    forecast_size: Optional[int] = 10
+    window_size: int = 50
+    forecast_size: int = 10
+    mode: Literal["auto", "direct", "recursive"] = DEFAULT_FORECAST_MODE
+    
+    @field_validator("window_size", "forecast_size", mode="before")
+    @classmethod
+    def default_when_null(cls, value, info):
+        """An explicit null means the default, so handlers can size fetches from these directly"""
+        return cls.model_fields[info.field_name].default if value is None else value
+
+class ForecastRequest(ForecastItem):
+    render: Literal[RENDER_FORMATS] = DEFAULT_RENDER
 
 @app.post("/api/forecast")
 async def get_forecast(request: ForecastRequest):
@@ -28,35 +60,112 @@ async def get_forecast(request: ForecastRequest):
         raise HTTPException(status_code=400, detail="Unsupported interval")
     
     try:
-        # Fetch recent data
-        data = data_fetcher.fetch_recent_for_forecast(
-            request.pair, 
-            request.interval, 
-            request.window_size + 50
-        )
-        
-        # Get forecast
-        forecast = predictor.predict_future_prices(
-            request.pair,
-            request.interval,
-            data,
-            request.window_size,
-            request.forecast_size
-        )
-        
-        if not forecast["success"]:
-            raise HTTPException(status_code=500, detail=forecast["error"])
+        with REQUEST_LATENCY.labels("forecast", *series_labels(request.pair, request.interval)).time():
+            # Fetch recent data
+            with timed("fetch", request.pair, request.interval):
+                data = await data_fetcher.fetch_recent_for_forecast(
+                    request.pair, 
+                    request.interval, 
+                    request.window_size + 50
+                )
             
-        img_base64 = ForecastVisualizer.plot_forecast(data, forecast)
+            # Get forecast
+            forecast = await run_blocking(
+                predictor.predict_future_prices,
+                request.pair,
+                request.interval,
+                data,
+                request.window_size,
+                request.forecast_size,
+                request.mode
+            )
+            
+            if not forecast["success"]:
+                raise HTTPException(status_code=500, detail=forecast["error"])
+                
+            image = None
+            if request.render != "none":
+                with timed("render", request.pair, request.interval):
+                    render_key = (request.pair, request.interval, forecast["last_historical_timestamp"],
+                                  forecast["model_version"], request.window_size, request.forecast_size,
+                                  forecast["mode"], request.render)
+                    image = render_cache.get(render_key)
+                    if image is None:
+                        image = await run_blocking(ForecastVisualizer.plot_forecast, data, forecast, request.render)
+                        render_cache.put(render_key, image)
         
-        return {
+        return FastJSONResponse({
             "forecast": forecast,
-            "visualization": img_base64
-        }
+            "visualization": image,
+            "visualization_format": request.render
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class BatchForecastRequest(BaseModel):
+    items: List[ForecastItem]
+
+@app.post("/api/forecasts")
+async def get_forecasts(batch: BatchForecastRequest, request: Request,
+                        format: Optional[str] = Query(None, pattern="^(json|msgpack)$")):
+    """Forecast many pairs/intervals in one call; errors are reported per item"""
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    
+    with REQUEST_LATENCY.labels("forecasts", "batch", "batch").time():
+        results = [None] * len(batch.items)
+        fetches = {}
+        for i, item in enumerate(batch.items):
+            if item.pair not in FOREX_PAIRS:
+                results[i] = {"success": False, "error": "Unsupported currency pair",
+                              "pair": item.pair, "interval": item.interval}
+            elif item.interval not in INTERVALS:
+                results[i] = {"success": False, "error": "Unsupported interval",
+                              "pair": item.pair, "interval": item.interval}
+            else:
+                # One upstream call per (pair, interval), sized for the largest window asked for
+                key = (item.pair, item.interval)
+                fetches[key] = max(fetches.get(key, 0), item.window_size + 50)
+        
+        keys = list(fetches)
+        with timed("fetch", "batch", "batch"):
+            fetched = await asyncio.gather(
+                *[data_fetcher.fetch_recent_for_forecast(pair, interval, fetches[(pair, interval)])
+                  for pair, interval in keys],
+                return_exceptions=True
+            )
+        data_by_key = dict(zip(keys, fetched))
+        
+        pending, positions = [], []
+        for i, item in enumerate(batch.items):
+            if results[i] is not None:
+                continue
+            data = data_by_key[(item.pair, item.interval)]
+            if isinstance(data, Exception):
+                results[i] = {"success": False, "error": str(data), "pair": item.pair, "interval": item.interval}
+                continue
+            pending.append({**item.model_dump(), "data": data})
+            positions.append(i)
+        
+        if pending:
+            with timed("inference", "batch", "batch"):
+                forecasts = await run_blocking(predictor.predict_batch, pending)
+            for i, forecast in zip(positions, forecasts):
+                results[i] = forecast
+    
+    return negotiated_response({"forecasts": results}, request, format)
+
+@app.get("/api/credits")
+def get_credit_status():
+    """Upstream credit spend and circuit breaker state, shared by every process on the host"""
+    return data_fetcher.governor.status()
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/", response_class=HTMLResponse)
 async def get_forecast_ui():
     """Simple UI to visualize forecasts"""
@@ -99,7 +208,8 @@ async def get_forecast_ui():
                             pair, 
                             interval,
                             window_size: 50,
-                            forecast_size: 10
+                            forecast_size: 10,
+                            render: "none"
                         })
                     })
                     .then(response => {
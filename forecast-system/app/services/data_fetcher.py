@@ -1,41 +1,142 @@
+import asyncio
+import numpy as np
+import orjson
 import pandas as pd
-import requests
+import httpx
 from typing import Optional
 from datetime import datetime, timedelta
 import time
+import logging
+from fxshared.bar_cache import read_bars
+from fxshared.credit_governor import CreditGovernor, LastGood, UpstreamUnavailable, LIVE, BATCH, quota_retry_after
+from ..services.metrics import UPSTREAM_FALLBACK, series_labels
+from config import (
+    TWELVE_DATA_BASE_URL, FETCH_TIMEOUT_SECONDS, BAR_CACHE_ENABLED, BAR_CACHE_PREFIX, BAR_CACHE_GRACE_SECONDS,
+    CREDIT_DB_PATH, CREDITS_PER_MINUTE, CREDITS_PER_DAY, LIVE_RESERVE_PER_MINUTE, LIVE_RESERVE_PER_DAY,
+    BATCH_MAX_WAIT_SECONDS, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+def default_governor() -> CreditGovernor:
+    return CreditGovernor(
+        CREDIT_DB_PATH, CREDITS_PER_MINUTE, CREDITS_PER_DAY, LIVE_RESERVE_PER_MINUTE, LIVE_RESERVE_PER_DAY,
+        BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS,
+    )
 
 class ForecastDataFetcher:
-    def __init__(self, api_key: str):
+    """Async Twelve Data client.
+    
+    The underlying httpx.AsyncClient is created on first use and belongs to the
+    running event loop: scripts should do all their fetching inside one
+    asyncio.run(...) and call aclose() at the end.
+    
+    Every upstream call reserves a credit from the host-wide CreditGovernor
+    first. Live (API) callers get the last good series while the upstream is
+    out of credits or failing; batch callers wait for budget or fail.
+    """
+    def __init__(self, api_key: str, base_url: str = TWELVE_DATA_BASE_URL, timeout: float = FETCH_TIMEOUT_SECONDS,
+                 governor: Optional[CreditGovernor] = None):
         self.api_key = api_key
-        self.base_url = "https://api.twelvedata.com/time_series"
+        self.base_url = f"{base_url}/time_series"
+        self.timeout = timeout
+        self.governor = governor or default_governor()
+        self.last_good = LastGood()
+        self._client: Optional[httpx.AsyncClient] = None
         
-    def fetch_ohlcv(self, pair: str, interval: str, output_size: int = 5000) -> pd.DataFrame:
-        """Fetch OHLCV data for forecasting"""
-        url = (f"{self.base_url}?symbol={pair}&interval={interval}"
-               f"&outputsize={output_size}&apikey={self.api_key}&format=JSON")
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+    
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        
+    async def fetch_ohlcv(self, pair: str, interval: str, output_size: int = 5000, use_cache: bool = True,
+                          priority: str = LIVE) -> pd.DataFrame:
+        """Fetch OHLCV data for forecasting; served from the shared bar cache when it is enabled and fresh"""
+        if use_cache and BAR_CACHE_ENABLED:
+            df = read_bars(pair, interval, output_size, BAR_CACHE_PREFIX, BAR_CACHE_GRACE_SECONDS)
+            if df is not None:
+                return df
+        
+        params = {
+            "symbol": pair,
+            "interval": interval,
+            "outputsize": output_size,
+            "apikey": self.api_key,
+            "format": "JSON",
+        }
         
         try:
-            response = requests.get(url)
-            data = response.json()
-            
-            if "values" not in data:
-                raise ValueError(f"API Error: {data.get('message', 'Unknown error')}")
-                
-            df = pd.DataFrame(data["values"]).rename(columns={"datetime": "time"})
-            df["time"] = pd.to_datetime(df["time"])
-            df = df.sort_values("time")
-            
-            numeric_cols = ["open", "high", "low", "close", "volume"]
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            return df.dropna()
+            await self.governor.acquire_async(
+                1, priority, max_wait=BATCH_MAX_WAIT_SECONDS if priority == BATCH else 0.0
+            )
+            # The governor's bookkeeping is blocking SQLite, so it stays off the event loop
+            loop = asyncio.get_running_loop()
+            try:
+                response = await self.client.get(self.base_url, params=params)
+                data = orjson.loads(response.content)
+            except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+                await loop.run_in_executor(None, self.governor.record_failure, str(e))
+                raise
+            await loop.run_in_executor(None, self.governor.record_response, data)
+            retry_after = quota_retry_after(data)
+            if retry_after is not None:
+                raise UpstreamUnavailable("credits exhausted", retry_after, "quota")
+            df = self.parse_ohlcv(data)
             
+        except (UpstreamUnavailable, httpx.HTTPError, orjson.JSONDecodeError) as e:
+            fallback = self.last_good.recall(pair, interval, output_size) if priority == LIVE else None
+            if fallback is None:
+                raise RuntimeError(f"Failed to fetch data: {str(e)}")
+            kind = e.kind if isinstance(e, UpstreamUnavailable) else "error"
+            logger.warning("serving last good bars for %s %s (%s)", pair, interval, e)
+            UPSTREAM_FALLBACK.labels(*series_labels(pair, interval), kind).inc()
+            return fallback
         except Exception as e:
             raise RuntimeError(f"Failed to fetch data: {str(e)}")
+        
+        self.last_good.remember(pair, interval, df)
+        return df
+    
+    @staticmethod
+    def parse_ohlcv(data: dict) -> pd.DataFrame:
+        """Turn a decoded time_series payload into a sorted numeric frame"""
+        if "values" not in data:
+            raise ValueError(f"API Error: {data.get('message', 'Unknown error')}")
+            
+        values = data["values"]
+        if not values:
+            raise ValueError("API Error: empty time series")
+        numeric_cols = [col for col in ["open", "high", "low", "close", "volume"] if col in values[0]]
+        
+        # Bars arrive newest first: reverse instead of sorting, and convert the
+        # strings straight into one float64 block instead of per-column to_numeric
+        rows = values[::-1]
+        time = np.array([v["datetime"] for v in rows], dtype="datetime64[ns]")
+        try:
+            numeric = np.array([[v[col] for col in numeric_cols] for v in rows], dtype=np.float64)
+        except (ValueError, TypeError):
+            raw = pd.DataFrame([[v.get(col) for col in numeric_cols] for v in rows])
+            numeric = raw.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        
+        if len(time) > 1 and not (time[1:] >= time[:-1]).all():
+            order = np.argsort(time, kind="stable")
+            time, numeric = time[order], numeric[order]
+        
+        valid = ~np.isnan(numeric).any(axis=1)
+        if not valid.all():
+            time, numeric = time[valid], numeric[valid]
+        
+        df = pd.DataFrame(numeric, columns=numeric_cols)
+        df.insert(0, "time", time)
+        return df
     
-    def fetch_recent_for_forecast(self, pair: str, interval: str, window_size: int) -> pd.DataFrame:
+    async def fetch_recent_for_forecast(self, pair: str, interval: str, window_size: int) -> pd.DataFrame:
         """Fetch recent data specifically for forecasting"""
-        df = self.fetch_ohlcv(pair, interval, window_size)
+        df = await self.fetch_ohlcv(pair, interval, window_size)
         return df[["time", "close"]].set_index("time")
\ No newline at end of file
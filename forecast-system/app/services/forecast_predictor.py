@@ -1,16 +1,89 @@
 import os
+import copy
+import logging
+import threading
+import warnings
 import numpy as np
 import pandas as pd
 import torch
-from typing import Dict, Any, List
+from torch.func import functional_call, stack_module_state, vmap
+from typing import Dict, Any, List, Tuple, Callable
 from datetime import datetime, timedelta
 from ..services.forecast_trainer import NBEATS, ForecastTrainer
+from ..services.metrics import timed
 from sklearn.preprocessing import MinMaxScaler
-from config import FORECAST_MODEL_DIR
+from config import FORECAST_MODEL_DIR, DEFAULT_FORECAST_MODE, FORECAST_COMPILE
+
+logger = logging.getLogger(__name__)
+
+FORECAST_MODES = ("auto", "direct", "recursive")
+
+class LoadedModel:
+    """A model, its scaler and the inference callable, tagged with the artifacts' mtimes"""
+    __slots__ = ("model", "scaler", "runner", "form", "mtimes")
+    
+    def __init__(self, model: NBEATS, scaler: MinMaxScaler, runner: Callable, form: str, mtimes: Tuple[float, float]):
+        self.model = model
+        self.scaler = scaler
+        self.runner = runner
+        self.form = form
+        self.mtimes = mtimes
+    
+    @property
+    def version(self) -> str:
+        """When the newer of the model and scaler files was written; changes on every retrain"""
+        return datetime.utcfromtimestamp(max(self.mtimes)).isoformat()
+
+def build_runner(model: NBEATS, form: str = FORECAST_COMPILE) -> Tuple[Callable, str]:
+    """Inference callable for `model`; falls back to eager if the requested form fails"""
+    example = torch.zeros(1, model.input_size)
+    try:
+        if form == "torchscript":
+            # Recent torch releases flag torch.jit as deprecated; it still traces and runs fine
+            with torch.no_grad(), warnings.catch_warnings():
+                warnings.simplefilter("ignore", FutureWarning)
+                runner = torch.jit.freeze(torch.jit.trace(model, example))
+        elif form == "compile":
+            runner = torch.compile(model, dynamic=True)
+        else:
+            return model, "eager"
+        # Warm up now so tracing/compilation cost and failures stay out of requests
+        with torch.inference_mode():
+            runner(example)
+        return runner, form
+    except Exception as e:
+        logger.warning("Falling back to eager inference (%s failed: %s)", form, e)
+        return model, "eager"
 
 class ForecastPredictor:
-    def __init__(self):
-        self.trainer = ForecastTrainer()
+    def __init__(self, model_dir: str = FORECAST_MODEL_DIR):
+        self.trainer = ForecastTrainer(model_dir)
+        self._models: Dict[Tuple[str, str], LoadedModel] = {}
+        self._lock = threading.Lock()
+        
+    def get_model(self, pair: str, interval: str) -> LoadedModel:
+        """Cached model for (pair, interval), reloaded when its files change on disk"""
+        model_path, scaler_path = self.trainer.artifact_paths(pair, interval)
+        try:
+            mtimes = (os.path.getmtime(model_path), os.path.getmtime(scaler_path))
+        except OSError:
+            raise FileNotFoundError(f"Model or scaler not found for {pair} {interval}")
+        
+        key = (pair, interval)
+        cached = self._models.get(key)
+        if cached is not None and cached.mtimes == mtimes:
+            return cached
+        
+        with self._lock:
+            cached = self._models.get(key)
+            if cached is not None and cached.mtimes == mtimes:
+                return cached
+            model, scaler = self.trainer.load_model(pair, interval)
+            runner, form = build_runner(model)
+            loaded = LoadedModel(model, scaler, runner, form, mtimes)
+            self._models[key] = loaded
+            logger.info("Loaded %s %s model (%s)", pair, interval, form)
+            return loaded
         
     def _generate_timestamps(self, 
                            last_timestamp: datetime, 
@@ -35,55 +108,197 @@ class ForecastPredictor:
                           window_size: int,
                           forecast_size: int) -> np.ndarray:
         """Make recursive multi-step predictions"""
-        predictions = []
-        current_window = initial_window.copy()
+        # One buffer for history + predictions instead of growing it with np.append
+        buffer = np.empty(window_size + forecast_size, dtype=np.float32)
+        buffer[:window_size] = initial_window[-window_size:]
         
-        for _ in range(forecast_size):
-            with torch.no_grad():
-                input_tensor = torch.FloatTensor(current_window[-window_size:]).unsqueeze(0)
-                pred = model(input_tensor).numpy().flatten()[0]  # Get first prediction
-                predictions.append(pred)
-                current_window = np.append(current_window, pred)
+        with torch.inference_mode():
+            for step in range(forecast_size):
+                input_tensor = torch.from_numpy(buffer[step:step + window_size]).unsqueeze(0)
+                buffer[window_size + step] = model(input_tensor)[0, 0].item()  # Get first prediction
                 
-        return np.array(predictions)
+        return buffer[window_size:].astype(np.float64)
+    
+    def _direct_forecast(self,
+                         model: NBEATS,
+                         initial_window: np.ndarray,
+                         window_size: int,
+                         forecast_size: int) -> np.ndarray:
+        """Take the whole horizon from a single forward pass"""
+        with torch.inference_mode():
+            input_tensor = torch.from_numpy(
+                np.ascontiguousarray(initial_window[-window_size:], dtype=np.float32)
+            ).unsqueeze(0)
+            return model(input_tensor)[0, :forecast_size].numpy().astype(np.float64)
+    
+    def resolve_mode(self, model: NBEATS, window_size: int, forecast_size: int, mode: str) -> str:
+        """'auto' picks direct whenever the trained model covers the horizon"""
+        if mode not in FORECAST_MODES:
+            raise ValueError(f"Unknown forecast mode: {mode}")
+        # Both modes feed the model windows of its own input size
+        if window_size != model.input_size:
+            raise ValueError(f"The model was trained on window_size={model.input_size}")
+        fits = forecast_size <= model.forecast_size
+        if mode == "auto":
+            return "direct" if fits else "recursive"
+        if mode == "direct" and not fits:
+            raise ValueError(f"Direct mode needs forecast_size<={model.forecast_size}")
+        return mode
+    
+    def forecast_scaled(self,
+                        model: NBEATS,
+                        scaler: MinMaxScaler,
+                        initial_window: np.ndarray,
+                        window_size: int,
+                        forecast_size: int,
+                        mode: str) -> np.ndarray:
+        """Run an already-resolved mode on a scaled window"""
+        if mode == "direct":
+            return self._direct_forecast(model, initial_window, window_size, forecast_size)
+        return self._recursive_forecast(model, scaler, initial_window, window_size, forecast_size)
+        
+    def _build_result(self,
+                      pair: str,
+                      interval: str,
+                      data: pd.DataFrame,
+                      forecast: np.ndarray,
+                      window_size: int,
+                      forecast_size: int,
+                      mode: str,
+                      model_version: str) -> Dict[str, Any]:
+        last_timestamp = data.index[-1]
+        forecast_timestamps = self._generate_timestamps(last_timestamp, interval, forecast_size)
+        
+        return {
+            "success": True,
+            "pair": pair,
+            "interval": interval,
+            "forecast": forecast.tolist(),
+            "forecast_timestamps": [ts.isoformat() for ts in forecast_timestamps],
+            "historical_timestamps": [ts.isoformat() for ts in data.index[-window_size:]],
+            "historical_prices": data["close"].values[-window_size:].tolist(),
+            "last_historical_timestamp": last_timestamp.isoformat(),
+            "last_historical_price": float(data["close"].values[-1]),
+            "window_size": window_size,
+            "forecast_size": forecast_size,
+            "mode": mode,
+            "model_version": model_version
+        }
+    
+    @staticmethod
+    def _architecture(model: NBEATS) -> Tuple:
+        """Parameter shapes; models with equal signatures can be stacked into one vmapped call"""
+        return tuple((name, tuple(p.shape)) for name, p in model.state_dict().items())
+    
+    def _stacked_forecast(self,
+                          models: List[NBEATS],
+                          windows: np.ndarray,
+                          window_size: int,
+                          forecast_size: int,
+                          mode: str) -> np.ndarray:
+        """Run k same-architecture models on their k scaled windows in one batched call per step"""
+        params, buffers = stack_module_state(models)
+        base = copy.deepcopy(models[0]).to("meta")
+        
+        def forward(p, b, x):
+            return functional_call(base, (p, b), (x,))
+        
+        batched = vmap(forward)
+        with torch.inference_mode():
+            if mode == "direct":
+                inputs = torch.from_numpy(windows).unsqueeze(1)
+                return batched(params, buffers, inputs)[:, 0, :forecast_size].numpy().astype(np.float64)
+            
+            buffer = np.empty((len(models), window_size + forecast_size), dtype=np.float32)
+            buffer[:, :window_size] = windows
+            for step in range(forecast_size):
+                inputs = torch.from_numpy(np.ascontiguousarray(buffer[:, step:step + window_size])).unsqueeze(1)
+                buffer[:, window_size + step] = batched(params, buffers, inputs)[:, 0, 0].numpy()
+            return buffer[:, window_size:].astype(np.float64)
+    
+    def predict_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Forecast many (pair, interval) items at once.
+        
+        Each item carries pair, interval, data, window_size, forecast_size and
+        mode. Items whose models share an architecture, window, horizon and
+        resolved mode are stacked into a single batched forward pass. Failures
+        are reported per item in the same shape as predict_future_prices.
+        """
+        results: List[Dict[str, Any]] = [None] * len(items)
+        groups: Dict[Tuple, List[Tuple[int, LoadedModel, np.ndarray, str]]] = {}
+        
+        for i, item in enumerate(items):
+            pair, interval = item["pair"], item["interval"]
+            window_size, forecast_size = item["window_size"], item["forecast_size"]
+            try:
+                data = item["data"]
+                if len(data) < window_size:
+                    raise ValueError(f"Need at least {window_size} historical data points")
+                loaded = self.get_model(pair, interval)
+                mode = self.resolve_mode(loaded.model, window_size, forecast_size, item["mode"])
+                recent_data = data["close"].values[-window_size:]
+                scaled = loaded.scaler.transform(recent_data.reshape(-1, 1)).flatten().astype(np.float32)
+            except Exception as e:
+                results[i] = {"success": False, "error": str(e), "pair": pair, "interval": interval}
+                continue
+            key = (self._architecture(loaded.model), window_size, forecast_size, mode)
+            groups.setdefault(key, []).append((i, loaded, scaled, mode))
+        
+        for (_, window_size, forecast_size, mode), members in groups.items():
+            try:
+                if len(members) == 1:
+                    _, loaded, scaled, _ = members[0]
+                    forecasts = [self.forecast_scaled(loaded.runner, loaded.scaler, scaled, window_size, forecast_size, mode)]
+                else:
+                    stacked = self._stacked_forecast(
+                        [loaded.model for _, loaded, _, _ in members],
+                        np.stack([scaled for _, _, scaled, _ in members]),
+                        window_size, forecast_size, mode
+                    )
+                    forecasts = list(stacked)
+                
+                for (i, loaded, _, _), forecast_scaled in zip(members, forecasts):
+                    item = items[i]
+                    forecast = loaded.scaler.inverse_transform(forecast_scaled.reshape(-1, 1)).flatten()
+                    results[i] = self._build_result(
+                        item["pair"], item["interval"], item["data"], forecast, window_size, forecast_size, mode,
+                        loaded.version
+                    )
+            except Exception as e:
+                for i, _, _, _ in members:
+                    results[i] = {"success": False, "error": str(e),
+                                  "pair": items[i]["pair"], "interval": items[i]["interval"]}
+        
+        return results
         
     def predict_future_prices(self, 
                             pair: str, 
                             interval: str, 
                             data: pd.DataFrame,
                             window_size: int = 50,
-                            forecast_size: int = 10) -> Dict[str, Any]:
+                            forecast_size: int = 10,
+                            mode: str = DEFAULT_FORECAST_MODE) -> Dict[str, Any]:
         """Predict future prices using N-BEATS model"""
         try:
             if len(data) < window_size:
                 raise ValueError(f"Need at least {window_size} historical data points")
                 
-            model, scaler = self.trainer.load_model(pair, interval)
-            
-            recent_data = data["close"].values[-window_size:]
-            recent_data_scaled = scaler.transform(recent_data.reshape(-1, 1)).flatten()
+            with timed("model_load", pair, interval):
+                loaded = self.get_model(pair, interval)
+                scaler = loaded.scaler
             
-            forecast_scaled = self._recursive_forecast(
-                model, scaler, recent_data_scaled, window_size, forecast_size
-            )
-            forecast = scaler.inverse_transform(forecast_scaled.reshape(-1, 1)).flatten()
+            with timed("inference", pair, interval):
+                recent_data = data["close"].values[-window_size:]
+                recent_data_scaled = scaler.transform(recent_data.reshape(-1, 1)).flatten()
                 
-            last_timestamp = data.index[-1]
-            forecast_timestamps = self._generate_timestamps(last_timestamp, interval, forecast_size)
-            
-            return {
-                "success": True,
-                "pair": pair,
-                "interval": interval,
-                "forecast": forecast.tolist(),
-                "forecast_timestamps": [ts.isoformat() for ts in forecast_timestamps],
-                "historical_timestamps": [ts.isoformat() for ts in data.index[-window_size:]],
-                "historical_prices": data["close"].values[-window_size:].tolist(),
-                "last_historical_timestamp": last_timestamp.isoformat(),
-                "last_historical_price": float(data["close"].values[-1]),
-                "window_size": window_size,
-                "forecast_size": forecast_size
-            }
+                mode = self.resolve_mode(loaded.model, window_size, forecast_size, mode)
+                forecast_scaled = self.forecast_scaled(
+                    loaded.runner, scaler, recent_data_scaled, window_size, forecast_size, mode
+                )
+                forecast = scaler.inverse_transform(forecast_scaled.reshape(-1, 1)).flatten()
+                
+            return self._build_result(pair, interval, data, forecast, window_size, forecast_size, mode,
+                                      loaded.version)
             
         except Exception as e:
             return {
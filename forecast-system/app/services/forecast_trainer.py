@@ -3,12 +3,15 @@ import numpy as np
 import pandas as pd
 import torch
 from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
 from sklearn.preprocessing import MinMaxScaler
 from tqdm import tqdm
-from typing import Tuple, List
+from typing import Tuple, List, Dict, Optional
 import joblib
-from config import FORECAST_MODEL_DIR
-from config import FORECAST_MODEL_DIR, DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE
+from config import (
+    FORECAST_MODEL_DIR, DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE, DEFAULT_EPOCHS, DEFAULT_BATCH_SIZE,
+    DEFAULT_LEARNING_RATE, DEFAULT_VALIDATION_SPLIT, DEFAULT_PATIENCE, TORCH_NUM_THREADS
+)
 
 class NBEATSBlock(nn.Module):
     """Basic N-BEATS block"""
@@ -76,42 +79,67 @@ class ForecastTrainer:
         os.makedirs(model_dir, exist_ok=True)
         self.scalers = {}
         
+    @staticmethod
+    def _sequence_windows(series: np.ndarray, window_size: int, forecast_size: int) -> np.ndarray:
+        """Read-only strided view of shape (n, window_size + forecast_size) over `series`"""
+        n = len(series) - window_size - forecast_size
+        if n <= 0:
+            return np.empty((0, window_size + forecast_size), dtype=series.dtype)
+        return np.lib.stride_tricks.sliding_window_view(series, window_size + forecast_size)[:n]
+    
     def create_sequences(self, data: pd.DataFrame, window_size: int, forecast_size: int) -> Tuple[np.ndarray, np.ndarray]:
         """Create input sequences and targets for training"""
-        sequences = []
-        targets = []
-        
-        for i in range(len(data) - window_size - forecast_size):
-            seq = data.iloc[i:i+window_size]["close"].values
-            target = data.iloc[i+window_size:i+window_size+forecast_size]["close"].values
-            sequences.append(seq)
-            targets.append(target)
-            
-        return np.array(sequences), np.array(targets)
+        windows = self._sequence_windows(data["close"].to_numpy(dtype=np.float64), window_size, forecast_size)
+        return windows[:, :window_size], windows[:, window_size:]
     
     def train_model(self, 
                    pair: str, 
                    interval: str, 
                    data: pd.DataFrame,
-                   window_size: int = 50,
-                   forecast_size: int = 10,
-                   epochs: int = 100,
-                   batch_size: int = 32,
-                   learning_rate: float = 0.001) -> None:
-        """Train N-BEATS model for a specific pair and timeframe"""
-        X, y = self.create_sequences(data, window_size, forecast_size)
-        
+                   window_size: int = DEFAULT_WINDOW_SIZE,
+                   forecast_size: int = DEFAULT_FORECAST_SIZE,
+                   epochs: int = DEFAULT_EPOCHS,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   learning_rate: float = DEFAULT_LEARNING_RATE,
+                   validation_split: float = DEFAULT_VALIDATION_SPLIT,
+                   patience: int = DEFAULT_PATIENCE,
+                   num_threads: Optional[int] = TORCH_NUM_THREADS,
+                   seed: int = 42) -> Dict[str, float]:
+        """Train N-BEATS model for a specific pair and timeframe.
+        
+        Sequences are split in time order: the most recent `validation_split`
+        share is held out, and training stops once validation loss has not
+        improved for `patience` epochs. The best epoch's weights are saved.
+        """
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        torch.manual_seed(seed)
+        
+        close = data["close"].to_numpy(dtype=np.float64)
+        n_sequences = len(close) - window_size - forecast_size
+        if n_sequences <= 0:
+            raise ValueError(f"Need more than {window_size + forecast_size} rows to train")
+        
+        # Same fit as scaling every input window: the inputs cover close[:n_sequences + window_size - 1]
         scaler = MinMaxScaler()
-        X_scaled = scaler.fit_transform(X.reshape(-1, 1)).reshape(X.shape)
-        y_scaled = scaler.transform(y.reshape(-1, 1)).reshape(y.shape)
+        scaler.fit(close[:n_sequences + window_size - 1].reshape(-1, 1))
+        scaled = scaler.transform(close.reshape(-1, 1)).astype(np.float32).ravel()
+        windows = self._sequence_windows(scaled, window_size, forecast_size)
         
         model_name = f"{pair.lower().replace('/', '')}_{interval}"
-        scaler_path = os.path.join(self.model_dir, f"{model_name}_scaler.save")
-        joblib.dump(scaler, scaler_path)
-        self.scalers[model_name] = scaler
-        
-        X_tensor = torch.FloatTensor(X_scaled)
-        y_tensor = torch.FloatTensor(y_scaled)
+
+        # Purge the sequences whose targets overlap the validation inputs
+        split = int(n_sequences * (1 - validation_split))
+        train_end = max(1, split - window_size - forecast_size) if validation_split > 0 else n_sequences
+        train_windows = torch.from_numpy(np.ascontiguousarray(windows[:train_end]))
+        val_windows = torch.from_numpy(np.ascontiguousarray(windows[split:])) if validation_split > 0 else None
+        
+        loader = DataLoader(
+            TensorDataset(train_windows[:, :window_size], train_windows[:, window_size:]),
+            batch_size=batch_size,
+            shuffle=True,
+            generator=torch.Generator().manual_seed(seed)
+        )
         
         model = NBEATS(
             input_size=window_size,
@@ -125,24 +153,66 @@ class ForecastTrainer:
         criterion = nn.MSELoss()
         optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
         
-        for epoch in tqdm(range(epochs), desc=f"Training {pair} {interval}"):
-            for i in range(0, len(X_tensor), batch_size):
-                batch_X = X_tensor[i:i+batch_size]
-                batch_y = y_tensor[i:i+batch_size]
-                
+        best_loss = float("inf")
+        best_state = None
+        best_epoch = 0
+        train_loss = float("nan")
+        
+        progress = tqdm(range(epochs), desc=f"Training {pair} {interval}")
+        for epoch in progress:
+            model.train()
+            total, count = 0.0, 0
+            for batch_X, batch_y in loader:
                 optimizer.zero_grad()
                 outputs = model(batch_X)
                 loss = criterion(outputs, batch_y)
                 loss.backward()
                 optimizer.step()
-                
+                total += loss.item() * len(batch_X)
+                count += len(batch_X)
+            train_loss = total / count
+            
+            if val_windows is not None and len(val_windows):
+                model.eval()
+                with torch.no_grad():
+                    monitored = criterion(model(val_windows[:, :window_size]), val_windows[:, window_size:]).item()
+            else:
+                monitored = train_loss
+            progress.set_postfix(train=f"{train_loss:.5f}", val=f"{monitored:.5f}")
+            
+            if monitored < best_loss:
+                best_loss, best_epoch = monitored, epoch
+                best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+            elif epoch - best_epoch >= patience:
+                break
+        
+        if best_state is None:
+            # Every monitored loss was NaN (or there were no epochs): nothing worth saving
+            raise ValueError(f"Training {pair} {interval} diverged: no epoch reached a finite "
+                             f"{'validation' if val_windows is not None and len(val_windows) else 'training'} loss")
+        model.load_state_dict(best_state)
+        # Written only now, so a failed run leaves the served model and scaler pair untouched
+        scaler_path = os.path.join(self.model_dir, f"{model_name}_scaler.save")
+        joblib.dump(scaler, scaler_path)
+        self.scalers[model_name] = scaler
         model_path = os.path.join(self.model_dir, f"{model_name}_nbeats.pt")
         torch.save(model.state_dict(), model_path)
         
-    def load_model(self, pair: str, interval: str) -> Tuple[nn.Module, MinMaxScaler]:
+        return {
+            "epochs_run": epoch + 1,
+            "best_epoch": best_epoch + 1,
+            "best_val_loss": best_loss,
+            "train_loss": train_loss,
+        }
+        
+    def artifact_paths(self, pair: str, interval: str) -> Tuple[str, str]:
+        """Model and scaler file paths for a pair and timeframe"""
         model_name = f"{pair.lower().replace('/', '')}_{interval}"
-        model_path = os.path.join(self.model_dir, f"{model_name}_nbeats.pt")
-        scaler_path = os.path.join(self.model_dir, f"{model_name}_scaler.save")
+        return (os.path.join(self.model_dir, f"{model_name}_nbeats.pt"),
+                os.path.join(self.model_dir, f"{model_name}_scaler.save"))
+        
+    def load_model(self, pair: str, interval: str) -> Tuple[nn.Module, MinMaxScaler]:
+        model_path, scaler_path = self.artifact_paths(pair, interval)
         
         if not os.path.exists(model_path) or not os.path.exists(scaler_path):
             raise FileNotFoundError(f"Model or scaler not found for {pair} {interval}")
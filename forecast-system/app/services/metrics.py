@@ -0,0 +1,66 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Tuple
+from prometheus_client import (
+    Counter, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from config import FOREX_PAIRS, INTERVALS
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_LATENCY = Histogram(
+    "forecast_stage_duration_seconds",
+    "Latency of each stage of the forecast pipeline",
+    ["stage", "pair", "interval"],
+    buckets=STAGE_BUCKETS,
+)
+
+REQUEST_LATENCY = Histogram(
+    "forecast_request_duration_seconds",
+    "End-to-end latency of forecast API requests",
+    ["endpoint", "pair", "interval"],
+    buckets=STAGE_BUCKETS,
+)
+
+RENDER_CACHE = Counter(
+    "forecast_render_cache_total",
+    "Chart render cache lookups",
+    ["result"],
+)
+
+UPSTREAM_FALLBACK = Counter(
+    "forecast_upstream_fallback_total",
+    "Fetches answered with the last good bars because the upstream was out of credits or unhealthy",
+    ["pair", "interval", "kind"],
+)
+
+def series_labels(pair: str, interval: str) -> Tuple[str, str]:
+    """(pair, interval) label values; anything not served ("batch" marks whole-batch timings) becomes
+    "other", so request input cannot create new series"""
+    return (pair if pair in FOREX_PAIRS or pair == "batch" else "other",
+            interval if interval in INTERVALS or interval == "batch" else "other")
+
+@contextmanager
+def timed(stage: str, pair: str, interval: str):
+    """Time a pipeline stage into STAGE_LATENCY and emit a debug span record"""
+    pair, interval = series_labels(pair, interval)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage, pair, interval).observe(elapsed)
+        logger.debug("span %s %s %s %.3fms", stage, pair, interval, elapsed * 1000)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition for /metrics; aggregates across uvicorn workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
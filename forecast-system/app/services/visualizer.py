@@ -1,49 +1,87 @@
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pandas as pd
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Hashable, Optional
 import io
 import base64
+import threading
+from ..services.metrics import RENDER_CACHE
+from config import RENDER_CACHE_SIZE
+
+RENDER_FORMATS = ("none", "png", "svg")
 
 class ForecastVisualizer:
     @staticmethod
-    def plot_forecast(historical_data: pd.DataFrame, 
-                     forecast_data: Dict[str, Any]) -> str:
-        """Generate visualization of forecast vs historical data"""
-        plt.figure(figsize=(12, 6))
-        
+    def plot_forecast(historical_data: pd.DataFrame,
+                     forecast_data: Dict[str, Any],
+                     fmt: str = "png") -> str:
+        """Generate visualization of forecast vs historical data.
+
+        Returns a base64 PNG, or SVG markup for fmt="svg". Each call draws on
+        its own Figure (no pyplot global state), so renders can run in
+        parallel worker threads.
+        """
+        if fmt not in RENDER_FORMATS or fmt == "none":
+            raise ValueError(f"Unsupported render format: {fmt}")
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
         # Plot historical data
-        plt.plot(historical_data.index, 
-                historical_data["close"], 
+        ax.plot(historical_data.index,
+                historical_data["close"],
                 label='Historical Prices',
                 color='blue')
-        
+
         forecast_timestamps = [datetime.fromisoformat(ts) for ts in forecast_data["forecast_timestamps"]]
         forecast_prices = forecast_data["forecast"]
-        
-        plt.plot(forecast_timestamps, 
-                forecast_prices, 
+
+        ax.plot(forecast_timestamps,
+                forecast_prices,
                 label='Forecast',
-                color='red', 
-                linestyle='--', 
+                color='red',
+                linestyle='--',
                 marker='o')
-        
+
         last_point = historical_data.index[-1], historical_data["close"].values[-1]
-        plt.scatter([last_point[0]], [last_point[1]], 
-                   color='green', 
-                   s=100, 
+        ax.scatter([last_point[0]], [last_point[1]],
+                   color='green',
+                   s=100,
                    label='Current Price')
-        
-        plt.title(f"{forecast_data['pair']} {forecast_data['interval']} Price Forecast")
-        plt.xlabel("Time")
-        plt.ylabel("Price")
-        plt.legend()
-        plt.grid(True)
-        
+
+        ax.set_title(f"{forecast_data['pair']} {forecast_data['interval']} Price Forecast")
+        ax.set_xlabel("Time")
+        ax.set_ylabel("Price")
+        ax.legend()
+        ax.grid(True)
+
         buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close()
-        
-        return img_base64
\ No newline at end of file
+        fig.savefig(buf, format=fmt)
+        if fmt == "svg":
+            return buf.getvalue().decode('utf-8')
+        return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+class RenderCache:
+    """LRU of rendered charts; keys pin the last bar and the model version, so an image is rendered
+    at most once per bar and never outlives a retrain"""
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+        RENDER_CACHE.labels("hit" if image is not None else "miss").inc()
+        return image
+
+    def put(self, key: Hashable, image: str) -> None:
+        with self._lock:
+            self._items[key] = image
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
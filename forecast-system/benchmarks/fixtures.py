@@ -0,0 +1,17 @@
+import pandas as pd
+from app.services.forecast_trainer import ForecastTrainer
+from config import DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE
+
+def build_fixture_model(model_dir: str, pair: str, interval: str, df: pd.DataFrame,
+                        train_rows: int = 600, epochs: int = 1) -> str:
+    """Train a default-shaped N-BEATS for a single epoch so loading and inference are representative"""
+    trainer = ForecastTrainer(model_dir)
+    trainer.train_model(
+        pair,
+        interval,
+        df.tail(train_rows),
+        window_size=DEFAULT_WINDOW_SIZE,
+        forecast_size=DEFAULT_FORECAST_SIZE,
+        epochs=epochs
+    )
+    return model_dir
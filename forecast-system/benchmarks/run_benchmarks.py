@@ -0,0 +1,94 @@
+"""Offline benchmarks for the forecast hot path.
+
+Runs every stage of a /api/forecast request against synthetic bars and a
+fixture N-BEATS model, so no API key, network or trained models are needed:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+PAIR = "EUR/USD"
+INTERVAL = "15min"
+
+def run(bars: int, repeat: int, warmup: int) -> dict:
+    from fxshared.bench.synthetic import generate_ohlcv, to_time_series_payload
+    from benchmarks.fixtures import build_fixture_model
+    from fxshared.bench.harness import measure, build_report
+    from app.services.data_fetcher import ForecastDataFetcher
+    from app.services.forecast_predictor import ForecastPredictor
+    from app.services.visualizer import ForecastVisualizer
+    from config import DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE
+
+    model_dir = tempfile.mkdtemp(prefix="forecast-bench-")
+
+    raw = generate_ohlcv(bars, INTERVAL)
+    payload = to_time_series_payload(raw, PAIR, INTERVAL)
+    df = ForecastDataFetcher.parse_ohlcv(payload)
+    build_fixture_model(model_dir, PAIR, INTERVAL, df)
+
+    predictor = ForecastPredictor(model_dir)
+    data = df[["time", "close"]].set_index("time").tail(DEFAULT_WINDOW_SIZE + 50)
+    forecast = predictor.predict_future_prices(PAIR, INTERVAL, data, DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE)
+    if not forecast["success"]:
+        raise RuntimeError(forecast["error"])
+
+    stages = {
+        "fetch_ohlcv_parse": lambda: ForecastDataFetcher.parse_ohlcv(payload),
+        "load_model": lambda: predictor.trainer.load_model(PAIR, INTERVAL),
+        "predict_future_prices": lambda: predictor.predict_future_prices(
+            PAIR, INTERVAL, data, DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE
+        ),
+        "plot_forecast": lambda: ForecastVisualizer.plot_forecast(data, forecast),
+    }
+
+    results = {name: measure(fn, repeat=repeat, warmup=warmup) for name, fn in stages.items()}
+    return build_report(results, app="forecast-system", pair=PAIR, interval=INTERVAL,
+                        bars=bars, repeat=repeat)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline forecast hot-path benchmarks")
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", default="forecast_bench.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float,
+                        default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.2")),
+                        help="Allowed relative slowdown of the median per stage")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="Allowed relative growth of peak traced memory per stage")
+    args = parser.parse_args()
+
+    from fxshared.bench.harness import save_report, compare_reports, print_report
+
+    report = run(args.bars, args.repeat, args.warmup)
+    save_report(report, args.output)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(report, baseline)
+    print(f"\nResults saved to {args.output}")
+
+    if baseline is not None:
+        regressions = compare_reports(report, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
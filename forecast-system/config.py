@@ -1,9 +1,33 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
+TWELVE_DATA_BASE_URL = os.getenv("TWELVE_DATA_BASE_URL", "https://api.twelvedata.com").rstrip("/")
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "30"))
+
+# Twelve Data credit budget, shared by every process on the host (this service,
+# the signal backend and the batch scripts) through one SQLite file; see
+# fxshared/credit_governor.py.
+# Batch jobs leave the live reserve untouched and wait up to BATCH_MAX_WAIT_SECONDS
+# per call for budget; the breaker opens after BREAKER_FAILURE_THRESHOLD
+# consecutive upstream errors, for BREAKER_COOLDOWN_SECONDS.
+CREDIT_DB_PATH = os.getenv("CREDIT_DB_PATH", os.path.join(tempfile.gettempdir(), "twelvedata_credits.sqlite"))
+CREDITS_PER_MINUTE = int(os.getenv("CREDITS_PER_MINUTE", "8"))
+CREDITS_PER_DAY = int(os.getenv("CREDITS_PER_DAY", "800"))
+LIVE_RESERVE_PER_MINUTE = int(os.getenv("LIVE_RESERVE_PER_MINUTE", "2"))
+LIVE_RESERVE_PER_DAY = int(os.getenv("LIVE_RESERVE_PER_DAY", "200"))
+BATCH_MAX_WAIT_SECONDS = float(os.getenv("BATCH_MAX_WAIT_SECONDS", "600"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "60"))
+
+# Shared-memory bar cache filled by forex-signal-backend/feed_bars.py; same
+# settings as the backend so both services attach to the same segments
+BAR_CACHE_ENABLED = os.getenv("BAR_CACHE_ENABLED", "0") == "1"
+BAR_CACHE_PREFIX = os.getenv("BAR_CACHE_PREFIX", "fxbars")
+BAR_CACHE_GRACE_SECONDS = float(os.getenv("BAR_CACHE_GRACE_SECONDS", "120"))
 
 FORECAST_MODEL_DIR = os.path.join(os.path.dirname(__file__), "app", "ml", "models", "forecast")
 os.makedirs(FORECAST_MODEL_DIR, exist_ok=True)
@@ -14,9 +38,34 @@ DEFAULT_FORECAST_SIZE = 10  # Number of steps to predict
 DEFAULT_EPOCHS = 100
 DEFAULT_BATCH_SIZE = 32
 DEFAULT_LEARNING_RATE = 0.001
+DEFAULT_VALIDATION_SPLIT = 0.2  # Most recent share of sequences held out for early stopping
+DEFAULT_PATIENCE = 10  # Epochs without validation improvement before stopping
+
+# Intra-op threads for torch; 0 keeps torch's default (all cores)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+# "auto" forecasts the whole horizon in one forward pass when the trained model
+# covers it and falls back to recursive single-step rollout otherwise;
+# "direct"/"recursive" force one mode (see evaluate_horizons.py)
+DEFAULT_FORECAST_MODE = os.getenv("FORECAST_MODE", "auto")
+
+# Inference form built when a model is loaded: "torchscript" (trace + freeze),
+# "compile" (torch.compile, needs a working C compiler) or "none" (eager)
+FORECAST_COMPILE = os.getenv("FORECAST_COMPILE", "torchscript").lower()
 
 FOREX_PAIRS = [
     "EUR/USD"
 ]
 
-INTERVALS = ["15min", "30min"]
\ No newline at end of file
+INTERVALS = ["15min", "30min"]
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Chart rendering: "png" (base64), "svg" or "none" when the client draws the JSON itself
+DEFAULT_RENDER = os.getenv("FORECAST_RENDER", "png")
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))
+
+# Most items accepted by one /api/forecasts call
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "64"))
+
+# Threads running inference and chart rendering off the event loop
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(min(4, os.cpu_count() or 1))))
@@ -0,0 +1,107 @@
+"""Compare direct and recursive forecasting across horizons.
+
+For every pair/interval, rolls forecast origins over the most recent bars,
+forecasts each horizon with both modes and reports MAE, RMSE and latency per
+call, so FORECAST_MODE can be chosen per deployment:
+
+    python evaluate_horizons.py --horizons 1 2 5 10 20 --origins 300
+    python evaluate_horizons.py --csv eurusd_15min.csv --pairs EUR/USD --intervals 15min
+"""
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+from fxshared.credit_governor import BATCH
+from app.services.data_fetcher import ForecastDataFetcher
+from app.services.forecast_predictor import ForecastPredictor
+from config import TWELVE_DATA_API_KEY, FOREX_PAIRS, INTERVALS, DEFAULT_WINDOW_SIZE, FORECAST_MODEL_DIR
+
+def evaluate(predictor: ForecastPredictor,
+             pair: str,
+             interval: str,
+             closes: np.ndarray,
+             horizons: list,
+             origins: int,
+             window_size: int = DEFAULT_WINDOW_SIZE) -> list:
+    model, scaler = predictor.trainer.load_model(pair, interval)
+    scaled = scaler.transform(closes.reshape(-1, 1)).flatten()
+    max_horizon = max(horizons)
+    last_origin = len(closes) - max_horizon
+    first_origin = max(window_size, last_origin - origins)
+
+    rows = []
+    for horizon in horizons:
+        for mode in ("direct", "recursive"):
+            try:
+                predictor.resolve_mode(model, window_size, horizon, mode)
+            except ValueError:
+                continue
+
+            errors, latencies = [], []
+            for origin in range(first_origin, last_origin):
+                window = scaled[origin - window_size:origin]
+                start = time.perf_counter()
+                forecast = predictor.forecast_scaled(model, scaler, window, window_size, horizon, mode)
+                latencies.append(time.perf_counter() - start)
+                forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()
+                errors.append(forecast - closes[origin:origin + horizon])
+
+            errors = np.concatenate(errors)
+            rows.append({
+                "pair": pair,
+                "interval": interval,
+                "horizon": horizon,
+                "mode": mode,
+                "origins": last_origin - first_origin,
+                "mae": float(np.mean(np.abs(errors))),
+                "rmse": float(np.sqrt(np.mean(errors ** 2))),
+                "latency_ms": float(np.median(latencies) * 1000),
+            })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Direct vs recursive forecast accuracy and latency")
+    parser.add_argument("--pairs", nargs="+", default=FOREX_PAIRS)
+    parser.add_argument("--intervals", nargs="+", default=INTERVALS)
+    parser.add_argument("--horizons", nargs="+", type=int, default=[1, 2, 5, 10, 20])
+    parser.add_argument("--origins", type=int, default=300, help="Forecast origins per horizon")
+    parser.add_argument("--csv", help="Use this CSV (time, close) instead of fetching bars")
+    parser.add_argument("--model-dir", default=FORECAST_MODEL_DIR)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    predictor = ForecastPredictor(args.model_dir)
+    fetcher = ForecastDataFetcher(TWELVE_DATA_API_KEY)
+
+    async def fetch_all(jobs):
+        try:
+            return await asyncio.gather(*[fetcher.fetch_ohlcv(pair, interval, priority=BATCH) for pair, interval in jobs])
+        finally:
+            await fetcher.aclose()
+
+    jobs = [(pair, interval) for pair in args.pairs for interval in args.intervals]
+    if args.csv:
+        csv_data = pd.read_csv(args.csv, parse_dates=["time"]).sort_values("time")
+        datasets = [csv_data] * len(jobs)
+    else:
+        datasets = asyncio.run(fetch_all(jobs))
+
+    results = []
+    for (pair, interval), data in zip(jobs, datasets):
+        results += evaluate(predictor, pair, interval, data["close"].to_numpy(dtype=np.float64),
+                            args.horizons, args.origins)
+
+    print(f"{'pair':<9}{'interval':<9}{'horizon':>8}  {'mode':<10}{'MAE':>12}{'RMSE':>12}{'ms/call':>10}")
+    for row in results:
+        print(f"{row['pair']:<9}{row['interval']:<9}{row['horizon']:>8}  {row['mode']:<10}"
+              f"{row['mae']:>12.6f}{row['rmse']:>12.6f}{row['latency_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# config.py reads these at import time
+os.environ.setdefault("TWELVE_DATA_API_KEY", "test")
+os.environ.setdefault("TORCH_NUM_THREADS", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def prices():
+    """120 15min closes of a noisy EUR/USD-like walk, indexed by time like the fetcher's frames"""
+    rng = np.random.default_rng(0)
+    close = 1.08 + np.cumsum(rng.normal(0, 2e-4, 120))
+    return pd.DataFrame({"close": close}, index=pd.date_range("2026-03-02", periods=120, freq="15min"))
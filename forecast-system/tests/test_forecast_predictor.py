@@ -0,0 +1,88 @@
+import joblib
+import numpy as np
+import pytest
+import torch
+from sklearn.preprocessing import MinMaxScaler
+
+from app.services.forecast_predictor import ForecastPredictor
+from app.services.forecast_trainer import NBEATS, ForecastTrainer
+
+def _save_model(model_dir, pair, interval, prices, seed):
+    """Untrained default-shaped N-BEATS and a scaler fit on `prices`, saved where the trainer would"""
+    torch.manual_seed(seed)
+    model_path, scaler_path = ForecastTrainer(model_dir).artifact_paths(pair, interval)
+    torch.save(NBEATS().state_dict(), model_path)
+    joblib.dump(MinMaxScaler().fit(prices[["close"]].to_numpy()), scaler_path)
+
+@pytest.fixture
+def predictor(tmp_path, prices):
+    _save_model(str(tmp_path), "EUR/USD", "15min", prices, seed=1)
+    _save_model(str(tmp_path), "EUR/USD", "30min", prices, seed=2)
+    _save_model(str(tmp_path), "GBP/USD", "15min", prices, seed=3)
+    return ForecastPredictor(str(tmp_path))
+
+def test_direct_and_recursive_forecast_the_requested_horizon(predictor, prices):
+    direct = predictor.predict_future_prices("EUR/USD", "15min", prices, 50, 10, "direct")
+    assert direct["success"] and direct["mode"] == "direct" and len(direct["forecast"]) == 10
+    assert direct["forecast_timestamps"][0] == "2026-03-03T06:00:00"
+    assert len(direct["historical_prices"]) == 50
+
+    # A shorter direct horizon is a prefix of the full one
+    short = predictor.predict_future_prices("EUR/USD", "15min", prices, 50, 4, "direct")
+    assert np.allclose(short["forecast"], direct["forecast"][:4])
+
+    recursive = predictor.predict_future_prices("EUR/USD", "15min", prices, 50, 10, "recursive")
+    assert recursive["mode"] == "recursive" and len(recursive["forecast"]) == 10
+    assert np.isclose(recursive["forecast"][0], direct["forecast"][0])
+
+    assert predictor.predict_future_prices("EUR/USD", "15min", prices, 50, 10, "auto")["mode"] == "direct"
+    longer = predictor.predict_future_prices("EUR/USD", "15min", prices, 50, 15, "auto")
+    assert longer["mode"] == "recursive" and len(longer["forecast"]) == 15
+
+def test_resolve_mode_rejects_what_the_model_cannot_do(predictor):
+    model = NBEATS(input_size=50, forecast_size=10)
+    assert predictor.resolve_mode(model, 50, 10, "auto") == "direct"
+    assert predictor.resolve_mode(model, 50, 11, "auto") == "recursive"
+    assert predictor.resolve_mode(model, 50, 4, "recursive") == "recursive"
+    with pytest.raises(ValueError, match="Unknown forecast mode"):
+        predictor.resolve_mode(model, 50, 10, "beam")
+    with pytest.raises(ValueError, match="Direct mode needs"):
+        predictor.resolve_mode(model, 50, 11, "direct")
+    for mode in ("auto", "direct", "recursive"):
+        with pytest.raises(ValueError, match="trained on window_size=50"):
+            predictor.resolve_mode(model, 40, 10, mode)
+
+def test_failures_are_reported_in_the_result(predictor, prices):
+    result = predictor.predict_future_prices("EUR/USD", "15min", prices, 50, 11, "direct")
+    assert result == {"success": False, "error": result["error"], "pair": "EUR/USD", "interval": "15min"}
+    assert "Direct mode needs" in result["error"]
+    assert not predictor.predict_future_prices("USD/JPY", "15min", prices, 50, 10, "direct")["success"]
+    assert not predictor.predict_future_prices("EUR/USD", "15min", prices.tail(20), 50, 10, "direct")["success"]
+
+def test_batch_matches_one_call_per_item(predictor, prices):
+    items = [
+        {"pair": "EUR/USD", "interval": "15min", "window_size": 50, "forecast_size": 10, "mode": "direct"},
+        {"pair": "EUR/USD", "interval": "30min", "window_size": 50, "forecast_size": 10, "mode": "direct"},
+        {"pair": "GBP/USD", "interval": "15min", "window_size": 50, "forecast_size": 10, "mode": "direct"},
+        {"pair": "EUR/USD", "interval": "30min", "window_size": 50, "forecast_size": 12, "mode": "auto"},
+        {"pair": "GBP/USD", "interval": "15min", "window_size": 50, "forecast_size": 12, "mode": "recursive"},
+        {"pair": "EUR/USD", "interval": "15min", "window_size": 50, "forecast_size": 5, "mode": "recursive"},
+        {"pair": "USD/JPY", "interval": "15min", "window_size": 50, "forecast_size": 10, "mode": "direct"},
+        {"pair": "EUR/USD", "interval": "15min", "window_size": 50, "forecast_size": 12, "mode": "direct"},
+        {"pair": "GBP/USD", "interval": "15min", "window_size": 40, "forecast_size": 6, "mode": "auto"},
+    ]
+    for k, item in enumerate(items):
+        item["data"] = prices.iloc[:len(prices) - k]  # a different last bar per item
+
+    batch = predictor.predict_batch(items)
+    assert len(batch) == len(items) and [r["success"] for r in batch] == [True] * 6 + [False] * 3
+    for item, result in zip(items, batch):
+        single = predictor.predict_future_prices(item["pair"], item["interval"], item["data"],
+                                                 item["window_size"], item["forecast_size"], item["mode"])
+        assert result["success"] == single["success"]
+        if not single["success"]:
+            assert result == single
+            continue
+        assert np.allclose(result["forecast"], single["forecast"], rtol=0, atol=1e-6)
+        assert {k: v for k, v in result.items() if k != "forecast"} == \
+               {k: v for k, v in single.items() if k != "forecast"}
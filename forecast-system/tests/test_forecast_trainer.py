@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import forecast_trainer
+from app.services.forecast_trainer import ForecastTrainer
+
+def test_sequence_windows_are_a_read_only_view():
+    series = np.arange(20.0)
+    windows = ForecastTrainer._sequence_windows(series, 5, 3)
+    assert windows.shape == (12, 8)
+    assert all((windows[i] == np.arange(i, i + 8)).all() for i in range(12))
+    assert not windows.flags.writeable and np.shares_memory(windows, series)
+
+    assert ForecastTrainer._sequence_windows(series, 15, 5).shape == (0, 20)
+
+def test_create_sequences_splits_inputs_and_targets(tmp_path):
+    X, y = ForecastTrainer(str(tmp_path)).create_sequences(pd.DataFrame({"close": np.arange(20.0)}), 5, 3)
+    assert X.shape == (12, 5) and y.shape == (12, 3)
+    assert list(X[-1]) == [11.0, 12.0, 13.0, 14.0, 15.0] and list(y[-1]) == [16.0, 17.0, 18.0]
+
+@pytest.fixture
+def datasets(monkeypatch):
+    """Every TensorDataset train_model builds, i.e. the training inputs and targets"""
+    built = []
+
+    def capture(*tensors):
+        built.append([t.numpy() for t in tensors])
+        return real(*tensors)
+
+    real = forecast_trainer.TensorDataset
+    monkeypatch.setattr(forecast_trainer, "TensorDataset", capture)
+    return built
+
+def test_purged_split_keeps_training_targets_out_of_validation(tmp_path, datasets):
+    # close == row index, so inverse-scaled values give back positions
+    data = pd.DataFrame({"close": np.arange(200.0)})
+    trainer = ForecastTrainer(str(tmp_path))
+    trainer.train_model("EUR/USD", "15min", data, window_size=10, forecast_size=5, epochs=1, validation_split=0.2)
+
+    scaler = trainer.scalers["eurusd_15min"]
+    X_train, y_train = (scaler.inverse_transform(a.reshape(-1, 1)).reshape(a.shape).round() for a in datasets[0])
+    n_sequences = 200 - 10 - 5
+    split = int(n_sequences * 0.8)  # first validation sequence; its inputs start at row `split`
+    assert len(X_train) == split - 10 - 5
+    assert X_train[0, 0] == 0 and y_train.max() < split
+    # The scaler is fit on the rows the inputs cover, never on rows only ever seen as targets
+    assert scaler.data_max_[0] == n_sequences + 10 - 2
+
+def test_no_validation_trains_on_every_sequence(tmp_path, datasets):
+    data = pd.DataFrame({"close": np.arange(200.0)})
+    result = ForecastTrainer(str(tmp_path)).train_model("EUR/USD", "15min", data, window_size=10, forecast_size=5,
+                                                        epochs=1, validation_split=0)
+    assert len(datasets[0][0]) == 185 and result["epochs_run"] == 1
+
+def test_too_little_data_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Need more than 15 rows"):
+        ForecastTrainer(str(tmp_path)).train_model("EUR/USD", "15min", pd.DataFrame({"close": np.arange(15.0)}),
+                                                   window_size=10, forecast_size=5, epochs=1)
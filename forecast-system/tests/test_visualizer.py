@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services.visualizer import RenderCache
+
+def test_render_cache_evicts_the_least_recently_used():
+    cache = RenderCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # now the most recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+
+    cache.put("a", "A2")
+    cache.put("d", "D")
+    assert cache.get("a") == "A2" and cache.get("c") is None
+
+@pytest.fixture
+def forecast_api(monkeypatch, prices):
+    """The /api/forecast endpoint with the fetch and model stubbed; `state` drives what the model returns"""
+    state = {"bars": len(prices), "version": "v1", "renders": 0}
+
+    async def fetch(pair, interval, size):
+        return prices.iloc[:state["bars"]]
+
+    def predict(pair, interval, data, window_size, forecast_size, mode):
+        return {"success": True, "pair": pair, "interval": interval, "forecast": [1.0] * forecast_size,
+                "last_historical_timestamp": data.index[-1].isoformat(), "model_version": state["version"],
+                "mode": "direct" if mode == "auto" else mode}
+
+    def plot(data, forecast, fmt):
+        state["renders"] += 1
+        return f"{fmt}-{state['renders']}"
+
+    monkeypatch.setattr(main.data_fetcher, "fetch_recent_for_forecast", fetch)
+    monkeypatch.setattr(main.predictor, "predict_future_prices", predict)
+    monkeypatch.setattr(main, "ForecastVisualizer", SimpleNamespace(plot_forecast=plot))
+    monkeypatch.setattr(main, "render_cache", RenderCache())
+    with TestClient(main.app) as client:
+        yield client, state
+
+def test_charts_are_rendered_once_per_bar_version_and_request(forecast_api):
+    client, state = forecast_api
+
+    def image(**body):
+        response = client.post("/api/forecast", json={"pair": "EUR/USD", "interval": "15min", **body})
+        assert response.status_code == 200
+        return response.json()["visualization"]
+
+    assert image() == "png-1"
+    assert image() == "png-1" and state["renders"] == 1
+    assert image(mode="direct") == "png-1"  # "auto" resolved to the same mode
+    assert image(render="svg") == "svg-2"
+    assert image(forecast_size=5) == "png-3"
+    assert image(mode="recursive") == "png-4"
+
+    state["bars"] -= 1  # a different last bar
+    assert image() == "png-5"
+    state["version"] = "v2"  # a retrained model
+    assert image() == "png-6"
+    assert image(render="none") is None and state["renders"] == 6
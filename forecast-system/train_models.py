@@ -1,18 +1,167 @@
+"""Retrain every N-BEATS model.
+
+Series are fetched concurrently and handed to a process pool as soon as they
+arrive, so downloads overlap with training. Each worker gets its own slice of
+the CPU for torch threads. A series whose data (and training settings) hash
+matches the last successful run is skipped, and every run writes a summary of
+time and loss per model:
+
+    python train_models.py --workers 4
+    python train_models.py --pairs EUR/USD GBP/USD --force
+"""
 import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from fxshared.credit_governor import BATCH
 from app.services.data_fetcher import ForecastDataFetcher
 from app.services.forecast_trainer import ForecastTrainer
-from app.services.forecast_trainer import ForecastTrainer
-from config import TWELVE_DATA_API_KEY, FOREX_PAIRS, INTERVALS
+from config import (
+    TWELVE_DATA_API_KEY, FOREX_PAIRS, INTERVALS, FORECAST_MODEL_DIR, DEFAULT_WINDOW_SIZE, DEFAULT_FORECAST_SIZE,
+    DEFAULT_EPOCHS, DEFAULT_BATCH_SIZE, DEFAULT_LEARNING_RATE, DEFAULT_VALIDATION_SPLIT, DEFAULT_PATIENCE
+)
+
+STATE_FILE = "training_state.json"
+SUMMARY_FILE = "training_summary.json"
+MAX_CONCURRENT_FETCHES = 8
+
+TRAINING_SETTINGS = {
+    "window_size": DEFAULT_WINDOW_SIZE,
+    "forecast_size": DEFAULT_FORECAST_SIZE,
+    "epochs": DEFAULT_EPOCHS,
+    "batch_size": DEFAULT_BATCH_SIZE,
+    "learning_rate": DEFAULT_LEARNING_RATE,
+    "validation_split": DEFAULT_VALIDATION_SPLIT,
+    "patience": DEFAULT_PATIENCE,
+}
+
+def data_hash(data: pd.DataFrame) -> str:
+    """Hash of the bars a model is trained on plus the settings it is trained with"""
+    digest = hashlib.sha256()
+    digest.update(data["time"].to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes())
+    digest.update(data["close"].to_numpy(dtype=np.float64).tobytes())
+    digest.update(json.dumps(TRAINING_SETTINGS, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_json(path: str, content: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(content, f, indent=2)
+    os.replace(tmp_path, path)
+
+def train_one(pair: str, interval: str, data: pd.DataFrame, model_dir: str, threads: int, settings: dict) -> dict:
+    """Process-pool entry point: train one model with a fixed torch thread budget"""
+    start = time.perf_counter()
+    result = ForecastTrainer(model_dir).train_model(pair, interval, data, num_threads=threads, **settings)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+async def run_training(args) -> dict:
+    jobs = [(pair, interval) for pair in args.pairs for interval in args.intervals]
+    workers = max(1, min(args.workers, len(jobs)))
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
 
-def train_all_models():
+    state_path = os.path.join(args.model_dir, STATE_FILE)
+    state = load_json(state_path)
+    trainer = ForecastTrainer(args.model_dir)
     fetcher = ForecastDataFetcher(TWELVE_DATA_API_KEY)
-    trainer = ForecastTrainer()
-    
-    for pair in FOREX_PAIRS:
-        for interval in INTERVALS:
-            print(f"Training {pair} {interval}")
-            data = fetcher.fetch_ohlcv(pair, interval)
-            trainer.train_model(pair, interval, data)
-            
+    fetch_slots = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    loop = asyncio.get_running_loop()
+    models = []
+
+    async def fetch(pair: str, interval: str):
+        async with fetch_slots:
+            return await fetcher.fetch_ohlcv(pair, interval, priority=BATCH)
+
+    async def fetch_and_train(pair: str, interval: str, pool: ProcessPoolExecutor) -> None:
+        model_name = f"{pair.lower().replace('/', '')}_{interval}"
+        entry = {"pair": pair, "interval": interval}
+        models.append(entry)
+        try:
+            fetch_start = time.perf_counter()
+            data = await fetch(pair, interval)
+            entry["fetch_seconds"] = round(time.perf_counter() - fetch_start, 3)
+            entry["rows"] = len(data)
+            entry["data_hash"] = digest = data_hash(data)
+
+            artifacts_exist = all(os.path.exists(path) for path in trainer.artifact_paths(pair, interval))
+            previous = state.get(model_name, {})
+            if not args.force and artifacts_exist and previous.get("data_hash") == digest:
+                entry.update(status="skipped", best_val_loss=previous.get("best_val_loss"))
+                print(f"⏭️  {pair} {interval}: data unchanged since {previous.get('trained_at')}")
+                return
+
+            print(f"Training {pair} {interval} ({len(data)} bars)")
+            result = await loop.run_in_executor(pool, train_one, pair, interval, data, args.model_dir, threads,
+                                                TRAINING_SETTINGS)
+            entry.update(status="trained", **result)
+            state[model_name] = {
+                "data_hash": digest,
+                "trained_at": datetime.utcnow().isoformat(),
+                "best_val_loss": result["best_val_loss"],
+            }
+            save_json(state_path, state)
+            print(f"✅ {pair} {interval}: best val loss {result['best_val_loss']:.6f} "
+                  f"at epoch {result['best_epoch']}/{result['epochs_run']} in {result['seconds']}s")
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+            print(f"❌ {pair} {interval}: {e}")
+
+    started_at = datetime.utcnow().isoformat()
+    start = time.perf_counter()
+    # spawn: forking a parent that has already initialised torch's thread pools can deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            await asyncio.gather(*[fetch_and_train(pair, interval, pool) for pair, interval in jobs])
+        finally:
+            await fetcher.aclose()
+
+    return {
+        "started_at": started_at,
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "workers": workers,
+        "threads_per_worker": threads,
+        "settings": TRAINING_SETTINGS,
+        "trained": sum(m["status"] == "trained" for m in models),
+        "skipped": sum(m["status"] == "skipped" for m in models),
+        "failed": sum(m["status"] == "failed" for m in models),
+        "models": models,
+    }
+
+def train_all_models(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Retrain N-BEATS models in parallel")
+    parser.add_argument("--pairs", nargs="+", default=FOREX_PAIRS)
+    parser.add_argument("--intervals", nargs="+", default=INTERVALS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Training processes")
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="Torch threads per process (default: cores / workers)")
+    parser.add_argument("--model-dir", default=FORECAST_MODEL_DIR)
+    parser.add_argument("--force", action="store_true", help="Retrain even if the data is unchanged")
+    parser.add_argument("--summary", help=f"Summary JSON path (default: <model-dir>/{SUMMARY_FILE})")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_training(args))
+    summary_path = args.summary or os.path.join(args.model_dir, SUMMARY_FILE)
+    save_json(summary_path, summary)
+
+    print(f"\n{summary['trained']} trained, {summary['skipped']} skipped, {summary['failed']} failed "
+          f"in {summary['total_seconds']}s ({summary['workers']} workers x {summary['threads_per_worker']} threads)")
+    print(f"Summary saved to {summary_path}")
+    return 1 if summary["failed"] else 0
+
 if __name__ == "__main__":
-    train_all_models()
\ No newline at end of file
+    sys.exit(train_all_models())
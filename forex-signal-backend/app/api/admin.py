@@ -0,0 +1,32 @@
+import os
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.core.config import PROFILE_DIR
+from app.core.profiling import start_window, list_captures, token_matches
+
+def require_profiling_token(x_profile_token: str = Header(None)):
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_profiling_token)])
+
+@router.post("/profile/window")
+def profile_window(seconds: float = Query(10.0, gt=0, le=300),
+                   interval_ms: float = Query(5.0, ge=1, le=1000)):
+    capture_id = start_window(seconds, interval_ms / 1000)
+    if capture_id is None:
+        raise HTTPException(status_code=409, detail="Another capture is in progress")
+    return {"capture_id": capture_id, "ready_in_seconds": seconds}
+
+@router.get("/profiles")
+def get_profiles():
+    return {"captures": list_captures()}
+
+@router.get("/profiles/{capture_id}/{filename}")
+def download_profile(capture_id: str, filename: str):
+    if os.path.basename(filename) != filename or not filename.startswith(f"{capture_id}."):
+        raise HTTPException(status_code=400, detail="Invalid artifact name")
+    path = os.path.join(PROFILE_DIR, filename)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return FileResponse(path, filename=filename)
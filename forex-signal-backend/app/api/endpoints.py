@@ -1,81 +1,90 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
+from typing import Optional
 import os
 import pandas as pd
+from datetime import datetime, timedelta
 from fastapi.responses import JSONResponse
-from app.services.data_fetcher import fetch_ohlcv, fetch_currency_pairs
+from fxshared.responses import FastJSONResponse, negotiated_response
+from app.services.data_fetcher import fetch_ohlcv, governor
 from app.services.predictor import make_prediction
-from app.db.database import SessionLocal
-from app.models.prediction import Prediction
-from fastapi.responses import JSONResponse
+from app.services.catalog import catalog
+from app.services.model_registry import registry
+from app.services.prediction_store import recent_predictions, query_rollups
+from app.services.outcome_tracker import accuracy_report
+from app.core.config import OUTCOME_HORIZON_BARS, OUTCOME_RETURN_THRESHOLD
+from app.core.metrics import REQUEST_LATENCY, metric_labels, series_labels
+from app.core.profiling import profiled
 
 router = APIRouter(prefix="/api")
 
 @router.get("/signal")
-def get_signal(pair: str = Query("EUR/USD"), tf: str = Query("15min")):
+@profiled
+def get_signal(pair: str = Query("EUR/USD"), tf: str = Query("15min"),
+               tier: str = Query("full", pattern="^(full|fast)$")):
+    error = catalog.validate(pair, tf, tier)
+    if error:
+        return JSONResponse(status_code=400, content={"error": error})
     try:
-        df = fetch_ohlcv(pair, tf)
-        prediction = make_prediction(df, symbol=pair, timeframe=tf)
-        return {
+        endpoint = "signal" if tier == "full" else f"signal_{tier}"
+        with REQUEST_LATENCY.labels(endpoint, *series_labels(pair, tf)).time(), metric_labels(pair, tf):
+            df = fetch_ohlcv(pair, tf)
+            prediction = make_prediction(df, symbol=pair, timeframe=tf, tier=tier)
+        return FastJSONResponse({
             "pair": pair,
             "timeframe": tf,
+            "tier": tier,
             "prediction": prediction,
-        }
+        })
     except Exception as e:
         return {"error": str(e)}
 
 @router.get("/pairs")
 def get_supported_pairs():
-    try:
-        selected_pairs = [
-            "AUD/CAD", "AUD/JPY", "AUD/USD",
-            "CAD/JPY",
-            "CHF/JPY",
-            "EUR/AUD", "EUR/CAD", "EUR/CHF", "EUR/GBP", "EUR/JPY", "EUR/USD",
-            "GBP/AUD", "GBP/CAD", "GBP/JPY", "GBP/USD",
-            "NZD/USD",
-            "USD/CAD", "USD/CHF", "USD/JPY", "USD/THB", "USD/INR",
-            "XAU/USD",
-        ]
-        
-        available_pairs = fetch_currency_pairs()
-        
-        normalized_selected = [p.replace("/", "") for p in selected_pairs]
-        normalized_available = [p.replace("/", "") for p in available_pairs]
-        
-        valid_pairs = [
-            selected_pairs[i] 
-            for i, p in enumerate(normalized_selected) 
-            if p in normalized_available
-        ]
-        
-        return {"pairs": valid_pairs}
-    except Exception as e:
-        return {"error": str(e)}
+    if catalog.vendor_pairs is None:
+        return {"error": "Vendor pair list not loaded yet"}
+    return {"pairs": catalog.pairs, "timeframes": catalog.timeframes()}
+
+@router.get("/models")
+def get_models():
+    return {
+        "models": [bundle.to_dict() for bundle in catalog.bundles.values()],
+        "invalid": catalog.invalid,
+        "loaded": registry.loaded(),
+    }
     
 @router.get("/history")
-def get_prediction_history(limit: int = 50):
-    db = SessionLocal()
+def get_prediction_history(request: Request,
+                           limit: int = 50,
+                           format: Optional[str] = Query(None, pattern="^(json|msgpack)$")):
+    try:
+        return negotiated_response(recent_predictions(limit), request, format)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.get("/history/rollups")
+def get_prediction_rollups(request: Request,
+                           granularity: str = Query("hour", pattern="^(hour|day)$"),
+                           pair: Optional[str] = None,
+                           tf: Optional[str] = None,
+                           days: int = Query(7, ge=1),
+                           format: Optional[str] = Query(None, pattern="^(json|msgpack)$")):
     try:
-        records = (
-            db.query(Prediction)
-            .order_by(Prediction.timestamp.desc())
-            .limit(limit)
-            .all()
-        )
-        
-        return [
-            {
-                "timestamp": record.timestamp,
-                "symbol": record.symbol,
-                "timeframe": record.timeframe,
-                "signal": record.signal,
-                "cnn_lstm_probs": record.cnn_lstm_probs,
-                "xgb_probs": record.xgb_probs,
-                "hybrid_probs": record.hybrid_probs
-            }
-            for record in records
-        ]
+        since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=days)
+        return negotiated_response(query_rollups(granularity, pair, tf, since), request, format)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
-    finally:
-        db.close()
\ No newline at end of file
+
+@router.get("/accuracy")
+def get_accuracy(pair: Optional[str] = None, tf: Optional[str] = None):
+    try:
+        return {
+            "horizon_bars": OUTCOME_HORIZON_BARS,
+            "return_threshold": OUTCOME_RETURN_THRESHOLD,
+            "models": accuracy_report(pair, tf),
+        }
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.get("/credits")
+def get_credit_status():
+    return governor.status()
\ No newline at end of file
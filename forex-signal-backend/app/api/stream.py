@@ -0,0 +1,117 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import STREAM_KEEPALIVE_SECONDS
+from app.services.catalog import catalog
+from app.services.signal_stream import broadcaster, timeframe_to_timedelta
+
+router = APIRouter(prefix="/api/stream")
+
+def _parse_since(value: Optional[str]) -> Optional[datetime]:
+    """Bar timestamps are naive UTC; an aware `since` is converted to that"""
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid since timestamp: {value!r}")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+def _check_topic(pair: str, tf: str, since: Optional[str]) -> Optional[datetime]:
+    """Resume point for a subscription; raises ValueError before any topic is created for bad input"""
+    error = catalog.validate(pair, tf)
+    if error:
+        raise ValueError(error)
+    timeframe_to_timedelta(tf)
+    return _parse_since(since)
+
+@router.get("/sse")
+async def stream_sse(pair: str = Query("EUR/USD"),
+                     tf: str = Query("15min"),
+                     since: Optional[str] = Query(None, description="Resume after this bar timestamp"),
+                     last_event_id: Optional[str] = Header(None)):
+    """Server-sent events: one `signal` event per closed bar; the event id is the bar timestamp"""
+    try:
+        resume_from = _check_topic(pair, tf, since or last_event_id)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    subscriber = broadcaster.subscribe(pair, tf, resume_from)
+
+    async def events():
+        try:
+            while True:
+                event = await subscriber.next_event(timeout=STREAM_KEEPALIVE_SECONDS)
+                yield event.sse if event is not None else b": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/ws")
+async def stream_ws(websocket: WebSocket):
+    """Multiplexed topics over one socket.
+
+    Client messages: {"action": "subscribe", "pair": "EUR/USD", "tf": "15min", "since": "<bar time>"}
+    and {"action": "unsubscribe", "pair": ..., "tf": ...}. Each signal is sent as the
+    same JSON document the SSE stream carries in its data field.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    subscriptions = {}
+
+    async def send(document: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(document)
+
+    async def forward(subscriber):
+        try:
+            while True:
+                event = await subscriber.next_event()
+                async with send_lock:
+                    await websocket.send_bytes(event.json)
+        except (WebSocketDisconnect, RuntimeError):
+            # The client went away mid-send; the receive loop sees the disconnect and cleans up
+            pass
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                await send({"error": "Messages must be JSON objects"})
+                continue
+            if not isinstance(message, dict):
+                await send({"error": "Messages must be JSON objects"})
+                continue
+            key = (message.get("pair"), message.get("tf"))
+            if not all(isinstance(part, str) for part in key):
+                await send({"error": "pair and tf are required strings"})
+                continue
+            action = message.get("action")
+
+            if action == "subscribe" and key not in subscriptions:
+                try:
+                    resume_from = _check_topic(key[0], key[1], message.get("since"))
+                except ValueError as e:
+                    await send({"error": str(e), "pair": key[0], "tf": key[1]})
+                    continue
+                subscriber = broadcaster.subscribe(key[0], key[1], resume_from)
+                subscriptions[key] = (subscriber, asyncio.create_task(forward(subscriber)))
+            elif action == "unsubscribe" and key in subscriptions:
+                subscriber, task = subscriptions.pop(key)
+                task.cancel()
+                broadcaster.unsubscribe(subscriber)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: receive or send on a socket Starlette already saw close
+        pass
+    finally:
+        for subscriber, task in subscriptions.values():
+            task.cancel()
+            broadcaster.unsubscribe(subscriber)
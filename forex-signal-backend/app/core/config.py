@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,4 +7,86 @@ load_dotenv()
 TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 
 if not TWELVE_DATA_API_KEY:
-    raise Exception("Missing Twelve Data API key")
\ No newline at end of file
+    raise Exception("Missing Twelve Data API key")
+
+# Point at a local stand-in (see loadtest/stub_server.py) to avoid spending credits
+TWELVE_DATA_BASE_URL = os.getenv("TWELVE_DATA_BASE_URL", "https://api.twelvedata.com").rstrip("/")
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "30"))
+
+# Twelve Data credit budget, shared by every process on the host (both apps and
+# the batch scripts) through one SQLite file; see fxshared/credit_governor.py.
+# Batch jobs leave the live reserve untouched and wait up to BATCH_MAX_WAIT_SECONDS
+# per call for budget; the breaker opens after BREAKER_FAILURE_THRESHOLD
+# consecutive upstream errors, for BREAKER_COOLDOWN_SECONDS.
+CREDIT_DB_PATH = os.getenv("CREDIT_DB_PATH", os.path.join(tempfile.gettempdir(), "twelvedata_credits.sqlite"))
+CREDITS_PER_MINUTE = int(os.getenv("CREDITS_PER_MINUTE", "8"))
+CREDITS_PER_DAY = int(os.getenv("CREDITS_PER_DAY", "800"))
+LIVE_RESERVE_PER_MINUTE = int(os.getenv("LIVE_RESERVE_PER_MINUTE", "2"))
+LIVE_RESERVE_PER_DAY = int(os.getenv("LIVE_RESERVE_PER_DAY", "200"))
+BATCH_MAX_WAIT_SECONDS = float(os.getenv("BATCH_MAX_WAIT_SECONDS", "600"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "60"))
+
+# Shared-memory bar cache filled by feed_bars.py (see fxshared/bar_cache.py).
+# When enabled, fetch_ohlcv reads from it and only calls the vendor when the
+# series is missing, too short, or older than one bar plus the grace period.
+BAR_CACHE_ENABLED = os.getenv("BAR_CACHE_ENABLED", "0") == "1"
+BAR_CACHE_PREFIX = os.getenv("BAR_CACHE_PREFIX", "fxbars")
+BAR_CACHE_CAPACITY = int(os.getenv("BAR_CACHE_CAPACITY", "5000"))
+BAR_CACHE_GRACE_SECONDS = float(os.getenv("BAR_CACHE_GRACE_SECONDS", "120"))
+
+# Derive 30min/1h bars from the 15min series instead of separate vendor calls
+# (see app/services/resampler.py). The vendor caps outputsize at 5000 base
+# bars, so derived series are shorter: 2500 x 30min, 1250 x 1h.
+RESAMPLE_ENABLED = os.getenv("RESAMPLE_ENABLED", "0") == "1"
+RESAMPLE_BASE_INTERVAL = os.getenv("RESAMPLE_BASE_INTERVAL", "15min")
+
+# Model catalog and vendor pair list refresh (see app/services/catalog.py)
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "3600"))
+CATALOG_RETRY_SECONDS = float(os.getenv("CATALOG_RETRY_SECONDS", "60"))
+
+# Loaded model bundles are checked for a new version on disk this often and
+# swapped in without a restart (see app/services/model_registry.py)
+BUNDLE_POLL_SECONDS = float(os.getenv("BUNDLE_POLL_SECONDS", "10"))
+
+# Cascade inference: serve the raw XGBoost signal and skip the CNN-LSTM when its
+# confidence reaches the bundle's calibrated threshold (app/ml/train/calibrate_cascade.py;
+# bundles without one always run the hybrid). CASCADE_SHADOW_RATE of the skipped
+# requests run the hybrid anyway, unserved, to measure agreement.
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "0") == "1"
+CASCADE_SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", "0.05"))
+
+# Prediction log: per-day partitions kept this many days (0 = forever), and how
+# often retention and the hourly/daily rollups run (see app/services/prediction_store.py)
+PREDICTION_RETENTION_DAYS = int(os.getenv("PREDICTION_RETENTION_DAYS", "90"))
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "300"))
+
+# Live accuracy (see app/services/outcome_tracker.py): a prediction is scored
+# against the close OUTCOME_HORIZON_BARS bars later; returns within +/- the
+# threshold count as HOLD. Changing either does not rewrite existing counts.
+OUTCOME_HORIZON_BARS = int(os.getenv("OUTCOME_HORIZON_BARS", "4"))
+OUTCOME_RETURN_THRESHOLD = float(os.getenv("OUTCOME_RETURN_THRESHOLD", "0.0005"))
+OUTCOME_INTERVAL_SECONDS = float(os.getenv("OUTCOME_INTERVAL_SECONDS", "300"))
+OUTCOME_CALIBRATION_BINS = int(os.getenv("OUTCOME_CALIBRATION_BINS", "10"))
+OUTCOME_BATCH_SIZE = int(os.getenv("OUTCOME_BATCH_SIZE", "5000"))
+# Only the worker holding this lock tracks outcomes; the others retry it every interval
+OUTCOME_LOCK_PATH = os.getenv("OUTCOME_LOCK_PATH", f"{CREDIT_DB_PATH}.outcomes.lock")
+
+# Opt-in request/window profiling (see app/core/profiling.py)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("app", "profiles"))
+
+if PROFILING_ENABLED and not PROFILING_TOKEN:
+    raise Exception("PROFILING_ENABLED requires PROFILING_TOKEN")
+
+# Signal streaming: bars of history kept for resume, and how long after a bar
+# close to wait before asking the vendor for it
+STREAM_HISTORY = int(os.getenv("STREAM_HISTORY", "96"))
+STREAM_SETTLE_SECONDS = float(os.getenv("STREAM_SETTLE_SECONDS", "5"))
+STREAM_RETRY_SECONDS = float(os.getenv("STREAM_RETRY_SECONDS", "10"))
+STREAM_MAX_RETRIES = int(os.getenv("STREAM_MAX_RETRIES", "6"))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
@@ -0,0 +1,38 @@
+import json
+import logging
+from app.core.config import LOG_LEVEL, LOG_FORMAT
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class StructuredFormatter(logging.Formatter):
+    """Render `extra=` fields as key=value pairs (text) or as one JSON object per line"""
+    def __init__(self, as_json: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: v for k, v in vars(record).items() if k not in _RESERVED}
+        if self.as_json:
+            payload = {
+                "ts": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+def configure_logging() -> None:
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(as_json=LOG_FORMAT == "json"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import FrozenSet, Iterable, Optional, Tuple
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the CNN forward pass and upstream fetch sit in the upper buckets
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_LATENCY = Histogram(
+    "signal_stage_duration_seconds",
+    "Latency of each stage of the signal pipeline",
+    ["stage", "pair", "timeframe"],
+    buckets=STAGE_BUCKETS,
+)
+
+REQUEST_LATENCY = Histogram(
+    "signal_request_duration_seconds",
+    "End-to-end latency of signal API requests",
+    ["endpoint", "pair", "timeframe"],
+    buckets=STAGE_BUCKETS,
+)
+
+STREAM_SUBSCRIBERS = Gauge(
+    "signal_stream_subscribers",
+    "Connected stream subscribers per topic",
+    ["pair", "timeframe"],
+    multiprocess_mode="livesum",
+)
+
+STREAM_DROPPED = Counter(
+    "signal_stream_dropped_total",
+    "Stale stream updates dropped because a subscriber had not read the previous one",
+    ["pair", "timeframe"],
+)
+
+UPSTREAM_FALLBACK = Counter(
+    "signal_upstream_fallback_total",
+    "Fetches answered with the last good bars because the upstream was out of credits or unhealthy",
+    ["pair", "timeframe", "kind"],
+)
+
+CASCADE_PATH = Counter(
+    "signal_cascade_path_total",
+    "Signals by the path that produced them: hybrid, raw_xgb when the cascade skipped the CNN-LSTM, "
+    "or student for tier=fast",
+    ["pair", "timeframe", "path"],
+)
+
+CASCADE_SHADOW = Counter(
+    "signal_cascade_shadow_total",
+    "Sampled cascade skips re-run through the hybrid, by whether the hybrid agreed with the served signal",
+    ["pair", "timeframe", "agreed"],
+)
+
+BUNDLE_SWAPS = Counter(
+    "signal_model_bundle_swaps_total",
+    "Model bundles replaced in memory after a new version appeared on disk",
+    ["pair", "timeframe"],
+)
+
+_labels: ContextVar[Tuple[str, str]] = ContextVar("metric_labels", default=("", ""))
+_label_values: Optional[Tuple[FrozenSet[str], FrozenSet[str]]] = None
+
+def allow_label_values(pairs: Iterable[str], timeframes: Iterable[str]) -> None:
+    """Pairs and timeframes that may appear as metric labels; the catalog sets them on every scan"""
+    global _label_values
+    _label_values = (frozenset(pairs), frozenset(timeframes))
+
+def series_labels(pair: str, timeframe: str) -> Tuple[str, str]:
+    """(pair, timeframe) label values, with anything not served collapsed to "other" so request
+    input cannot create new series; passed through until the catalog has scanned (batch scripts)"""
+    allowed = _label_values
+    if allowed is None:
+        return pair, timeframe
+    return (pair if pair in allowed[0] else "other", timeframe if timeframe in allowed[1] else "other")
+
+@contextmanager
+def metric_labels(pair: str, timeframe: str):
+    """Set the (pair, timeframe) used by `timed` spans opened further down the call stack"""
+    token = _labels.set(series_labels(pair, timeframe))
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+@contextmanager
+def timed(stage: str, pair: Optional[str] = None, timeframe: Optional[str] = None):
+    """Time a pipeline stage into STAGE_LATENCY and emit a debug span record"""
+    if pair is None or timeframe is None:
+        pair, timeframe = _labels.get()
+    else:
+        pair, timeframe = series_labels(pair, timeframe)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage, pair, timeframe).observe(elapsed)
+        logger.debug("span", extra={"stage": stage, "pair": pair, "timeframe": timeframe,
+                                    "duration_ms": round(elapsed * 1000, 3)})
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition for /metrics; aggregates across uvicorn workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,224 @@
+"""On-demand profiling for slow pairs in production.
+
+Disabled unless PROFILING_ENABLED=1. When disabled, `profiled` returns the
+endpoint untouched and neither the middleware nor the admin routes are
+mounted, so the serving path is exactly what it would be without this module.
+
+When enabled:
+  * a request carrying `X-Profile-Token: <PROFILING_TOKEN>` runs its endpoint
+    under cProfile and tracemalloc. The response carries `X-Profile-Status`:
+    "captured" with the capture's `X-Profile-Id`, "busy" when another capture
+    was running, or "unprofiled" for an endpoint without @profiled
+  * POST /admin/profile/window?seconds=N samples every thread's stack for N
+    seconds (plus tracemalloc) without touching the request path
+  * GET /admin/profiles lists captures, GET /admin/profiles/{id}/{file}
+    downloads them (`.prof` opens in snakeviz, `.folded` in flamegraph.pl)
+"""
+import cProfile
+import functools
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import PROFILING_ENABLED, PROFILING_TOKEN, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 60
+
+class _ProfileRequest:
+    """Shared by the middleware and the endpoint's worker thread, which sees a copy of the context"""
+    __slots__ = ("capture_id", "status")
+
+    def __init__(self, capture_id: str):
+        self.capture_id = capture_id
+        self.status = "unprofiled"
+
+_requested: ContextVar[Optional[_ProfileRequest]] = ContextVar("profile_request", default=None)
+# tracemalloc and the artifact directory are process-wide, so one capture at a time
+_capture_lock = threading.Lock()
+
+def _new_capture_id(kind: str) -> str:
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S}-{kind}-{uuid.uuid4().hex[:8]}"
+
+def _write_text(capture_id: str, suffix: str, text: str) -> None:
+    with open(os.path.join(PROFILE_DIR, f"{capture_id}{suffix}"), "w") as f:
+        f.write(text)
+
+def _save_tracemalloc(capture_id: str, snapshot: tracemalloc.Snapshot) -> None:
+    snapshot.dump(os.path.join(PROFILE_DIR, f"{capture_id}.tracemalloc"))
+    lines = [f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {stat.traceback}"
+             for stat in snapshot.statistics("lineno")[:TOP_N]]
+    _write_text(capture_id, ".alloc.txt", "\n".join(lines) + "\n")
+
+def _start_tracemalloc() -> bool:
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(25)
+    return True
+
+def _run_profiled(capture_id: str, fn, *args, **kwargs):
+    profiler = cProfile.Profile()
+    started_tracing = _start_tracemalloc()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{capture_id}.prof"))
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(TOP_N)
+        _write_text(capture_id, ".txt", report.getvalue())
+        _save_tracemalloc(capture_id, snapshot)
+        logger.info("request profile captured", extra={"capture_id": capture_id})
+
+def profiled(fn):
+    """Run flagged requests of a sync endpoint under cProfile + tracemalloc.
+
+    Applied at import time: with profiling disabled this returns `fn` itself.
+    The profiler has to be enabled on the worker thread that runs the
+    endpoint, which is why this wraps the endpoint rather than living in the
+    middleware.
+    """
+    if not PROFILING_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        request = _requested.get()
+        if request is None:
+            return fn(*args, **kwargs)
+        if not _capture_lock.acquire(blocking=False):
+            request.status = "busy"
+            return fn(*args, **kwargs)
+        try:
+            request.status = "captured"
+            return _run_profiled(request.capture_id, fn, *args, **kwargs)
+        finally:
+            _capture_lock.release()
+
+    return wrapper
+
+def token_matches(token) -> bool:
+    """Constant-time check of a presented profiling token (str or raw header bytes)"""
+    if not token or not PROFILING_TOKEN:
+        return False
+    if isinstance(token, str):
+        token = token.encode()
+    return hmac.compare_digest(token, PROFILING_TOKEN.encode())
+
+class ProfileRequestMiddleware:
+    """Flag requests carrying the profiling token and report whether (and as what) they were captured"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        token = headers.get(b"x-profile-token")
+        if not token_matches(token):
+            return await self.app(scope, receive, send)
+
+        request = _ProfileRequest(_new_capture_id("request"))
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                # The endpoint has returned by now, so the request's status is final
+                headers = list(message.get("headers") or []) + [(b"x-profile-status", request.status.encode())]
+                if request.status == "captured":
+                    headers.append((b"x-profile-id", request.capture_id.encode()))
+                message["headers"] = headers
+            await send(message)
+
+        reset = _requested.set(request)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _requested.reset(reset)
+
+class SamplingProfiler(threading.Thread):
+    """Sample the stacks of all other threads and aggregate them as folded stacks"""
+    def __init__(self, capture_id: str, seconds: float, interval: float):
+        super().__init__(name=f"profiler-{capture_id}", daemon=True)
+        self.capture_id = capture_id
+        self.seconds = seconds
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+
+    def run(self):
+        with _capture_lock:
+            started_tracing = _start_tracemalloc()
+            try:
+                self._sample()
+                snapshot = tracemalloc.take_snapshot()
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+            self._save(snapshot)
+
+    def _sample(self):
+        me = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def _save(self, snapshot: tracemalloc.Snapshot):
+        _write_text(self.capture_id, ".folded",
+                    "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()))
+
+        leaf_counts = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaf_counts.values()) or 1
+        lines = [f"{self.samples} sampling rounds over {self.seconds}s every {self.interval * 1000:.1f}ms", ""]
+        lines += [f"{count / total * 100:6.2f}%  {count:7d}  {frame}" for frame, count in leaf_counts.most_common(TOP_N)]
+        _write_text(self.capture_id, ".txt", "\n".join(lines) + "\n")
+
+        _save_tracemalloc(self.capture_id, snapshot)
+        logger.info("window profile captured", extra={"capture_id": self.capture_id})
+
+def start_window(seconds: float, interval: float) -> Optional[str]:
+    """Start a sampling capture in the background; None when another capture is running"""
+    if _capture_lock.locked():
+        return None
+    capture_id = _new_capture_id("window")
+    SamplingProfiler(capture_id, seconds, interval).start()
+    return capture_id
+
+def list_captures() -> dict:
+    captures = {}
+    for name in sorted(os.listdir(PROFILE_DIR)):
+        capture_id = name.split(".", 1)[0]
+        captures.setdefault(capture_id, []).append(name)
+    return captures
+
+if PROFILING_ENABLED:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
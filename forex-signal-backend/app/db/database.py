@@ -1,7 +1,8 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./forex_signals.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./forex_signals.db")
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False}
@@ -1,11 +1,67 @@
 import sys
+import json
+from datetime import datetime
 from pathlib import Path
 
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
+from sqlalchemy import inspect, text
 from app.db.database import Base, engine
+from app.models import PredictionRollup, OutcomeCount  # noqa: F401  (registers the tables)
+from app.services.prediction_store import prediction_row, insert_rows, refresh_rollups, migrate_partitions
+
+LEGACY_TABLE = "predictions"
+BATCH_SIZE = 5000
+
+def _probs(value):
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or []
+
+def _timestamp(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+def migrate_legacy_predictions() -> int:
+    """Move rows of the old single `predictions` table (JSON probabilities) into day partitions
+
+    Each batch is copied and deleted from the old table in one transaction, so
+    an interrupted run can simply be started again: it neither loses nor
+    duplicates rows. The old table is dropped once it is empty.
+    """
+    if LEGACY_TABLE not in inspect(engine).get_table_names():
+        return 0
+    moved = 0
+    while True:
+        # Read on its own connection so no read lock stays open while partitions are created
+        with engine.connect() as conn:
+            batch = conn.execute(text(
+                f"SELECT id, timestamp, symbol, timeframe, signal, cnn_lstm_probs, xgb_probs, hybrid_probs "
+                f"FROM {LEGACY_TABLE} ORDER BY id LIMIT {BATCH_SIZE}"
+            )).all()
+        if not batch:
+            break
+        rows = [
+            prediction_row(_timestamp(row.timestamp), row.symbol, row.timeframe, row.signal, {
+                "cnn_lstm_probs": _probs(row.cnn_lstm_probs),
+                "xgb_probs": _probs(row.xgb_probs),
+                "hybrid_probs": _probs(row.hybrid_probs),
+            })
+            for row in batch
+        ]
+        with engine.begin() as conn:
+            insert_rows(rows, conn)
+            conn.execute(text(f"DELETE FROM {LEGACY_TABLE} WHERE id <= :last_id"), {"last_id": batch[-1].id})
+        moved += len(batch)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+    return moved
 
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
-    print("✅ Database and tables created")
\ No newline at end of file
+    migrate_partitions()
+    moved = migrate_legacy_predictions()
+    if moved:
+        print(f"✅ Moved {moved} predictions into daily partitions")
+    refresh_rollups()
+    print("✅ Database and tables created")
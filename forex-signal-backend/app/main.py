@@ -1,10 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fxshared.responses import FastJSONResponse
 from app.api.endpoints import router
+from app.api.metrics import router as metrics_router
+from app.api.stream import router as stream_router
+from app.core.logging_config import configure_logging
+from app.core.config import PROFILING_ENABLED
+from app.services.signal_stream import broadcaster
+from app.services.catalog import catalog
+from app.services.model_registry import registry
+from app.services.prediction_store import maintenance, migrate_partitions
+from app.services.outcome_tracker import tracker, migrate_cursors
 from app.db.database import Base, engine
+configure_logging()
 Base.metadata.create_all(bind=engine)
+migrate_partitions()
+migrate_cursors()
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,4 +27,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(router)
\ No newline at end of file
+app.include_router(router)
+app.include_router(metrics_router)
+app.include_router(stream_router)
+
+@app.on_event("startup")
+async def load_catalog():
+    await catalog.start()
+    await registry.start()
+    await maintenance.start()
+    await tracker.start()
+
+@app.on_event("shutdown")
+async def stop_streams():
+    await broadcaster.close()
+    await catalog.close()
+    await registry.close()
+    await maintenance.close()
+    await tracker.close()
+
+if PROFILING_ENABLED:
+    from app.api.admin import router as admin_router
+    from app.core.profiling import ProfileRequestMiddleware
+
+    app.add_middleware(ProfileRequestMiddleware)
+    app.include_router(admin_router)
\ No newline at end of file
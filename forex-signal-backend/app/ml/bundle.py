@@ -0,0 +1,320 @@
+"""Single-file model bundle: every artifact of one pair/timeframe in `bundle.fxb`.
+
+Layout (little endian):
+
+    b"FXBUNDLE" | u32 format | u32 0 | u64 manifest length | u64 data offset
+    manifest (UTF-8 JSON) | zero padding | sections, each ALIGN-aligned
+
+The manifest carries the bundle version, the model shapes the catalog checks
+and, per section, its offset (from the data offset), length and SHA-256.
+Sections are either raw bytes (CNN-LSTM config, XGBoost UBJSON) or arrays
+with dtype and shape (CNN-LSTM weights, scaler parameters, label classes);
+arrays are read as zero-copy views of a read-only mmap. Scalers and the label
+encoder are rebuilt from their arrays, so loading a bundle unpickles nothing.
+
+A bundle is written to a temporary name and moved into place with os.replace,
+so a reader sees the old file or the new one, never a mix. The loose files a
+trainer writes (cnn_lstm_model.h5, xgb_model.json, scaler.save, ...) can still
+be loaded as a ModelBundle and are packed with app/ml/train/pack_bundle.py.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import tensorflow as tf
+import xgboost as xgb
+from keras.models import load_model, model_from_json
+from sklearn.preprocessing import LabelEncoder, MinMaxScaler
+
+BUNDLE_FILE = "bundle.fxb"
+MAGIC = b"FXBUNDLE"
+FORMAT_VERSION = 1
+ALIGN = 64
+_HEADER = struct.Struct("<8sIIQQ")
+
+LOOSE_HYBRID = ["cnn_lstm_model.h5", "xgb_model.json", "scaler.save"]
+LOOSE_RAW_XGB = ["xgb_raw_model.json", "xgb_raw_scaler.save", "label_encoder.save"]
+LOOSE_STUDENT = "student_model.json"  # optional, app/ml/student.py
+
+class BundleError(ValueError):
+    """Unreadable, truncated or corrupt bundle file"""
+
+class ModelBundle:
+    """Everything inference needs for one pair/timeframe, loaded once and replaced as a whole
+
+    A packed bundle builds its CNN-LSTM from the mapped file on first use
+    (`cnn_loader`), so one only serving the fast tier (the student) never does.
+    """
+    __slots__ = ("version", "manifest", "_cnn", "_cnn_loader", "_cnn_lock", "_feature_extractor", "xgb", "scaler",
+                 "raw_xgb", "raw_scaler", "label_encoder", "student", "source")
+
+    def __init__(self, cnn, xgb_model, scaler, raw_xgb=None, raw_scaler=None, label_encoder=None,
+                 student=None, version=None, manifest=None, source=None, cnn_loader=None):
+        self._cnn = None
+        self._cnn_loader = cnn_loader
+        self._cnn_lock = threading.Lock()
+        self._feature_extractor = None
+        if cnn is not None:
+            self._set_cnn(cnn)
+        self.xgb = xgb_model
+        self.scaler = scaler
+        self.raw_xgb = raw_xgb
+        self.raw_scaler = raw_scaler
+        self.label_encoder = label_encoder
+        self.student = student
+        self.version = version
+        self.manifest = manifest or {}
+        self.source = source
+
+    def _set_cnn(self, cnn) -> None:
+        self._feature_extractor = tf.keras.Model(inputs=cnn.inputs, outputs=cnn.layers[-2].output)
+        self._cnn = cnn
+
+    @property
+    def cnn(self):
+        if self._cnn is None:
+            with self._cnn_lock:
+                if self._cnn is None:
+                    self._set_cnn(self._cnn_loader())
+        return self._cnn
+
+    @property
+    def feature_extractor(self):
+        self.cnn
+        return self._feature_extractor
+
+    @property
+    def cnn_loaded(self) -> bool:
+        return self._cnn is not None
+
+    @property
+    def cascade_threshold(self) -> Optional[float]:
+        """Raw XGBoost confidence at which the CNN-LSTM may be skipped (app/ml/cascade.py); None if uncalibrated"""
+        return (self.manifest.get("cascade") or {}).get("threshold")
+
+# --- scalers and label encoder as arrays ---
+
+_SCALER_ARRAYS = ["scale_", "min_", "data_min_", "data_max_"]
+
+def _scaler_sections(prefix: str, scaler: MinMaxScaler) -> Dict[str, np.ndarray]:
+    return {f"{prefix}/{name}": np.asarray(getattr(scaler, name), dtype=np.float64) for name in _SCALER_ARRAYS}
+
+def _scaler_meta(scaler: MinMaxScaler) -> dict:
+    names = getattr(scaler, "feature_names_in_", None)
+    return {
+        "feature_range": [float(v) for v in scaler.feature_range],
+        "feature_names": [str(name) for name in names] if names is not None else None,
+    }
+
+def _scaler_from(bundle_file: "BundleFile", prefix: str, meta: dict) -> MinMaxScaler:
+    scaler = MinMaxScaler(feature_range=tuple(meta["feature_range"]))
+    for name in _SCALER_ARRAYS:
+        setattr(scaler, name, bundle_file.array(f"{prefix}/{name}"))
+    scaler.data_range_ = scaler.data_max_ - scaler.data_min_
+    scaler.n_features_in_ = len(scaler.scale_)
+    if meta.get("feature_names") is not None:
+        scaler.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+    return scaler
+
+def student_meta(student: xgb.Booster) -> dict:
+    """Lags and fidelity report a student booster carries as attributes (app/ml/student.py); None if unset"""
+    lags, fidelity = student.attr("lags"), student.attr("fidelity")
+    return {
+        "lags": [int(lag) for lag in lags.split(",")] if lags else None,
+        "fidelity": json.loads(fidelity) if fidelity else None,
+    }
+
+# --- writing ---
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+def write_bundle(path: str, sections: Dict[str, object], meta: dict) -> dict:
+    """Write bytes/ndarray `sections` plus `meta` as one bundle file, atomically; returns the manifest"""
+    entries, blobs, offset = {}, [], 0
+    for name, value in sections.items():
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            blob = array.tobytes()
+            entry = {"dtype": array.dtype.str, "shape": list(array.shape)}
+        else:
+            blob = bytes(value)
+            entry = {}
+        entry.update(offset=offset, length=len(blob), sha256=hashlib.sha256(blob).hexdigest())
+        entries[name] = entry
+        blobs.append(blob)
+        offset += len(blob) + _pad(len(blob))
+
+    manifest = dict(meta, format=FORMAT_VERSION, sections=entries)
+    encoded = json.dumps(manifest, sort_keys=True).encode()
+    data_offset = _HEADER.size + len(encoded) + _pad(_HEADER.size + len(encoded))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(encoded), data_offset))
+        f.write(encoded)
+        f.write(b"\0" * _pad(_HEADER.size + len(encoded)))
+        for blob in blobs:
+            f.write(blob)
+            f.write(b"\0" * _pad(len(blob)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return manifest
+
+def save_bundle(path: str, bundle: ModelBundle, version: Optional[int] = None, **meta) -> dict:
+    """Pack an in-memory ModelBundle; the version defaults to one past the file being replaced"""
+    if version is None:
+        version = read_manifest(path)["version"] + 1 if os.path.exists(path) else 1
+    cnn = bundle.cnn
+    weights = cnn.get_weights()
+    sections: Dict[str, object] = {"cnn/config": cnn.to_json().encode()}
+    sections.update({f"cnn/weight/{i:03d}": w for i, w in enumerate(weights)})
+    sections["xgb"] = bundle.xgb.save_raw("ubj")
+    sections.update(_scaler_sections("scaler", bundle.scaler))
+
+    raw_xgb = bundle.raw_xgb is not None
+    if raw_xgb:
+        sections["raw_xgb"] = bundle.raw_xgb.save_raw("ubj")
+        sections.update(_scaler_sections("raw_scaler", bundle.raw_scaler))
+        sections["label_classes"] = np.asarray(bundle.label_encoder.classes_)
+    if bundle.student is not None:
+        # Its lags and fidelity report are booster attributes and are saved with it
+        sections["student"] = bundle.student.save_raw("ubj")
+
+    scaler_meta = _scaler_meta(bundle.scaler)
+    meta.update(
+        version=int(version),
+        created_at=datetime.utcnow().isoformat(timespec="seconds"),
+        sequence_length=int(cnn.input_shape[1]),
+        n_inputs=int(cnn.input_shape[2]),
+        feature_size=int(cnn.layers[-2].output.shape[-1]),
+        feature_columns=scaler_meta["feature_names"],
+        cnn_weights=len(weights),
+        scaler=scaler_meta,
+        raw_xgb=raw_xgb,
+        raw_scaler=_scaler_meta(bundle.raw_scaler) if raw_xgb else None,
+        student=student_meta(bundle.student) if bundle.student is not None else None,
+    )
+    return write_bundle(path, sections, meta)
+
+# --- reading ---
+
+def _read_manifest(read, path: str) -> dict:
+    header = read(0, _HEADER.size)
+    if len(header) < _HEADER.size:
+        raise BundleError(f"{path}: truncated header")
+    magic, fmt, _, manifest_length, data_offset = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise BundleError(f"{path}: not a model bundle")
+    if fmt != FORMAT_VERSION:
+        raise BundleError(f"{path}: bundle format {fmt}, this build reads {FORMAT_VERSION}")
+    try:
+        manifest = json.loads(read(_HEADER.size, manifest_length))
+    except ValueError as e:
+        raise BundleError(f"{path}: unreadable manifest: {e}")
+    manifest["data_offset"] = data_offset
+    return manifest
+
+def read_manifest(path: str) -> dict:
+    """Header and manifest only, without touching the sections"""
+    with open(path, "rb") as f:
+        def read(offset, length):
+            f.seek(offset)
+            return f.read(length)
+        return _read_manifest(read, path)
+
+class BundleFile:
+    """Read-only mmap of a bundle file; arrays are views into it and keep it alive"""
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        # One open file for header and sections, so a concurrent os.replace cannot pair them up wrongly
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.manifest = _read_manifest(lambda offset, length: self._map[offset:offset + length], path)
+        self._data = memoryview(self._map)[self.manifest["data_offset"]:]
+        for name, entry in self.manifest["sections"].items():
+            if entry["offset"] + entry["length"] > len(self._data):
+                raise BundleError(f"{path}: section {name} runs past the end of the file")
+            if verify and hashlib.sha256(self.section(name)).hexdigest() != entry["sha256"]:
+                raise BundleError(f"{path}: checksum mismatch in section {name}")
+
+    def section(self, name: str) -> memoryview:
+        entry = self.manifest["sections"][name]
+        return self._data[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def array(self, name: str) -> np.ndarray:
+        entry = self.manifest["sections"][name]
+        return np.frombuffer(self.section(name), dtype=np.dtype(entry["dtype"])).reshape(entry["shape"])
+
+    def booster(self, name: str) -> xgb.Booster:
+        booster = xgb.Booster()
+        booster.load_model(bytearray(self.section(name)))
+        return booster
+
+def load_bundle(path: str, verify: bool = True) -> ModelBundle:
+    bundle_file = BundleFile(path, verify)
+    manifest = bundle_file.manifest
+
+    def cnn_loader():
+        cnn = model_from_json(bytes(bundle_file.section("cnn/config")).decode())
+        cnn.set_weights([bundle_file.array(f"cnn/weight/{i:03d}") for i in range(manifest["cnn_weights"])])
+        return cnn
+
+    raw = {}
+    if manifest["raw_xgb"]:
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = bundle_file.array("label_classes")
+        raw = {
+            "raw_xgb": bundle_file.booster("raw_xgb"),
+            "raw_scaler": _scaler_from(bundle_file, "raw_scaler", manifest["raw_scaler"]),
+            "label_encoder": label_encoder,
+        }
+    return ModelBundle(
+        cnn=None,
+        cnn_loader=cnn_loader,
+        xgb_model=bundle_file.booster("xgb"),
+        student=bundle_file.booster("student") if "student" in manifest["sections"] else None,
+        scaler=_scaler_from(bundle_file, "scaler", manifest["scaler"]),
+        version=manifest["version"],
+        manifest=manifest,
+        source=path,
+        **raw,
+    )
+
+def loose_files(model_dir: str) -> List[str]:
+    """Loose artifacts present in a bundle directory"""
+    return [name for name in LOOSE_HYBRID + LOOSE_RAW_XGB + [LOOSE_STUDENT]
+            if os.path.exists(os.path.join(model_dir, name))]
+
+def load_loose_bundle(model_dir: str) -> ModelBundle:
+    """A ModelBundle from the separate trainer outputs (pickled scalers included)"""
+    from joblib import load as joblib_load
+
+    for name in LOOSE_HYBRID:
+        if not os.path.exists(os.path.join(model_dir, name)):
+            raise FileNotFoundError(f"{name} not found in {model_dir}")
+    raw = {}
+    student_path = os.path.join(model_dir, LOOSE_STUDENT)
+    if all(os.path.exists(os.path.join(model_dir, name)) for name in LOOSE_RAW_XGB):
+        raw = {
+            "raw_xgb": xgb.Booster(model_file=os.path.join(model_dir, "xgb_raw_model.json")),
+            "raw_scaler": joblib_load(os.path.join(model_dir, "xgb_raw_scaler.save")),
+            "label_encoder": joblib_load(os.path.join(model_dir, "label_encoder.save")),
+        }
+    return ModelBundle(
+        # Built now: a refresh may replace the loose files under a bundle that is still serving
+        cnn=load_model(os.path.join(model_dir, "cnn_lstm_model.h5")),
+        xgb_model=xgb.Booster(model_file=os.path.join(model_dir, "xgb_model.json")),
+        scaler=joblib_load(os.path.join(model_dir, "scaler.save")),
+        student=xgb.Booster(model_file=student_path) if os.path.exists(student_path) else None,
+        source=model_dir,
+        **raw,
+    )
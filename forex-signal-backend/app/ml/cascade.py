@@ -0,0 +1,72 @@
+"""Calibration of the cascade threshold (CASCADE_ENABLED in app/core/config.py).
+
+In cascade mode a signal request runs the raw XGBoost first and, when its top
+probability reaches the bundle's threshold, serves that signal without running
+the CNN-LSTM. The threshold is calibrated per bundle on holdout rows, the CSV
+rows after both model groups' trained_through (app/ml/training_state.py):
+rows are ranked by raw XGBoost confidence and the threshold is the lowest
+confidence at which the rows skipped would still have agreed with the
+hybrid's signal at least `target_agreement` of the time. Rows either model was
+fit on would flatter that agreement and skip too many requests. It is stored in the bundle manifest
+under "cascade" (app/ml/train/calibrate_cascade.py), so a recalibration is a
+new bundle version and is swapped in like any other.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from app.ml.bundle import ModelBundle
+from app.ml.data_preparation import SEQUENCE_LENGTH, min_max_transform
+from app.ml.feature_frame import FEATURE_COLS
+from app.ml.student import teacher_probabilities
+
+TARGET_AGREEMENT = 0.97
+MIN_SKIPPED = 50
+
+def holdout_probabilities(bundle: ModelBundle, df: pd.DataFrame, since: str):
+    """(raw XGBoost, hybrid) probabilities for the complete rows of df after `since`, computed as served"""
+    df = df.dropna(subset=FEATURE_COLS).sort_values("time")
+    rows = min(int((df["time"] > pd.Timestamp(since)).sum()), len(df) - SEQUENCE_LENGTH + 1)
+    if rows <= 0:
+        raise ValueError(f"No holdout rows after {since}")
+    hybrid_probs = teacher_probabilities(bundle, df, rows)
+    raw_X = min_max_transform(df[FEATURE_COLS].to_numpy(dtype=np.float32)[-rows:], bundle.raw_scaler)
+    raw_probs = bundle.raw_xgb.predict(xgb.DMatrix(raw_X))
+    return raw_probs, hybrid_probs
+
+def calibrate_threshold(raw_probs, hybrid_probs, target_agreement: float = TARGET_AGREEMENT,
+                        min_skipped: int = MIN_SKIPPED) -> dict:
+    """Lowest raw XGBoost confidence whose skipped rows agree with the hybrid at least `target_agreement`
+
+    The threshold is None when no cut skipping at least `min_skipped` rows is
+    accurate enough; such a bundle always runs the hybrid.
+    """
+    raw_probs, hybrid_probs = np.asarray(raw_probs), np.asarray(hybrid_probs)
+    confidence = raw_probs.max(axis=1)
+    order = np.argsort(-confidence, kind="stable")
+    confidence = confidence[order]
+    agree = (raw_probs.argmax(axis=1) == hybrid_probs.argmax(axis=1))[order]
+    agreement = np.cumsum(agree) / np.arange(1, len(agree) + 1)
+
+    # A threshold skips every row at or above it, so only cut after the last of equal confidences
+    cut = np.append(confidence[1:] < confidence[:-1], True)
+    eligible = np.flatnonzero(cut & (agreement >= target_agreement) & (np.arange(1, len(agree) + 1) >= min_skipped))
+    result = {"target": target_agreement, "holdout_rows": int(len(agree)), "threshold": None,
+              "agreement": None, "skip_rate": 0.0}
+    if len(eligible):
+        k = int(eligible[-1])
+        result.update(threshold=float(confidence[k]), agreement=float(agreement[k]),
+                      skip_rate=float((k + 1) / len(agree)))
+    return result
+
+def calibrate(bundle: ModelBundle, df: pd.DataFrame, since: str, target_agreement: float = TARGET_AGREEMENT,
+              min_skipped: int = MIN_SKIPPED) -> Optional[dict]:
+    """Cascade calibration for a bundle on the rows of df after `since`; None without a raw XGBoost"""
+    if bundle.raw_xgb is None:
+        return None
+    raw_probs, hybrid_probs = holdout_probabilities(bundle, df, since)
+    result = calibrate_threshold(raw_probs, hybrid_probs, target_agreement, min_skipped)
+    result.update(since=str(since), through=str(df["time"].max()))
+    return result
@@ -1,3 +1,4 @@
+import logging
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 import sys
@@ -9,11 +10,13 @@ sys.path.append(str(root_dir))
 
 SEQUENCE_LENGTH = 100 
 
+logger = logging.getLogger(__name__)
+
 def prepare_cnn_lstm_input(df, feature_cols, sequence_length=SEQUENCE_LENGTH, scaler=None):
     df = df.copy()
     df.dropna(inplace=True)
     
-    print(f"[DEBUG] Input data shape after dropna: {df.shape}")
+    logger.debug("input rows after dropna", extra={"shape": df.shape})
     
     if len(df) < sequence_length:
         raise ValueError(f"Insufficient data points: {len(df)}. Need at least {sequence_length}")
@@ -29,6 +32,20 @@ def prepare_cnn_lstm_input(df, feature_cols, sequence_length=SEQUENCE_LENGTH, sc
         X.append(scaled_features[i-sequence_length:i])
     
     X = np.array(X)
-    print(f"[DEBUG] Prepared X shape: {X.shape}")
+    logger.debug("prepared sequences", extra={"shape": X.shape})
     
     return X, scaler
+
+def min_max_transform(X, scaler):
+    """scaler.transform for a fitted MinMaxScaler without the validation and float64 copy; float32 in and out"""
+    if not (hasattr(scaler, "scale_") and hasattr(scaler, "min_")):
+        return scaler.transform(X).astype(np.float32)
+    return X * scaler.scale_.astype(np.float32) + scaler.min_.astype(np.float32)
+
+def prepare_last_window(frame, feature_cols, scaler, sequence_length=SEQUENCE_LENGTH):
+    """Scaled (1, sequence_length, features) model input from the newest rows of a FeatureFrame"""
+    available = len(frame) - frame.first_complete_row(feature_cols)
+    if available < sequence_length:
+        raise ValueError(f"Insufficient data points: {available}. Need at least {sequence_length}")
+    window = frame.values(feature_cols)[-sequence_length:]
+    return min_max_transform(window, scaler)[np.newaxis]
@@ -0,0 +1,78 @@
+"""Bars and indicators in one preallocated float32 block.
+
+The live signal path used to copy the whole DataFrame at every step (copy,
+five joins, copy + dropna for scaling, another slice for the raw XGBoost).
+A FeatureFrame allocates the block once and every step reads or writes named
+column views into it. The model features come first and in FEATURE_COLS
+order, so the model input is a plain slice of the block, not a copy.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLS = ["close", "rsi", "MACD", "MACD_Signal", "BBU_20_2.0", "BBL_20_2.0",
+                "STOCHk_14_3_3", "STOCHd_14_3_3", "ema20", "ema50", "adx", "cci", "atr"]
+OHLC_COLS = ["open", "high", "low", "close"]
+LAYOUT = FEATURE_COLS + ["open", "high", "low"]
+
+class FeatureFrame:
+    __slots__ = ("time", "data", "columns", "_index")
+
+    def __init__(self, time: np.ndarray, data: np.ndarray, columns: Sequence[str] = LAYOUT):
+        if data.shape != (len(time), len(columns)):
+            raise ValueError(f"data shape {data.shape} does not match {len(time)} rows x {len(columns)} columns")
+        self.time = time
+        self.data = data
+        self.columns = list(columns)
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def from_ohlc(cls, time: np.ndarray, ohlc: np.ndarray, columns: Sequence[str] = LAYOUT) -> "FeatureFrame":
+        """Allocate the block for `time` x `columns` (NaN until set) and fill open/high/low/close"""
+        frame = cls(np.asarray(time, dtype="datetime64[ns]"),
+                    np.full((len(time), len(columns)), np.nan, dtype=np.float32), columns)
+        for i, name in enumerate(OHLC_COLS):
+            frame[name] = ohlc[:, i]
+        return frame
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columns: Sequence[str] = LAYOUT) -> "FeatureFrame":
+        return cls.from_ohlc(df["time"].to_numpy(dtype="datetime64[ns]"), df[OHLC_COLS].to_numpy(), columns)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Writable view of one column"""
+        return self.data[:, self._index[name]]
+
+    def __setitem__(self, name: str, values) -> None:
+        self.data[:, self._index[name]] = values
+
+    def values(self, names: Sequence[str]) -> np.ndarray:
+        """rows x names; a view when the names are adjacent and in layout order, else a copy"""
+        idx = [self._index[name] for name in names]
+        if idx == list(range(idx[0], idx[0] + len(idx))):
+            return self.data[:, idx[0]:idx[0] + len(idx)]
+        return self.data[:, idx]
+
+    def series(self, name: str) -> pd.Series:
+        """float64 copy of one column as a Series, for indicator libraries"""
+        return pd.Series(self[name], dtype=np.float64)
+
+    def first_complete_row(self, names: Sequence[str]) -> int:
+        """Index of the first row from which `names` have no NaN (indicator warm-up is leading only)"""
+        incomplete = np.flatnonzero(np.isnan(self.values(names)).any(axis=1))
+        return int(incomplete[-1]) + 1 if len(incomplete) else 0
+
+    def row(self, i: int = -1, names: Optional[List[str]] = None) -> Dict[str, float]:
+        return {name: float(self.data[i, self._index[name]]) for name in (names or self.columns)}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.data, columns=self.columns)
+        df.insert(0, "time", self.time)
+        return df
@@ -1,22 +1,31 @@
+import logging
 import numpy as np
 import xgboost as xgb
 from keras.models import load_model
 import os
+from typing import Optional
 import tensorflow as tf
+from app.core.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 CNN_LSTM_PATH = "ml/models/cnn_lstm_model.h5"
 XGB_PATH = "ml/models/xgb_model.json"
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join("app", "ml", "models"))
+
+def get_model_dir(pair: str, timeframe: str, model_root: Optional[str] = None) -> str:
+    """Bundle directory for a pair/timeframe under MODEL_DIR (or model_root), e.g. app/ml/models/eurusd_15min"""
+    pair_name = pair.lower().replace("/", "")
+    return os.path.join(model_root or MODEL_DIR, f"{pair_name}_{timeframe}")
 
 def load_hybrid_model(pair: str, timeframe: str):
     """Load models for specific pair/timeframe"""
-    pair_name = pair.lower().replace("/", "")
-    model_dir = os.path.join("app", "ml", "models", f"{pair_name}_{timeframe}")
+    model_dir = get_model_dir(pair, timeframe)
     
     cnn_path = os.path.join(model_dir, "cnn_lstm_model.h5")
     xgb_path = os.path.join(model_dir, "xgb_model.json")
     
-    print(f"[DEBUG] Looking for CNN model at: {cnn_path}")
-    print(f"[DEBUG] Looking for XGB model at: {xgb_path}")
+    logger.debug("loading hybrid model", extra={"cnn_path": cnn_path, "xgb_path": xgb_path})
     
     if not os.path.exists(cnn_path):
         raise FileNotFoundError(f"CNN-LSTM model not found at {cnn_path}")
@@ -25,15 +34,18 @@ def load_hybrid_model(pair: str, timeframe: str):
     
     return load_model(cnn_path), xgb.Booster(model_file=xgb_path)
 
-def hybrid_predict(cnn_model, xgb_model, X_input):
-    # Get features from CNN's second-to-last layer
-    feature_extractor = tf.keras.Model(
-        inputs=cnn_model.inputs,
-        outputs=cnn_model.layers[-2].output
-    )
-    features = feature_extractor.predict(X_input)
+def hybrid_predict(cnn_model, xgb_model, X_input, feature_extractor=None):
+    # Get features from CNN's second-to-last layer (loaded bundles build the extractor once)
+    if feature_extractor is None:
+        feature_extractor = tf.keras.Model(
+            inputs=cnn_model.inputs,
+            outputs=cnn_model.layers[-2].output
+        )
+    with timed("cnn"):
+        features = feature_extractor.predict(X_input, verbose=0)
     
     # XGBoost prediction
-    dmatrix = xgb.DMatrix(features)
-    probs = xgb_model.predict(dmatrix)
+    with timed("hybrid_xgb"):
+        dmatrix = xgb.DMatrix(features)
+        probs = xgb_model.predict(dmatrix)
     return probs, int(np.argmax(probs))
\ No newline at end of file
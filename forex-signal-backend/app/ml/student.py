@@ -0,0 +1,90 @@
+"""Distilled student model behind the `tier=fast` option of /api/signal.
+
+The student is a shallow XGBoost trained to reproduce the hybrid CNN-LSTM +
+XGBoost's probabilities (its teacher) from the newest bar alone: the 13
+FEATURE_COLS values plus, per column, its change over each of LAGS bars. It
+needs no scaler and no sequence window, so a fast-tier signal costs one small
+tree ensemble instead of the CNN-LSTM.
+
+Soft targets are fit with the standard softmax objective by repeating every
+row once per class, weighted by the teacher's probability for that class,
+which is the cross-entropy against the teacher's distribution.
+
+The trained booster is saved as student_model.json next to the other loose
+models (app/ml/train/distill_student.py) and packed into bundle.fxb with them.
+Its lags and its fidelity report against the teacher are booster attributes,
+so they travel with it.
+"""
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score
+
+from app.ml.bundle import ModelBundle, student_meta
+from app.ml.data_preparation import SEQUENCE_LENGTH, prepare_cnn_lstm_input
+from app.ml.feature_frame import FEATURE_COLS
+from app.ml.models import hybrid_predict
+
+LAGS = (1, 5, 20)
+STUDENT_PARAMS = {
+    "objective": "multi:softprob",
+    "num_class": 3,
+    "eval_metric": "mlogloss",
+    "eta": 0.1,
+    "max_depth": 4,
+    "min_child_weight": 5,
+    "subsample": 0.8,
+    "seed": 42
+}
+STUDENT_ROUNDS = 150
+
+def student_features(values: np.ndarray, lags: Sequence[int] = LAGS) -> np.ndarray:
+    """Student inputs for rows max(lags).. of `values` (rows x FEATURE_COLS, oldest first)"""
+    history = max(lags)
+    if len(values) <= history:
+        raise ValueError(f"Insufficient data points: {len(values)}. Need more than {history}")
+    current = values[history:]
+    blocks = [current] + [current - values[history - lag:len(values) - lag] for lag in lags]
+    return np.hstack(blocks).astype(np.float32, copy=False)
+
+def student_lags(booster: xgb.Booster) -> tuple:
+    return tuple(student_meta(booster)["lags"] or LAGS)
+
+def teacher_probabilities(bundle: ModelBundle, df: pd.DataFrame, rows: int) -> np.ndarray:
+    """Hybrid probabilities for the last `rows` rows of df (complete FEATURE_COLS rows), computed as served"""
+    X, _ = prepare_cnn_lstm_input(df[FEATURE_COLS].tail(rows + SEQUENCE_LENGTH - 1), FEATURE_COLS, scaler=bundle.scaler)
+    probs, _ = hybrid_predict(bundle.cnn, bundle.xgb, X.astype(np.float32), bundle.feature_extractor)
+    return probs
+
+def fit_student(X: np.ndarray, soft_targets: np.ndarray, params: dict = STUDENT_PARAMS,
+                rounds: int = STUDENT_ROUNDS, lags: Sequence[int] = LAGS) -> xgb.Booster:
+    n, n_classes = soft_targets.shape
+    dtrain = xgb.DMatrix(
+        np.repeat(X, n_classes, axis=0),
+        label=np.tile(np.arange(n_classes), n),
+        weight=soft_targets.reshape(-1),
+    )
+    booster = xgb.train(params, dtrain, num_boost_round=rounds)
+    booster.set_attr(lags=",".join(str(lag) for lag in lags))
+    return booster
+
+def fidelity_report(student_probs: np.ndarray, teacher_probs: np.ndarray, labels=None) -> dict:
+    """How closely the student tracks its teacher; accuracies too when true labels are given"""
+    eps = 1e-7
+    teacher = np.clip(teacher_probs, eps, 1)
+    student = np.clip(student_probs, eps, 1)
+    teacher_signal, student_signal = teacher_probs.argmax(axis=1), student_probs.argmax(axis=1)
+    confident = teacher_probs.max(axis=1) >= np.median(teacher_probs.max(axis=1))
+    report = {
+        "rows": int(len(teacher_probs)),
+        "agreement": float(np.mean(teacher_signal == student_signal)),
+        "agreement_confident_half": float(np.mean(teacher_signal[confident] == student_signal[confident])),
+        "kl_divergence": float(np.mean(np.sum(teacher * np.log(teacher / student), axis=1))),
+        "mean_abs_error": float(np.mean(np.abs(teacher_probs - student_probs))),
+    }
+    if labels is not None:
+        report["teacher_accuracy"] = float(accuracy_score(labels, teacher_signal))
+        report["student_accuracy"] = float(accuracy_score(labels, student_signal))
+    return report
@@ -0,0 +1,90 @@
+"""Calibrate a bundle's cascade threshold (see app/ml/cascade.py) and store it in bundle.fxb.
+
+    python app/ml/train/calibrate_cascade.py EUR/USD 15min
+    python app/ml/train/calibrate_cascade.py EUR/USD 15min --target 0.98 --dry-run
+
+Both models are run on the holdout: the rows of the pair's CSV after both
+model groups' trained_through (app/ml/training_state.py), which the full
+retrains leave out and refresh_models.py holds out. --since overrides it, for
+bundles trained before it was recorded; pick a time after their training data
+ends. The threshold is the lowest raw XGBoost confidence at which the skipped
+rows still agree with the hybrid --target of the time. The bundle is
+rewritten with the result as a new version, which a running backend swaps in
+within BUNDLE_POLL_SECONDS; the cascade itself only runs with
+CASCADE_ENABLED=1. Watch signal_cascade_shadow_total for the agreement
+actually reached when serving.
+
+pack_bundle.py writes bundles without a threshold (the loose models may have
+changed), so calibrate again after packing; refresh_models.py recalibrates on
+every promotion by itself.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+current_dir = Path(__file__).parent
+root_dir = current_dir.parent.parent.parent
+sys.path.append(str(root_dir))
+
+from app.ml.bundle import BUNDLE_FILE, load_bundle, load_loose_bundle, save_bundle
+from app.ml.cascade import MIN_SKIPPED, TARGET_AGREEMENT, calibrate
+from app.ml.models import MODEL_DIR, get_model_dir
+from app.ml.training_state import load_state, unseen_since
+
+def load_rows(data_file: str) -> pd.DataFrame:
+    df = pd.read_csv(data_file, parse_dates=["time"])
+    return df.sort_values("time").reset_index(drop=True)
+
+def calibrate_bundle(model_dir: str, df: pd.DataFrame, since: Optional[str] = None,
+                     target: float = TARGET_AGREEMENT, min_skipped: int = MIN_SKIPPED,
+                     dry_run: bool = False) -> dict:
+    """Calibrate the served bundle in model_dir (packing the loose files if there is none yet)"""
+    since = since or unseen_since(load_state(model_dir))
+    if since is None:
+        raise ValueError(f"no trained_through recorded in {model_dir}; retrain the models or pass --since")
+    bundle_path = os.path.join(model_dir, BUNDLE_FILE)
+    bundle = load_bundle(bundle_path) if os.path.exists(bundle_path) else load_loose_bundle(model_dir)
+    result = calibrate(bundle, df, since, target, min_skipped)
+    if result is None:
+        raise ValueError(f"no raw XGBoost in {model_dir}, nothing to cascade to")
+    if not dry_run:
+        manifest = save_bundle(bundle_path, bundle, cascade=result,
+                               source=os.path.basename(os.path.normpath(model_dir)))
+        result["bundle_version"] = manifest["version"]
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate the raw XGBoost confidence at which the CNN-LSTM is skipped")
+    parser.add_argument("pair")
+    parser.add_argument("timeframe")
+    parser.add_argument("--since", help="Calibrate on rows after this time (default: the recorded trained_through)")
+    parser.add_argument("--target", type=float, default=TARGET_AGREEMENT,
+                        help="Smallest share of skipped rows that must agree with the hybrid")
+    parser.add_argument("--min-skipped", type=int, default=MIN_SKIPPED,
+                        help="Fewest calibration rows a threshold must skip to be used")
+    parser.add_argument("--dry-run", action="store_true", help="Report the threshold without rewriting the bundle")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Directory of the bundle directories (default: MODEL_DIR)")
+    args = parser.parse_args()
+
+    pair_name = args.pair.lower().replace("/", "")
+    data_file = os.path.join(root_dir, "app", "ml", "data", f"{pair_name}_{args.timeframe}.csv")
+    model_dir = get_model_dir(args.pair, args.timeframe, args.model_dir)
+    try:
+        result = calibrate_bundle(model_dir, load_rows(data_file), args.since, args.target, args.min_skipped,
+                                  args.dry_run)
+    except Exception as e:
+        print(f"❌ {pair_name}_{args.timeframe}: {e}")
+        sys.exit(1)
+    if result["threshold"] is None:
+        print(f"❌ no threshold reaches {args.target:.0%} agreement over {args.min_skipped}+ rows; "
+              f"the hybrid keeps serving every request: {json.dumps(result)}")
+    else:
+        print(f"✅ threshold {result['threshold']:.4f}: skips {result['skip_rate']:.1%} of "
+              f"{result['holdout_rows']} rows at {result['agreement']:.1%} agreement")
+    if "bundle_version" in result:
+        print(f"✅ bundle.fxb version {result['bundle_version']}")
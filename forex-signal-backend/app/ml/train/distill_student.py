@@ -0,0 +1,136 @@
+"""Distill a bundle's hybrid CNN-LSTM + XGBoost into the fast-tier student (see app/ml/student.py).
+
+    python app/ml/train/distill_student.py EUR/USD 15min
+    python app/ml/train/distill_student.py EUR/USD 15min --rounds 300 --dry-run
+
+The served bundle (bundle.fxb, or the loose files if it is not packed) labels
+every row of the pair's CSV with its hybrid probabilities. The student is fit
+on the older rows and scored against the teacher on the newest
+HOLDOUT_FRACTION of them; that fidelity report, including single-request
+latency for both models, is printed and saved with the student. A student
+agreeing with its teacher less than --min-agreement of the time is not saved.
+
+Otherwise it is written as student_model.json and, if the bundle is packed,
+bundle.fxb is rewritten with it (keeping its cascade threshold) as a new
+version that a running backend swaps in; /api/signal?tier=fast serves it from
+then on. Distill again after retraining or refreshing the hybrid: the student
+keeps serving, but its report describes the old teacher.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+current_dir = Path(__file__).parent
+root_dir = current_dir.parent.parent.parent
+sys.path.append(str(root_dir))
+
+from app.ml.bundle import BUNDLE_FILE, LOOSE_STUDENT, load_bundle, load_loose_bundle, save_bundle
+from app.ml.data_preparation import SEQUENCE_LENGTH
+from app.ml.feature_frame import FEATURE_COLS
+from app.ml.models import MODEL_DIR, get_model_dir, hybrid_predict
+from app.ml.student import LAGS, STUDENT_ROUNDS, fidelity_report, fit_student, student_features, teacher_probabilities
+
+# --- CONFIG ---
+HOLDOUT_FRACTION = 0.2
+MIN_AGREEMENT = 0.85
+LATENCY_SAMPLES = 50
+
+def _median_ms(fn) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(LATENCY_SAMPLES):
+        begun = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - begun)
+    return round(float(np.median(times)) * 1000, 3)
+
+def latency(bundle, student: xgb.Booster, X_student: np.ndarray, window: np.ndarray) -> dict:
+    """Median single-request model time of each, in milliseconds"""
+    return {
+        "student_ms": _median_ms(lambda: student.predict(xgb.DMatrix(X_student[-1:]))),
+        "teacher_ms": _median_ms(lambda: hybrid_predict(bundle.cnn, bundle.xgb, window, bundle.feature_extractor)),
+    }
+
+def distill(model_dir: str, df: pd.DataFrame, rounds: int = STUDENT_ROUNDS, holdout_fraction: float = HOLDOUT_FRACTION,
+            min_agreement: float = MIN_AGREEMENT, dry_run: bool = False) -> dict:
+    bundle_path = os.path.join(model_dir, BUNDLE_FILE)
+    bundle = load_bundle(bundle_path) if os.path.exists(bundle_path) else load_loose_bundle(model_dir)
+
+    df = df.dropna(subset=FEATURE_COLS).sort_values("time").reset_index(drop=True)
+    # First row with both a full CNN-LSTM window and every student lag behind it
+    start = max(SEQUENCE_LENGTH - 1, max(LAGS))
+    rows = len(df) - start
+    n_holdout = math.ceil(rows * holdout_fraction)
+    if rows - n_holdout < 1 or n_holdout < 1:
+        raise ValueError(f"Insufficient data points: {len(df)}")
+
+    begun = time.time()
+    teacher = teacher_probabilities(bundle, df, rows)
+    values = df[FEATURE_COLS].to_numpy(dtype=np.float32)
+    X = student_features(values[start - max(LAGS):], LAGS)
+    split = rows - n_holdout
+
+    student = fit_student(X[:split], teacher[:split], rounds=rounds)
+    labels = df["label"].to_numpy()[start + split:].astype(int) if "label" in df.columns else None
+    report = fidelity_report(student.predict(xgb.DMatrix(X[split:])), teacher[split:], labels)
+    window = bundle.scaler.transform(df[FEATURE_COLS].tail(SEQUENCE_LENGTH)).astype(np.float32)[np.newaxis]
+    report.update(latency(bundle, student, X, window))
+    report.update(train_rows=split, rounds=rounds, trained_through=str(df["time"].iloc[start + split - 1]),
+                  seconds=round(time.time() - begun, 1))
+
+    if report["agreement"] < min_agreement:
+        return {"status": "rejected", **report}
+    if dry_run:
+        return {"status": "accepted (dry run)", **report}
+
+    student.set_attr(fidelity=json.dumps(report))
+    staged = os.path.join(model_dir, "student_model.candidate.json")
+    student.save_model(staged)
+    os.replace(staged, os.path.join(model_dir, LOOSE_STUDENT))
+    result = {"status": "saved", **report}
+    if os.path.exists(bundle_path):
+        bundle.student = student
+        manifest = save_bundle(bundle_path, bundle, cascade=bundle.manifest.get("cascade"),
+                               source=os.path.basename(os.path.normpath(model_dir)))
+        result["bundle_version"] = manifest["version"]
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill the hybrid model into a fast-tier student")
+    parser.add_argument("pair")
+    parser.add_argument("timeframe")
+    parser.add_argument("--rounds", type=int, default=STUDENT_ROUNDS, help="Boosting rounds of the student")
+    parser.add_argument("--holdout", type=float, default=HOLDOUT_FRACTION,
+                        help="Newest share of rows kept out of training for the fidelity report")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT,
+                        help="Smallest holdout signal agreement with the teacher still saved")
+    parser.add_argument("--dry-run", action="store_true", help="Report fidelity without saving the student")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Directory of the bundle directories (default: MODEL_DIR)")
+    args = parser.parse_args()
+
+    pair_name = args.pair.lower().replace("/", "")
+    data_file = os.path.join(root_dir, "app", "ml", "data", f"{pair_name}_{args.timeframe}.csv")
+    model_dir = get_model_dir(args.pair, args.timeframe, args.model_dir)
+    try:
+        result = distill(model_dir, pd.read_csv(data_file, parse_dates=["time"]), args.rounds, args.holdout,
+                         args.min_agreement, args.dry_run)
+    except Exception as e:
+        print(f"❌ {pair_name}_{args.timeframe}: {e}")
+        sys.exit(1)
+
+    bundle_version = result.pop("bundle_version", None)
+    status = "✅" if result["status"] != "rejected" else "❌"
+    print(f"{status} student {result['status']}: {result['agreement']:.1%} agreement with the teacher on "
+          f"{result['rows']} holdout rows, {result['student_ms']} ms vs {result['teacher_ms']} ms per request")
+    print(json.dumps(result, indent=2))
+    if bundle_version is not None:
+        print(f"✅ bundle.fxb version {bundle_version}")
+    sys.exit(1 if result["status"] == "rejected" else 0)
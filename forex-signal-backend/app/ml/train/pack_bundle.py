@@ -0,0 +1,68 @@
+"""Pack a bundle directory's loose model files into bundle.fxb (see app/ml/bundle.py).
+
+    python app/ml/train/pack_bundle.py EUR/USD 15min
+    python app/ml/train/pack_bundle.py --all
+
+Bundle directories are found under MODEL_DIR, the directory the backend
+serves from (app/ml/models when unset, relative to forex-signal-backend), or
+under --model-dir; the trainers write there too. The loose files stay where
+they are (the trainers and refresh_models.py read them); serving switches to
+bundle.fxb, and a running backend picks up every new version within
+BUNDLE_POLL_SECONDS. Each packed bundle is loaded back and checked against
+the loose models on a random window before it is reported.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+current_dir = Path(__file__).parent
+root_dir = current_dir.parent.parent.parent
+sys.path.append(str(root_dir))
+
+from app.ml.bundle import BUNDLE_FILE, LOOSE_HYBRID, load_bundle, load_loose_bundle, save_bundle
+from app.ml.models import MODEL_DIR, get_model_dir, hybrid_predict
+
+def pack(model_dir: str) -> dict:
+    loose = load_loose_bundle(model_dir)
+    manifest = save_bundle(os.path.join(model_dir, BUNDLE_FILE), loose,
+                           source=os.path.basename(os.path.normpath(model_dir)))
+
+    packed = load_bundle(os.path.join(model_dir, BUNDLE_FILE))
+    X = np.random.default_rng(0).random((1, manifest["sequence_length"], manifest["n_inputs"]), dtype=np.float32)
+    expected, _ = hybrid_predict(loose.cnn, loose.xgb, X, loose.feature_extractor)
+    actual, _ = hybrid_predict(packed.cnn, packed.xgb, X, packed.feature_extractor)
+    if not np.allclose(expected, actual, atol=1e-6):
+        raise ValueError(f"packed bundle disagrees with the loose models: {expected} vs {actual}")
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack loose model files into a single bundle.fxb")
+    parser.add_argument("pair", nargs="?")
+    parser.add_argument("timeframe", nargs="?")
+    parser.add_argument("--all", action="store_true", help="Pack every bundle directory under the model directory")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Directory of the bundle directories (default: MODEL_DIR)")
+    args = parser.parse_args()
+
+    models_root = args.model_dir
+    if args.all:
+        model_dirs = [os.path.join(models_root, name) for name in sorted(os.listdir(models_root))
+                      if all(os.path.exists(os.path.join(models_root, name, f)) for f in LOOSE_HYBRID)]
+    elif args.pair and args.timeframe:
+        model_dirs = [get_model_dir(args.pair, args.timeframe, models_root)]
+    else:
+        parser.error("give a pair and timeframe, or --all")
+
+    failed = False
+    for model_dir in model_dirs:
+        try:
+            manifest = pack(model_dir)
+            size = os.path.getsize(os.path.join(model_dir, BUNDLE_FILE))
+            print(f"✅ {os.path.basename(model_dir)}: version {manifest['version']}, "
+                  f"{len(manifest['sections'])} sections, {size / 1e6:.2f} MB")
+        except Exception as e:
+            failed = True
+            print(f"❌ {os.path.basename(model_dir)}: {e}")
+    sys.exit(1 if failed else 0)
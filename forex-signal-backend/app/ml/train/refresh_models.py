@@ -0,0 +1,305 @@
+"""Incremental refresh of a trained bundle from the newest rows of its CSV.
+
+train_cnn_lstm.py, train_xgb.py and train_xgb_raw.py rebuild every model from
+scratch on the whole file. A refresh starts from the saved models instead:
+
+  * the CNN-LSTM is fine-tuned from its weights for a few epochs at a low
+    learning rate
+  * xgb_model.json keeps boosting on the CNN features and xgb_raw_model.json
+    on the scaled raw features, a few rounds at a time and never past
+    MAX_ROUNDS, after which a full retrain is due. Fine-tuning moves the CNN
+    features under the existing hybrid trees, so the hybrid is also scored
+    with the CNN left as it is (boosting only) and the better one is kept
+  * scaler.save and xgb_raw_scaler.save stay as they are unless
+    --refit-scalers refits them, on every row before the holdout
+
+The hybrid group (CNN-LSTM, hybrid XGBoost, scaler) and the raw XGBoost group
+are refreshed separately. Each takes the rows after its `trained_through`
+(app/ml/training_state.py; --since, or the last DEFAULT_NEW_ROWS rows when
+none is recorded), holds the newest of them out, and is promoted only if
+neither log loss nor accuracy on that holdout is worse than the current
+models' by more than --tolerance. Promotion backs the old files up to previous/, swaps the new
+ones in with os.replace and repacks bundle.fxb, with the cascade threshold
+(app/ml/cascade.py) recalibrated on the rows neither group has been fit on
+(the holdout), which a running backend swaps in as one new version. A
+rejected group keeps its trained_through and sees the same rows again next
+time.
+
+Full retrains leave the newest rows of the file out and record where they
+stopped, so the first refresh after one trains and scores on those. Bundles
+retrained before that was recorded were fit on a random split of the whole
+file: their first holdout may overlap their training rows and flatter the
+current models, and their cascade is left uncalibrated until both groups
+have a trained_through.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from keras.models import load_model
+from keras.optimizers import Adam
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.preprocessing import MinMaxScaler
+import tensorflow as tf
+
+current_dir = Path(__file__).parent
+root_dir = current_dir.parent.parent.parent
+sys.path.append(str(root_dir))
+
+try:
+    from app.ml.bundle import BUNDLE_FILE, load_loose_bundle, save_bundle
+    from app.ml.cascade import calibrate
+    from app.ml.data_preparation import prepare_cnn_lstm_input, SEQUENCE_LENGTH
+    from app.ml.feature_frame import FEATURE_COLS
+    from app.ml.models import MODEL_DIR, get_model_dir
+    from app.ml.training_state import load_state, save_state, unseen_since
+except ImportError:
+    from bundle import BUNDLE_FILE, load_loose_bundle, save_bundle
+    from cascade import calibrate
+    from data_preparation import prepare_cnn_lstm_input, SEQUENCE_LENGTH
+    from feature_frame import FEATURE_COLS
+    from models import MODEL_DIR, get_model_dir
+    from training_state import load_state, save_state, unseen_since
+
+# --- CONFIG ---
+FINE_TUNE_EPOCHS = 3
+FINE_TUNE_LEARNING_RATE = 1e-5
+UPDATE_ROUNDS = 20
+MAX_ROUNDS = 300  # train_xgb*.py start from 100
+UPDATE_PARAMS = {
+    "objective": "multi:softprob",
+    "num_class": 3,
+    "eval_metric": "mlogloss",
+    "eta": 0.05,
+    "max_depth": 4,
+    "min_child_weight": 5,
+    "seed": 42
+}
+HOLDOUT_FRACTION = 0.3
+MIN_HOLDOUT_ROWS = 32
+MIN_UPDATE_ROWS = 32
+DEFAULT_NEW_ROWS = 500
+LABELS = [0, 1, 2]
+
+def _paths(pair: str, timeframe: str, model_root: str = MODEL_DIR):
+    pair_name = pair.lower().replace("/", "")
+    data_file = os.path.join(root_dir, "app", "ml", "data", f"{pair_name}_{timeframe}.csv")
+    return data_file, get_model_dir(pair, timeframe, model_root)
+
+def split_rows(df: pd.DataFrame, since, holdout_fraction=HOLDOUT_FRACTION):
+    """(first update row, first holdout row) as positions in df; None if there are too few new rows"""
+    start = int(np.searchsorted(df["time"].to_numpy(), np.datetime64(since), side="right")) if since is not None \
+        else len(df) - DEFAULT_NEW_ROWS
+    # Rows earlier than this lack a full CNN-LSTM window before them
+    start = max(start, SEQUENCE_LENGTH - 1)
+    n_new = len(df) - start
+    n_holdout = max(MIN_HOLDOUT_ROWS, math.ceil(n_new * holdout_fraction))
+    if n_new - n_holdout < MIN_UPDATE_ROWS:
+        return None
+    return start, len(df) - n_holdout
+
+def scores(y, probs) -> dict:
+    return {
+        "logloss": float(log_loss(y, probs, labels=LABELS)),
+        "accuracy": float(accuracy_score(y, np.argmax(probs, axis=1))),
+    }
+
+def no_regression(candidate: dict, current: dict, tolerance: float) -> bool:
+    return (candidate["logloss"] <= current["logloss"] + tolerance
+            and candidate["accuracy"] >= current["accuracy"] - tolerance)
+
+def continue_boosting(booster: xgb.Booster, X, y, rounds: int) -> xgb.Booster:
+    done = booster.num_boosted_rounds()
+    if done + rounds > MAX_ROUNDS:
+        raise ValueError(f"booster already has {done} rounds, {rounds} more would pass {MAX_ROUNDS}; retrain it fully")
+    return xgb.train(UPDATE_PARAMS, xgb.DMatrix(X, label=y), num_boost_round=rounds, xgb_model=booster)
+
+def _windows(df, start, end, scaler):
+    """CNN-LSTM inputs for rows start..end-1 (each window ends at its row) and their labels"""
+    rows = df[FEATURE_COLS].iloc[start - SEQUENCE_LENGTH + 1:end]
+    X, _ = prepare_cnn_lstm_input(rows, FEATURE_COLS, scaler=scaler)
+    return X[-(end - start):], df["label"].to_numpy()[start:end]
+
+def _features(cnn_model, X):
+    extractor = tf.keras.Model(inputs=cnn_model.inputs, outputs=cnn_model.layers[-2].output)
+    return extractor.predict(X, verbose=0)
+
+def _promote(model_dir: str, candidates: dict) -> None:
+    """Back up the files being replaced to previous/, then swap each candidate in"""
+    backup_dir = os.path.join(model_dir, "previous")
+    os.makedirs(backup_dir, exist_ok=True)
+    for name in candidates:
+        if os.path.exists(os.path.join(model_dir, name)):
+            shutil.copy2(os.path.join(model_dir, name), os.path.join(backup_dir, name))
+    for name, staged in candidates.items():
+        os.replace(staged, os.path.join(model_dir, name))
+
+def _staged(model_dir: str, name: str) -> str:
+    # Keep the extension: Keras and XGBoost pick the format from it
+    stem, ext = os.path.splitext(name)
+    return os.path.join(model_dir, f"{stem}.candidate{ext}")
+
+def refresh_hybrid(df, model_dir, since, epochs, rounds, refit_scalers, tolerance, dry_run):
+    split = split_rows(df, since)
+    if split is None:
+        return {"status": "skipped", "reason": "not enough new rows"}
+    start, holdout = split
+    begun = time.time()
+
+    scaler = joblib.load(os.path.join(model_dir, "scaler.save"))
+    cnn_model = load_model(os.path.join(model_dir, "cnn_lstm_model.h5"))
+    booster = xgb.Booster(model_file=os.path.join(model_dir, "xgb_model.json"))
+
+    X_hold, y_hold = _windows(df, holdout, len(df), scaler)
+    current = scores(y_hold, booster.predict(xgb.DMatrix(_features(cnn_model, X_hold))))
+
+    new_scaler = MinMaxScaler().fit(df[FEATURE_COLS].iloc[:holdout]) if refit_scalers else scaler
+    X_new, y_new = _windows(df, start, holdout, new_scaler)
+    if refit_scalers:
+        X_hold, _ = _windows(df, holdout, len(df), new_scaler)
+
+    # (name, CNN-LSTM or None if unchanged, booster, holdout scores)
+    candidates = []
+    if not refit_scalers:
+        # Inputs scaled as before, so the saved CNN still fits them
+        boosted = continue_boosting(booster, _features(cnn_model, X_new), y_new, rounds)
+        candidates.append(("boost_only", None, boosted,
+                           scores(y_hold, boosted.predict(xgb.DMatrix(_features(cnn_model, X_hold))))))
+    if epochs > 0:
+        cnn_model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE),
+                          loss="categorical_crossentropy", metrics=["accuracy"])
+        cnn_model.fit(X_new, np.eye(len(LABELS))[y_new], epochs=epochs, batch_size=32, verbose=0)
+        boosted = continue_boosting(booster, _features(cnn_model, X_new), y_new, rounds)
+        candidates.append(("fine_tuned", cnn_model, boosted,
+                           scores(y_hold, boosted.predict(xgb.DMatrix(_features(cnn_model, X_hold))))))
+    if not candidates:
+        return {"status": "skipped", "reason": "--refit-scalers needs --epochs > 0 to adapt the CNN-LSTM"}
+
+    name, new_cnn, new_booster, candidate = min(candidates, key=lambda c: c[3]["logloss"])
+    report = {
+        "update_rows": holdout - start, "holdout_rows": len(df) - holdout, "current": current,
+        "candidates": {c[0]: c[3] for c in candidates}, "chosen": name, "rounds": new_booster.num_boosted_rounds(),
+        "seconds": round(time.time() - begun, 1), "trained_through": str(df["time"].iloc[holdout - 1]),
+    }
+    if not no_regression(candidate, current, tolerance):
+        return {"status": "rejected", **report}
+    if dry_run:
+        return {"status": "accepted (dry run)", **report}
+
+    candidates = {"xgb_model.json": _staged(model_dir, "xgb_model.json")}
+    new_booster.save_model(candidates["xgb_model.json"])
+    if new_cnn is not None:
+        candidates["cnn_lstm_model.h5"] = _staged(model_dir, "cnn_lstm_model.h5")
+        new_cnn.save(candidates["cnn_lstm_model.h5"])
+    if refit_scalers:
+        candidates["scaler.save"] = _staged(model_dir, "scaler.save")
+        joblib.dump(new_scaler, candidates["scaler.save"])
+    _promote(model_dir, candidates)
+    return {"status": "promoted", **report}
+
+def refresh_raw_xgb(df, model_dir, since, rounds, refit_scalers, tolerance, dry_run):
+    if not os.path.exists(os.path.join(model_dir, "xgb_raw_model.json")):
+        return {"status": "skipped", "reason": "no raw XGBoost in this bundle"}
+    split = split_rows(df, since)
+    if split is None:
+        return {"status": "skipped", "reason": "not enough new rows"}
+    start, holdout = split
+    begun = time.time()
+
+    scaler = joblib.load(os.path.join(model_dir, "xgb_raw_scaler.save"))
+    le = joblib.load(os.path.join(model_dir, "label_encoder.save"))
+    booster = xgb.Booster(model_file=os.path.join(model_dir, "xgb_raw_model.json"))
+    X, y = df[FEATURE_COLS], le.transform(df["label"])
+
+    current = scores(y[holdout:], booster.predict(xgb.DMatrix(scaler.transform(X.iloc[holdout:]))))
+    new_scaler = MinMaxScaler().fit(X.iloc[:holdout]) if refit_scalers else scaler
+    new_booster = continue_boosting(booster, new_scaler.transform(X.iloc[start:holdout]), y[start:holdout], rounds)
+    candidate = scores(y[holdout:], new_booster.predict(xgb.DMatrix(new_scaler.transform(X.iloc[holdout:]))))
+    report = {
+        "update_rows": holdout - start, "holdout_rows": len(df) - holdout, "current": current,
+        "candidate": candidate, "rounds": new_booster.num_boosted_rounds(), "seconds": round(time.time() - begun, 1),
+        "trained_through": str(df["time"].iloc[holdout - 1]),
+    }
+    if not no_regression(candidate, current, tolerance):
+        return {"status": "rejected", **report}
+    if dry_run:
+        return {"status": "accepted (dry run)", **report}
+
+    candidates = {"xgb_raw_model.json": _staged(model_dir, "xgb_raw_model.json")}
+    new_booster.save_model(candidates["xgb_raw_model.json"])
+    if refit_scalers:
+        candidates["xgb_raw_scaler.save"] = _staged(model_dir, "xgb_raw_scaler.save")
+        joblib.dump(new_scaler, candidates["xgb_raw_scaler.save"])
+    _promote(model_dir, candidates)
+    return {"status": "promoted", **report}
+
+def refresh(pair: str, timeframe: str, since=None, epochs=FINE_TUNE_EPOCHS, rounds=UPDATE_ROUNDS,
+            refit_scalers=False, tolerance=0.0, dry_run=False, model_root=MODEL_DIR) -> dict:
+    data_file, model_dir = _paths(pair, timeframe, model_root)
+    df = pd.read_csv(data_file, parse_dates=["time"])
+    missing_cols = [col for col in FEATURE_COLS + ["label"] if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns in data: {missing_cols}")
+    df = df.dropna(subset=FEATURE_COLS + ["label"]).sort_values("time").reset_index(drop=True)
+    df["label"] = df["label"].astype(int)
+
+    state = load_state(model_dir)
+    results = {
+        "hybrid": refresh_hybrid(df, model_dir, since or state.get("hybrid", {}).get("trained_through"),
+                                 epochs, rounds, refit_scalers, tolerance, dry_run),
+        "raw_xgb": refresh_raw_xgb(df, model_dir, since or state.get("raw_xgb", {}).get("trained_through"),
+                                   rounds, refit_scalers, tolerance, dry_run),
+    }
+    for group, result in results.items():
+        entry = state.setdefault(group, {})
+        entry["last_refresh"] = {"at": datetime.utcnow().isoformat(timespec="seconds"), **result}
+        if result["status"] == "promoted":
+            entry["trained_through"] = result["trained_through"]
+    if not dry_run:
+        if any(result["status"] == "promoted" for result in results.values()):
+            bundle = load_loose_bundle(model_dir)
+            # The old threshold was calibrated for the models just replaced; the new one only on rows
+            # neither group was fit on, which is the refresh holdout
+            holdout_since = unseen_since(state)
+            cascade = calibrate(bundle, df, holdout_since) if holdout_since is not None else None
+            manifest = save_bundle(os.path.join(model_dir, BUNDLE_FILE), bundle, cascade=cascade,
+                                   source=os.path.basename(model_dir))
+            results["bundle_version"] = manifest["version"]
+            results["cascade_threshold"] = cascade and cascade["threshold"]
+        save_state(model_dir, state)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune a bundle on rows added since its last refresh")
+    parser.add_argument("pair")
+    parser.add_argument("timeframe")
+    parser.add_argument("--since", help="Treat rows after this time as new (default: refresh_state.json)")
+    parser.add_argument("--epochs", type=int, default=FINE_TUNE_EPOCHS)
+    parser.add_argument("--rounds", type=int, default=UPDATE_ROUNDS, help="Boosting rounds added per XGBoost")
+    parser.add_argument("--refit-scalers", action="store_true",
+                        help="Refit both MinMax scalers on every row before the holdout")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="Largest holdout log loss increase / accuracy drop still promoted")
+    parser.add_argument("--dry-run", action="store_true", help="Score the candidates without promoting them")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Directory of the bundle directories (default: MODEL_DIR)")
+    args = parser.parse_args()
+
+    results = refresh(args.pair, args.timeframe, args.since, args.epochs, args.rounds, args.refit_scalers,
+                      args.tolerance, args.dry_run, args.model_dir)
+    bundle_version = results.pop("bundle_version", None)
+    cascade_threshold = results.pop("cascade_threshold", None)
+    for group, result in results.items():
+        status = "✅" if result["status"].startswith(("promoted", "accepted")) else "❌"
+        print(f"{status} {group}: {json.dumps(result)}")
+    if bundle_version is not None:
+        print(f"✅ bundle.fxb version {bundle_version}, cascade threshold {cascade_threshold}")
@@ -15,8 +15,12 @@ sys.path.append(str(root_dir))
 
 try:
     from app.ml.data_preparation import prepare_cnn_lstm_input
+    from app.ml.models import get_model_dir
+    from app.ml.training_state import mark_trained, training_rows
 except ImportError:
     from data_preparation import prepare_cnn_lstm_input
+    from models import get_model_dir
+    from training_state import mark_trained, training_rows
 
 def create_cnn_lstm_model(input_shape, num_classes):
     model = Sequential()
@@ -33,12 +37,13 @@ def create_cnn_lstm_model(input_shape, num_classes):
 def train(pair: str, timeframe: str):
     pair_name = pair.lower().replace("/", "")
     data_file = os.path.join(root_dir, "app", "ml", "data", f"{pair_name}_{timeframe}.csv")
-    model_dir = os.path.join(root_dir, "app", "ml", "models", f"{pair_name}_{timeframe}")
+    model_dir = get_model_dir(pair, timeframe)
     
     os.makedirs(model_dir, exist_ok=True)
     model_path = os.path.join(model_dir, "cnn_lstm_model.h5")
     
-    df = pd.read_csv(data_file)
+    # The newest rows stay out of training: refreshes and the cascade calibration need rows no model has seen
+    df, trained_through = training_rows(pd.read_csv(data_file))
 
     feature_cols = [
         "close", 
@@ -72,8 +77,9 @@ def train(pair: str, timeframe: str):
     model.save(model_path)
     scaler_path = os.path.join(model_dir, "scaler.save")
     joblib.dump(scaler, scaler_path) 
+    mark_trained(model_dir, "hybrid", trained_through)
     print(f"✅ Scaler saved to {scaler_path}")
-    print(f"✅ CNN-LSTM model saved to {model_path}")
+    print(f"✅ CNN-LSTM model saved to {model_path} (trained through {trained_through})")
 
 if __name__ == "__main__":
     import sys
@@ -16,12 +16,16 @@ sys.path.append(str(root_dir))
 
 try:
     from app.ml.data_preparation import prepare_cnn_lstm_input
+    from app.ml.models import get_model_dir
+    from app.ml.training_state import mark_trained, training_rows
 except ImportError:
     from data_preparation import prepare_cnn_lstm_input
+    from models import get_model_dir
+    from training_state import mark_trained, training_rows
 
 def extract_cnn_features(df, feature_cols, pair, timeframe):
     pair_name = pair.lower().replace("/", "")
-    model_dir = os.path.join(root_dir, "app", "ml", "models", f"{pair_name}_{timeframe}")
+    model_dir = get_model_dir(pair, timeframe)
     scaler_path = os.path.join(model_dir, "scaler.save")
     
     # Load the scaler used for CNN training
@@ -40,10 +44,11 @@ def extract_cnn_features(df, feature_cols, pair, timeframe):
 def train(pair: str, timeframe: str):
     pair_name = pair.lower().replace("/", "")
     data_file = os.path.join(root_dir, "app", "ml", "data", f"{pair_name}_{timeframe}.csv")
-    model_dir = os.path.join(root_dir, "app", "ml", "models", f"{pair_name}_{timeframe}")
+    model_dir = get_model_dir(pair, timeframe)
     xgb_path = os.path.join(model_dir, "xgb_model.json")
     
-    df = pd.read_csv(data_file)
+    # Same rows as train_cnn_lstm.py, so the hybrid group shares one trained_through
+    df, trained_through = training_rows(pd.read_csv(data_file))
 
     feature_cols = [
         "close", 
@@ -89,7 +94,8 @@ def train(pair: str, timeframe: str):
 
     os.makedirs(model_dir, exist_ok=True)
     model.save_model(xgb_path)
-    print(f"✅ XGBoost model saved to {xgb_path}")
+    mark_trained(model_dir, "hybrid", trained_through)
+    print(f"✅ XGBoost model saved to {xgb_path} (trained through {trained_through})")
 
 if __name__ == "__main__":
     import sys
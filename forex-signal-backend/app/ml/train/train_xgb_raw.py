@@ -12,17 +12,25 @@ current_dir = Path(__file__).parent
 root_dir = current_dir.parent.parent.parent
 sys.path.append(str(root_dir))
 
+try:
+    from app.ml.models import get_model_dir
+    from app.ml.training_state import mark_trained, training_rows
+except ImportError:
+    from models import get_model_dir
+    from training_state import mark_trained, training_rows
+
 def train_raw_xgb(pair: str, timeframe: str):
     pair_name = pair.lower().replace("/", "")
     data_file = os.path.join(root_dir, "app", "ml", "data", f"{pair_name}_{timeframe}.csv")
-    model_dir = os.path.join(root_dir, "app", "ml", "models", f"{pair_name}_{timeframe}")
+    model_dir = get_model_dir(pair, timeframe)
     os.makedirs(model_dir, exist_ok=True)
     
     model_path = os.path.join(model_dir, "xgb_raw_model.json")
     scaler_path = os.path.join(model_dir, "xgb_raw_scaler.save")
 
-    df = pd.read_csv(data_file)
-    df.dropna(inplace=True)
+    # The newest rows stay out of training: refreshes and the cascade calibration need rows no model has seen
+    df, trained_through = training_rows(pd.read_csv(data_file))
+    df = df.dropna()
 
     feature_cols = [
         "close", "rsi", "MACD", "MACD_Signal", "BBU_20_2.0", 
@@ -66,7 +74,8 @@ def train_raw_xgb(pair: str, timeframe: str):
     model.save_model(model_path)
     joblib.dump(scaler, scaler_path)
     joblib.dump(le, os.path.join(model_dir, "label_encoder.save"))
-    print(f"✅ Raw XGBoost model saved to {model_path}")
+    mark_trained(model_dir, "raw_xgb", trained_through)
+    print(f"✅ Raw XGBoost model saved to {model_path} (trained through {trained_through})")
 
 if __name__ == "__main__":
     train_raw_xgb(sys.argv[1], sys.argv[2])
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""What each model group in a bundle directory was trained on (refresh_state.json).
+
+A bundle holds two groups trained apart: "hybrid" (CNN-LSTM, hybrid XGBoost,
+scaler; train_cnn_lstm.py then train_xgb.py) and "raw_xgb" (train_xgb_raw.py).
+Each group's `trained_through` is the time of the newest CSV row its models
+were fit on, so rows after it are a true holdout for that group. Full
+retrains leave the newest HOLDOUT_ROWS rows out for that reason, and
+refresh_models.py records the end of every promoted update. Refreshes train
+on and score the rows after it; the cascade threshold (app/ml/cascade.py) is
+calibrated on the rows after it for both groups.
+"""
+import json
+import os
+from typing import Optional, Tuple
+
+import pandas as pd
+
+STATE_FILE = "refresh_state.json"
+GROUPS = ("hybrid", "raw_xgb")
+HOLDOUT_ROWS = 1000
+
+def load_state(model_dir: str) -> dict:
+    path = os.path.join(model_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(model_dir: str, state: dict) -> None:
+    path = os.path.join(model_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def training_rows(df: pd.DataFrame, holdout_rows: int = HOLDOUT_ROWS) -> Tuple[pd.DataFrame, str]:
+    """(rows a full retrain may fit on, their trained_through); the newest rows, at most a fifth, are left out"""
+    df = df.sort_values("time").reset_index(drop=True)
+    keep = len(df) - min(holdout_rows, len(df) // 5)
+    return df.iloc[:keep], str(pd.Timestamp(df["time"].iloc[keep - 1]))
+
+def mark_trained(model_dir: str, group: str, trained_through: str) -> None:
+    """Record a full retrain of `group`; the refresh history of the replaced models no longer applies"""
+    state = load_state(model_dir)
+    state[group] = {"trained_through": trained_through}
+    save_state(model_dir, state)
+
+def unseen_since(state: dict, groups=GROUPS) -> Optional[str]:
+    """Newest trained_through of `groups`: later rows were seen by none of them. None if any is unknown"""
+    through = [state.get(group, {}).get("trained_through") for group in groups]
+    if any(value is None for value in through):
+        return None
+    return str(max(pd.Timestamp(value) for value in through))
@@ -1,3 +1,4 @@
-from .prediction import Prediction
+from .prediction import partition_table, PredictionRollup, RollupState
+from .outcome import OutcomeCount, CalibrationBin, OutcomeCursor
 
-__all__ = ["Prediction"]
\ No newline at end of file
+__all__ = ["partition_table", "PredictionRollup", "RollupState", "OutcomeCount", "CalibrationBin", "OutcomeCursor"]
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Float, PrimaryKeyConstraint
+from app.db.database import Base
+
+class OutcomeCount(Base):
+    """Confusion-matrix cell: predictions of `model` that said `predicted` when the market did `realized`"""
+    __tablename__ = "outcome_counts"
+    __table_args__ = (PrimaryKeyConstraint("symbol", "timeframe", "model", "predicted", "realized"),)
+
+    symbol = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    model = Column(String, nullable=False)  # "hybrid", "student", "raw_xgb" or "rule"
+    predicted = Column(String, nullable=False)
+    realized = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+class CalibrationBin(Base):
+    """Predictions whose top-class probability fell in confidence bin `bin`, and how many were right"""
+    __tablename__ = "outcome_calibration"
+    __table_args__ = (PrimaryKeyConstraint("symbol", "timeframe", "model", "bin"),)
+
+    symbol = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    bin = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    correct = Column(Integer, nullable=False, default=0)
+
+class OutcomeCursor(Base):
+    """Highest prediction id of one (pair, timeframe) in a partition whose outcome has been counted"""
+    __tablename__ = "outcome_cursors"
+    __table_args__ = (PrimaryKeyConstraint("partition", "symbol", "timeframe"),)
+
+    partition = Column(String, nullable=False)
+    symbol = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    last_id = Column(Integer, nullable=False)
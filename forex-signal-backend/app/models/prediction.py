@@ -1,15 +1,59 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, Text
-from sqlalchemy import JSON
+from datetime import date
+from sqlalchemy import Column, Integer, SmallInteger, String, TIMESTAMP, Float, Table, PrimaryKeyConstraint
 from app.db.database import Base
 
-class Prediction(Base):
-    __tablename__ = "predictions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(TIMESTAMP, nullable=False)
+PARTITION_PREFIX = "predictions_"
+CLASSES = ["buy", "hold", "sell"]
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def partition_table(day: date) -> Table:
+    """The per-day predictions table for `day` (one row per request, probabilities as float columns)"""
+    name = partition_name(day)
+    if name in Base.metadata.tables:
+        return Base.metadata.tables[name]
+    return Table(
+        name, Base.metadata,
+        Column("id", Integer, primary_key=True),
+        Column("timestamp", TIMESTAMP, nullable=False, index=True),
+        Column("hour", SmallInteger, nullable=False),  # of `timestamp`, so rollups group without date functions
+        Column("bar_time", TIMESTAMP),
+        Column("symbol", String, nullable=False),
+        Column("timeframe", String, nullable=False),
+        Column("signal", String, nullable=False),
+        Column("raw_signal", String),
+        Column("rule_signal", String),
+        Column("path", String),  # "hybrid", "raw_xgb" (cascade skipped the CNN-LSTM) or "student" (tier=fast)
+        Column("close", Float),
+        *[Column(f"hybrid_{c}", Float) for c in CLASSES],
+        *[Column(f"xgb_{c}", Float) for c in CLASSES],
+        *[Column(f"cnn_lstm_{c}", Float) for c in CLASSES],
+    )
+
+class PredictionRollup(Base):
+    """Signal counts and mean probabilities per (granularity, bucket, pair, timeframe)"""
+    __tablename__ = "prediction_rollups"
+    __table_args__ = (PrimaryKeyConstraint("granularity", "bucket_start", "symbol", "timeframe"),)
+
+    granularity = Column(String, nullable=False)  # "hour" or "day"
+    bucket_start = Column(TIMESTAMP, nullable=False)
     symbol = Column(String, nullable=False)
     timeframe = Column(String, nullable=False)
-    signal = Column(String, nullable=False)
-    cnn_lstm_probs = Column(JSON)
-    xgb_probs = Column(JSON)
-    hybrid_probs = Column(JSON)
\ No newline at end of file
+    count = Column(Integer, nullable=False)
+    buy_count = Column(Integer, nullable=False)
+    hold_count = Column(Integer, nullable=False)
+    sell_count = Column(Integer, nullable=False)
+    hybrid_buy_mean = Column(Float)
+    hybrid_hold_mean = Column(Float)
+    hybrid_sell_mean = Column(Float)
+    xgb_buy_mean = Column(Float)
+    xgb_hold_mean = Column(Float)
+    xgb_sell_mean = Column(Float)
+
+class RollupState(Base):
+    """Highest partition row id already folded into the rollups"""
+    __tablename__ = "prediction_rollup_state"
+
+    partition = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False)
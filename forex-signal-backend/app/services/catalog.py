@@ -0,0 +1,256 @@
+"""In-memory catalog of model bundles and vendor pair availability.
+
+Built once at startup and refreshed in the background, so /api/pairs and the
+input checks of /api/signal never touch the disk or the vendor:
+
+  * every `app/ml/models/{pair}_{tf}` directory is validated: a packed
+    bundle.fxb must pass its checksums; otherwise the loose hybrid artifacts
+    must exist and open (the CNN-LSTM through its HDF5 config, so no
+    TensorFlow graph is built). Either way the scaler must match the CNN input
+    width and the hybrid XGBoost must match the CNN feature width
+  * per bundle it records feature columns, sequence length, whether the raw
+    XGBoost artifacts are present, the bundle version, when it was trained and,
+    when it has a fast-tier student, the student's fidelity report
+  * the vendor's forex pair list is cached and refreshed every
+    CATALOG_REFRESH_SECONDS (sooner after a failed refresh)
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import h5py
+import xgboost as xgb
+from joblib import load as joblib_load
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import CATALOG_REFRESH_SECONDS, CATALOG_RETRY_SECONDS, RESAMPLE_BASE_INTERVAL
+from app.core.metrics import allow_label_values
+from app.ml.bundle import (
+    BUNDLE_FILE, BundleError, BundleFile, LOOSE_HYBRID as HYBRID_ARTIFACTS, LOOSE_RAW_XGB as RAW_XGB_ARTIFACTS, LOOSE_STUDENT,
+    loose_files, student_meta
+)
+from app.ml.models import MODEL_DIR
+from app.services.data_fetcher import fetch_currency_pairs
+
+logger = logging.getLogger(__name__)
+
+SELECTED_PAIRS = [
+    "AUD/CAD", "AUD/JPY", "AUD/USD",
+    "CAD/JPY",
+    "CHF/JPY",
+    "EUR/AUD", "EUR/CAD", "EUR/CHF", "EUR/GBP", "EUR/JPY", "EUR/USD",
+    "GBP/AUD", "GBP/CAD", "GBP/JPY", "GBP/USD",
+    "NZD/USD",
+    "USD/CAD", "USD/CHF", "USD/JPY", "USD/THB", "USD/INR",
+    "XAU/USD",
+]
+
+def _normalize(pair: str) -> str:
+    return pair.replace("/", "").upper()
+
+_PAIR_BY_NAME = {_normalize(pair): pair for pair in SELECTED_PAIRS}
+
+def _keras_config(path: str) -> Tuple[int, int, int]:
+    """(sequence length, input features, penultimate layer width) from an .h5 model's stored config"""
+    with h5py.File(path, "r") as f:
+        config = f.attrs["model_config"]
+    config = json.loads(config if isinstance(config, str) else config.decode())
+    layers = config["config"]["layers"]
+    first = layers[0]["config"]
+    shape = first.get("batch_shape") or first.get("batch_input_shape")
+    return int(shape[1]), int(shape[2]), int(layers[-2]["config"]["units"])
+
+class BundleInfo:
+    __slots__ = ("pair", "timeframe", "path", "feature_columns", "sequence_length", "feature_size",
+                 "raw_xgb", "trained_at", "version", "cascade_threshold", "student")
+
+    def __init__(self, pair, timeframe, path, feature_columns, sequence_length, feature_size, raw_xgb, trained_at,
+                 version=None, cascade_threshold=None, student=None):
+        self.pair = pair
+        self.timeframe = timeframe
+        self.path = path
+        self.feature_columns = feature_columns
+        self.sequence_length = sequence_length
+        self.feature_size = feature_size
+        self.raw_xgb = raw_xgb
+        self.trained_at = trained_at
+        self.version = version
+        self.cascade_threshold = cascade_threshold
+        self.student = student
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name != "path"}
+
+def _inspect_packed(path: str, pair: str, timeframe: str) -> BundleInfo:
+    bundle_path = os.path.join(path, BUNDLE_FILE)
+    try:
+        bundle_file = BundleFile(bundle_path)  # verifies every section checksum
+        manifest = bundle_file.manifest
+        n_scaled = manifest["sections"]["scaler/scale_"]["shape"][0]
+        n_inputs, feature_size = manifest["n_inputs"], manifest["feature_size"]
+        n_booster = bundle_file.booster("xgb").num_features()
+        info = BundleInfo(
+            pair=pair,
+            timeframe=timeframe,
+            path=path,
+            feature_columns=manifest["feature_columns"],
+            sequence_length=manifest["sequence_length"],
+            feature_size=feature_size,
+            raw_xgb=manifest["raw_xgb"],
+            trained_at=manifest["created_at"],
+            version=manifest["version"],
+            cascade_threshold=(manifest.get("cascade") or {}).get("threshold"),
+            student=manifest.get("student"),
+        )
+    except BundleError:
+        raise
+    except KeyError as e:
+        raise BundleError(f"{bundle_path}: manifest has no {e}")
+    except (OSError, TypeError, xgb.core.XGBoostError) as e:
+        # XGBoost appends a native stack trace; the first line says what is wrong
+        raise BundleError(f"{bundle_path}: unreadable: {str(e).splitlines()[0] if str(e) else e!r}")
+    if n_scaled != n_inputs:
+        raise ValueError(f"scaler has {n_scaled} features, CNN-LSTM expects {n_inputs}")
+    if n_booster != feature_size:
+        raise ValueError(f"hybrid XGBoost expects {n_booster} features, CNN-LSTM yields {feature_size}")
+
+    bundle_mtime = os.path.getmtime(bundle_path)
+    stale = [name for name in loose_files(path) if os.path.getmtime(os.path.join(path, name)) > bundle_mtime]
+    if stale:
+        logger.warning("loose model files newer than bundle.fxb are not served; repack the bundle",
+                       extra={"bundle": os.path.basename(path), "files": stale})
+    return info
+
+def inspect_bundle(path: str, pair: str, timeframe: str) -> BundleInfo:
+    """Validate one bundle directory; raises ValueError describing the first problem found"""
+    if os.path.exists(os.path.join(path, BUNDLE_FILE)):
+        return _inspect_packed(path, pair, timeframe)
+
+    missing = [name for name in HYBRID_ARTIFACTS if not os.path.exists(os.path.join(path, name))]
+    if missing:
+        raise ValueError(f"missing {missing}")
+
+    try:
+        sequence_length, n_inputs, feature_size = _keras_config(os.path.join(path, "cnn_lstm_model.h5"))
+    except Exception as e:
+        raise ValueError(f"unreadable cnn_lstm_model.h5: {e}")
+    try:
+        scaler = joblib_load(os.path.join(path, "scaler.save"))
+    except Exception as e:
+        raise ValueError(f"unreadable scaler.save: {e}")
+    try:
+        booster = xgb.Booster(model_file=os.path.join(path, "xgb_model.json"))
+    except Exception as e:
+        raise ValueError(f"unreadable xgb_model.json: {e}")
+
+    if scaler.n_features_in_ != n_inputs:
+        raise ValueError(f"scaler has {scaler.n_features_in_} features, CNN-LSTM expects {n_inputs}")
+    if booster.num_features() != feature_size:
+        raise ValueError(f"hybrid XGBoost expects {booster.num_features()} features, CNN-LSTM yields {feature_size}")
+
+    student = None
+    if os.path.exists(os.path.join(path, LOOSE_STUDENT)):
+        try:
+            student = student_meta(xgb.Booster(model_file=os.path.join(path, LOOSE_STUDENT)))
+        except Exception as e:
+            raise ValueError(f"unreadable {LOOSE_STUDENT}: {e}")
+
+    names = getattr(scaler, "feature_names_in_", None)
+    raw_xgb = all(os.path.exists(os.path.join(path, name)) for name in RAW_XGB_ARTIFACTS)
+    artifacts = HYBRID_ARTIFACTS + (RAW_XGB_ARTIFACTS if raw_xgb else [])
+    trained_at = max(os.path.getmtime(os.path.join(path, name)) for name in artifacts)
+    return BundleInfo(
+        pair=pair,
+        timeframe=timeframe,
+        path=path,
+        feature_columns=[str(name) for name in names] if names is not None else None,
+        sequence_length=sequence_length,
+        feature_size=feature_size,
+        raw_xgb=raw_xgb,
+        trained_at=datetime.utcfromtimestamp(trained_at).isoformat(),
+        student=student,
+    )
+
+class ModelCatalog:
+    def __init__(self, model_dir: str = MODEL_DIR):
+        self.model_dir = model_dir
+        self.bundles: Dict[Tuple[str, str], BundleInfo] = {}
+        self.invalid: Dict[str, str] = {}
+        self.vendor_pairs: Optional[frozenset] = None
+        self.vendor_refreshed_at: Optional[float] = None
+        self.pairs: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def scan(self) -> None:
+        """Rebuild the bundle index from the model directory"""
+        bundles, invalid = {}, {}
+        names = sorted(os.listdir(self.model_dir)) if os.path.isdir(self.model_dir) else []
+        for name in names:
+            path = os.path.join(self.model_dir, name)
+            if not os.path.isdir(path) or "_" not in name:
+                continue
+            pair_name, timeframe = name.split("_", 1)
+            pair = _PAIR_BY_NAME.get(pair_name.upper(), f"{pair_name[:3].upper()}/{pair_name[3:].upper()}")
+            try:
+                bundles[(pair, timeframe)] = inspect_bundle(path, pair, timeframe)
+            except ValueError as e:
+                invalid[name] = str(e)
+                logger.warning("invalid model bundle", extra={"bundle": name, "error": str(e)})
+        # Swap whole dicts so readers never see a half-built index
+        self.bundles, self.invalid = bundles, invalid
+        allow_label_values(set(SELECTED_PAIRS) | {pair for pair, _ in bundles},
+                           {timeframe for _, timeframe in bundles} | {RESAMPLE_BASE_INTERVAL})
+        logger.info("model catalog scanned", extra={"bundles": len(bundles), "invalid": len(invalid)})
+
+    def refresh_vendor_pairs(self) -> None:
+        available = frozenset(_normalize(pair) for pair in fetch_currency_pairs())
+        self.vendor_pairs = available
+        self.vendor_refreshed_at = time.time()
+        self.pairs = [pair for pair in SELECTED_PAIRS if _normalize(pair) in available]
+
+    def refresh(self) -> bool:
+        """Rescan bundles and reload the vendor pair list; False if the vendor call failed"""
+        self.scan()
+        try:
+            self.refresh_vendor_pairs()
+            return True
+        except Exception as e:
+            logger.warning("vendor pair refresh failed", extra={"error": str(e)})
+            return False
+
+    def validate(self, pair: str, timeframe: str, tier: str = "full") -> Optional[str]:
+        """Error message for an unservable pair/timeframe (or tier), None if a valid bundle exists"""
+        if self.vendor_pairs is not None and _normalize(pair) not in self.vendor_pairs:
+            return f"Pair not available from the data vendor: {pair}"
+        if (pair, timeframe) not in self.bundles:
+            return f"Unsupported pair/timeframe: {pair} {timeframe}"
+        if tier == "fast" and self.bundles[(pair, timeframe)].student is None:
+            return f"No fast-tier student model for {pair} {timeframe}"
+        return None
+
+    def timeframes(self) -> Dict[str, List[str]]:
+        served: Dict[str, List[str]] = {}
+        for pair, timeframe in sorted(self.bundles):
+            served.setdefault(pair, []).append(timeframe)
+        return served
+
+    async def _refresh_loop(self, ok: bool) -> None:
+        while True:
+            await asyncio.sleep(CATALOG_REFRESH_SECONDS if ok else CATALOG_RETRY_SECONDS)
+            ok = await run_in_threadpool(self.refresh)
+
+    async def start(self) -> None:
+        ok = await run_in_threadpool(self.refresh)
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop(ok))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+catalog = ModelCatalog()
@@ -1,45 +1,136 @@
+import logging
+import numpy as np
+import orjson
 import requests
 import pandas as pd
-from app.core.config import TWELVE_DATA_API_KEY
+from fxshared.bar_cache import read_bars
+from fxshared.credit_governor import CreditGovernor, LastGood, UpstreamUnavailable, LIVE, BATCH, quota_retry_after
+from app.core.config import (
+    TWELVE_DATA_API_KEY, TWELVE_DATA_BASE_URL, FETCH_TIMEOUT_SECONDS, BAR_CACHE_ENABLED, BAR_CACHE_PREFIX,
+    BAR_CACHE_GRACE_SECONDS, RESAMPLE_ENABLED, RESAMPLE_BASE_INTERVAL, CREDIT_DB_PATH, CREDITS_PER_MINUTE,
+    CREDITS_PER_DAY, LIVE_RESERVE_PER_MINUTE, LIVE_RESERVE_PER_DAY, BATCH_MAX_WAIT_SECONDS,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+)
+from app.core.metrics import series_labels, timed, UPSTREAM_FALLBACK
+from app.services.resampler import resample_ohlc, resample_ratio
 
-def fetch_ohlcv(pair="EUR/USD", interval="15min", outputsize=5000):
-    url = (
-        f"https://api.twelvedata.com/time_series?"
-        f"symbol={pair}&interval={interval}&outputsize={outputsize}&"
-        f"apikey={TWELVE_DATA_API_KEY}&format=JSON"
-    )
+logger = logging.getLogger(__name__)
 
-    print(f"[DEBUG] Fetching: {url}")
-    response = requests.get(url)
-    data = response.json()
-    print("[DEBUG] API Response Sample:", {k: data[k] for k in list(data)[:2]})
+OHLC_COLS = ["open", "high", "low", "close"]
+MAX_OUTPUTSIZE = 5000
 
+governor = CreditGovernor(
+    CREDIT_DB_PATH, CREDITS_PER_MINUTE, CREDITS_PER_DAY, LIVE_RESERVE_PER_MINUTE, LIVE_RESERVE_PER_DAY,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS,
+)
+last_good = LastGood()
+
+def _reserve_credit(priority: str) -> None:
+    governor.acquire(1, priority, max_wait=BATCH_MAX_WAIT_SECONDS if priority == BATCH else 0.0)
+
+def _get(path: str, params: dict) -> dict:
+    """One vendor call; network and parse failures count against the breaker"""
+    try:
+        response = requests.get(f"{TWELVE_DATA_BASE_URL}/{path}", params=params, timeout=FETCH_TIMEOUT_SECONDS)
+        data = orjson.loads(response.content)
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
+        governor.record_failure(str(e))
+        raise
+    governor.record_response(data)
+    return data
+
+def _last_good_or_raise(pair: str, interval: str, outputsize: int, priority: str, error: Exception) -> pd.DataFrame:
+    """Serve the last good bars to live callers while the upstream is unavailable"""
+    df = last_good.recall(pair, interval, outputsize) if priority == LIVE else None
+    if df is None:
+        raise error
+    kind = error.kind if isinstance(error, UpstreamUnavailable) else "error"
+    logger.warning("serving last good bars", extra={"pair": pair, "interval": interval, "reason": str(error),
+                                                    "last_bar": str(df["time"].iloc[-1])})
+    UPSTREAM_FALLBACK.labels(*series_labels(pair, interval), kind).inc()
+    return df
+
+def fetch_ohlcv(pair="EUR/USD", interval="15min", outputsize=5000, use_cache=True, resample=RESAMPLE_ENABLED,
+                priority=LIVE):
+    if resample and interval != RESAMPLE_BASE_INTERVAL:
+        # One base series (from the bar cache when enabled) serves every higher timeframe
+        ratio = resample_ratio(interval, RESAMPLE_BASE_INTERVAL)
+        base_size = min(MAX_OUTPUTSIZE, (outputsize + 1) * ratio)
+        base = fetch_ohlcv(pair, RESAMPLE_BASE_INTERVAL, base_size, use_cache=use_cache, resample=False,
+                           priority=priority)
+        with timed("resample", pair, interval):
+            df = resample_ohlc(base, interval, RESAMPLE_BASE_INTERVAL)
+        return df.tail(outputsize).reset_index(drop=True)
+
+    if use_cache and BAR_CACHE_ENABLED:
+        with timed("bar_cache", pair, interval):
+            df = read_bars(pair, interval, outputsize, BAR_CACHE_PREFIX, BAR_CACHE_GRACE_SECONDS)
+        if df is not None:
+            return df
+
+    params = {
+        "symbol": pair,
+        "interval": interval,
+        "outputsize": outputsize,
+        "apikey": TWELVE_DATA_API_KEY,
+        "format": "JSON",
+    }
+
+    logger.debug("fetching time_series", extra={"pair": pair, "interval": interval, "outputsize": outputsize})
+    try:
+        _reserve_credit(priority)
+        with timed("fetch", pair, interval):
+            data = _get("time_series", params)
+    except (UpstreamUnavailable, requests.RequestException, orjson.JSONDecodeError) as e:
+        return _last_good_or_raise(pair, interval, outputsize, priority, e)
+
+    retry_after = quota_retry_after(data)
+    if retry_after is not None:
+        return _last_good_or_raise(pair, interval, outputsize, priority,
+                                   UpstreamUnavailable("credits exhausted", retry_after, "quota"))
+    df = parse_ohlcv(data)
+    last_good.remember(pair, interval, df)
+    return df
+
+def parse_ohlcv(data):
+    """Turn a decoded time_series payload into a sorted numeric OHLC frame"""
     if "values" not in data:
-        print("[DEBUG] Full API Response:", data)
+        logger.warning("time_series error response", extra={"response": data})
         raise Exception(f"API Error: {data}")
     
     if len(data["values"]) < 50:
         raise Exception(f"Insufficient data points: {len(data['values'])}")
 
-    df = pd.DataFrame(data["values"]).rename(columns={"datetime": "time"})
-    df["time"] = pd.to_datetime(df["time"])
-    df = df.sort_values("time")
-
-    required_cols = ["open", "high", "low", "close"]
-    missing = [col for col in required_cols if col not in df.columns]
+    values = data["values"]
+    missing = [col for col in OHLC_COLS if col not in values[0]]
     if missing:
         raise Exception(f"Missing columns: {missing}")
 
-    for col in required_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    df = df.dropna()
-    
+    # Bars arrive newest first: reverse instead of sorting, and convert the
+    # strings straight into one float64 block instead of per-column to_numeric
+    rows = values[::-1]
+    time = np.array([v["datetime"] for v in rows], dtype="datetime64[ns]")
+    try:
+        ohlc = np.array([[v["open"], v["high"], v["low"], v["close"]] for v in rows], dtype=np.float64)
+    except (ValueError, TypeError):
+        raw = pd.DataFrame([[v["open"], v["high"], v["low"], v["close"]] for v in rows])
+        ohlc = raw.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+
+    if len(time) > 1 and not (time[1:] >= time[:-1]).all():
+        order = np.argsort(time, kind="stable")
+        time, ohlc = time[order], ohlc[order]
+
+    valid = ~np.isnan(ohlc).any(axis=1)
+    if not valid.all():
+        time, ohlc = time[valid], ohlc[valid]
+
+    df = pd.DataFrame(ohlc, columns=OHLC_COLS)
+    df.insert(0, "time", time)
     return df
+
 def fetch_currency_pairs():
-    url = f"https://api.twelvedata.com/forex_pairs?apikey={TWELVE_DATA_API_KEY}"
-    response = requests.get(url)
-    data = response.json()
+    _reserve_credit(LIVE)
+    data = _get("forex_pairs", {"apikey": TWELVE_DATA_API_KEY})
 
     if "data" not in data:
         raise Exception(f"API Error: {data}")
@@ -0,0 +1,132 @@
+"""Loaded model bundles, one per pair/timeframe, swapped in place when a new version lands.
+
+A signal request takes the bundle for its pair/timeframe once and uses it for
+the whole request, so a swap never mixes artifacts of two versions: the
+registry builds the new ModelBundle to the side, then replaces its entry, and
+requests still holding the old one finish with it.
+
+A directory with bundle.fxb is served from it; one with only the loose trainer
+outputs is loaded from those. Every BUNDLE_POLL_SECONDS the registry stats what
+it has loaded and reloads whatever changed. A bundle that fails to load or
+verify is logged and the previous one keeps serving.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import BUNDLE_POLL_SECONDS
+from app.core.metrics import BUNDLE_SWAPS
+from app.ml.bundle import BUNDLE_FILE, ModelBundle, load_bundle, load_loose_bundle, loose_files
+from app.ml.models import get_model_dir
+
+logger = logging.getLogger(__name__)
+
+def bundle_signature(model_dir: str) -> Optional[tuple]:
+    """Changes whenever what would be loaded from `model_dir` changes; None if nothing is there"""
+    try:
+        st = os.stat(os.path.join(model_dir, BUNDLE_FILE))
+        return (BUNDLE_FILE, st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        pass
+    return tuple((name, os.stat(os.path.join(model_dir, name)).st_mtime_ns) for name in loose_files(model_dir)) or None
+
+def load_from_dir(model_dir: str) -> Tuple[tuple, ModelBundle]:
+    signature = bundle_signature(model_dir)
+    if signature is None:
+        raise FileNotFoundError(f"No model bundle in {model_dir}")
+    if signature[0] == BUNDLE_FILE:
+        return signature, load_bundle(os.path.join(model_dir, BUNDLE_FILE))
+    return signature, load_loose_bundle(model_dir)
+
+class ModelRegistry:
+    def __init__(self):
+        self._bundles: Dict[Tuple[str, str], Tuple[tuple, ModelBundle]] = {}
+        self._failed: Dict[Tuple[str, str], tuple] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, pair: str, timeframe: str) -> ModelBundle:
+        """Current bundle for pair/timeframe, loading it on first use"""
+        key = (pair, timeframe)
+        entry = self._bundles.get(key)
+        if entry is None:
+            with self._key_lock(key):
+                entry = self._bundles.get(key)
+                if entry is None:
+                    entry = load_from_dir(get_model_dir(pair, timeframe))
+                    self._bundles[key] = entry
+                    logger.info("model bundle loaded", extra={"pair": pair, "timeframe": timeframe,
+                                                              "version": entry[1].version})
+        return entry[1]
+
+    def poll(self) -> int:
+        """Reload every loaded bundle whose files changed; returns how many were swapped"""
+        swapped = 0
+        for key, (signature, current) in list(self._bundles.items()):
+            model_dir = get_model_dir(*key)
+            latest = bundle_signature(model_dir)
+            if latest == signature:
+                self._failed.pop(key, None)
+                continue
+            # `key in` matters: a removed bundle is recorded as None, which .get() also returns for no failure
+            if key in self._failed and latest == self._failed[key]:
+                continue
+            if latest is None:
+                logger.warning("model bundle removed, keeping the loaded one", extra={"pair": key[0],
+                                                                                      "timeframe": key[1]})
+                self._failed[key] = latest
+                continue
+            try:
+                with self._key_lock(key):
+                    entry = load_from_dir(model_dir)
+                    if current.cnn_loaded:
+                        # Serving full-tier requests: build the new CNN-LSTM here, not in the first request
+                        entry[1].cnn
+                    self._bundles[key] = entry
+            except Exception as e:
+                self._failed[key] = latest
+                logger.warning("model bundle reload failed, keeping the loaded one", extra={
+                    "pair": key[0], "timeframe": key[1], "version": current.version, "error": str(e)})
+                continue
+            self._failed.pop(key, None)
+            swapped += 1
+            BUNDLE_SWAPS.labels(*key).inc()
+            logger.info("model bundle swapped", extra={"pair": key[0], "timeframe": key[1],
+                                                       "from_version": current.version,
+                                                       "to_version": entry[1].version})
+        return swapped
+
+    def loaded(self) -> List[dict]:
+        return [
+            {"pair": pair, "timeframe": timeframe, "version": bundle.version,
+             "packed": signature[0] == BUNDLE_FILE, "cascade_threshold": bundle.cascade_threshold}
+            for (pair, timeframe), (signature, bundle) in sorted(self._bundles.items())
+        ]
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(BUNDLE_POLL_SECONDS)
+            try:
+                await run_in_threadpool(self.poll)
+            except Exception as e:
+                logger.warning("model bundle poll failed", extra={"error": str(e)})
+
+    async def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+registry = ModelRegistry()
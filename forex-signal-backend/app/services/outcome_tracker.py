@@ -0,0 +1,355 @@
+"""Live accuracy of stored predictions against what the market did next.
+
+A background task walks each (pair, timeframe) of every prediction partition
+in id order from its own cursor. Once the bar OUTCOME_HORIZON_BARS after a prediction's bar
+has closed, the forward return from the stored close is labelled BUY / SELL
+(beyond +/- OUTCOME_RETURN_THRESHOLD) or HOLD, and the hybrid, raw-XGBoost and
+rule-based signals of that prediction are counted into a running confusion
+matrix per (pair, timeframe, model). The hybrid and raw-XGBoost probabilities
+also feed confidence-binned calibration counts. The stored `signal` is the
+served one, so it only counts for the hybrid on rows the hybrid served (not
+when the cascade skipped it) and for the fast-tier student on rows it served.
+
+Counts are only ever incremented, in the same transaction that advances the
+cursor (guarded by its previous value, so two workers cannot count a row
+twice); nothing rescans the predictions. The walk of a (pair, timeframe)
+stops at its first prediction whose horizon has not closed yet, or whose bars
+cannot be fetched, and resumes there next time; the other pairs and
+timeframes carry on past it. Changing the horizon or threshold does not
+rewrite existing counts.
+
+The tracker fetches bars with BATCH credits, so only one process per host
+runs it: each uvicorn worker starts an OutcomeTracker, and the one holding an
+exclusive lock on OUTCOME_LOCK_PATH does the work. The others retry the lock
+every interval and take over if that worker exits.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from starlette.concurrency import run_in_threadpool
+from fxshared.bar_cache import interval_seconds
+from fxshared.credit_governor import BATCH
+
+from app.core.config import (
+    OUTCOME_HORIZON_BARS, OUTCOME_RETURN_THRESHOLD, OUTCOME_INTERVAL_SECONDS, OUTCOME_CALIBRATION_BINS,
+    OUTCOME_BATCH_SIZE, OUTCOME_LOCK_PATH
+)
+from app.db.database import SessionLocal, engine
+from app.models.outcome import OutcomeCount, CalibrationBin, OutcomeCursor
+from app.models.prediction import CLASSES
+from app.services.data_fetcher import fetch_ohlcv, MAX_OUTPUTSIZE
+from app.services.prediction_store import partition_days, partition_table
+
+logger = logging.getLogger(__name__)
+
+LEGACY_CURSOR_TABLE = "outcome_cursor"  # one cursor per partition, before cursors were per (pair, timeframe)
+
+SIGNALS = [c.upper() for c in CLASSES]
+# model name -> (signal column, probability column prefix or None, serving paths it counts for or None for all)
+MODELS = {
+    "hybrid": ("signal", "hybrid", {None, "hybrid"}),  # rows from before the cascade have no path
+    "student": ("signal", None, {"student"}),
+    "raw_xgb": ("raw_signal", "xgb", None),
+    "rule": ("rule_signal", None, None),
+}
+
+def realized_signal(forward_return: float, threshold: float = OUTCOME_RETURN_THRESHOLD) -> str:
+    if forward_return > threshold:
+        return "BUY"
+    if forward_return < -threshold:
+        return "SELL"
+    return "HOLD"
+
+def confidence_bin(confidence: float, bins: int = OUTCOME_CALIBRATION_BINS) -> int:
+    return min(int(confidence * bins), bins - 1)
+
+class _Blocked(Exception):
+    """The prediction's horizon bar has not closed (or cannot be fetched) yet"""
+
+class _Series:
+    """Closes of one (pair, timeframe), fetched once per run and extended when an older bar is needed"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], Tuple[datetime, np.ndarray, np.ndarray]] = {}
+        self._failed = set()
+
+    def get(self, symbol: str, timeframe: str, since: datetime, now: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._series.get((symbol, timeframe))
+        if cached is None or cached[0] > since:
+            if (symbol, timeframe) in self._failed:
+                raise _Blocked()  # one failed fetch per run is enough
+            bars = int((now - since).total_seconds() // interval_seconds(timeframe)) + OUTCOME_HORIZON_BARS + 5
+            try:
+                df = fetch_ohlcv(symbol, timeframe, outputsize=min(MAX_OUTPUTSIZE, max(50, bars)), priority=BATCH)
+            except Exception as e:
+                logger.warning("outcome bars unavailable", extra={"pair": symbol, "timeframe": timeframe,
+                                                                  "error": str(e)})
+                self._failed.add((symbol, timeframe))
+                raise _Blocked()
+            cached = (since, df["time"].to_numpy(dtype="datetime64[ns]"), df["close"].to_numpy(dtype=np.float64))
+            self._series[(symbol, timeframe)] = cached
+        return cached[1], cached[2]
+
+def _forward_return(row, series: _Series, now: datetime) -> Optional[float]:
+    """Return over the horizon, None if the prediction can never be resolved; raises _Blocked if not yet"""
+    if row["bar_time"] is None or not row["close"]:
+        return None
+    step = timedelta(seconds=interval_seconds(row["timeframe"]))
+    target = row["bar_time"] + OUTCOME_HORIZON_BARS * step
+    if now < target + step:
+        raise _Blocked()
+    times, closes = series.get(row["symbol"], row["timeframe"], row["bar_time"], now)
+    if not len(times) or np.datetime64(row["bar_time"]) < times[0]:
+        return None
+    # First bar at or after the target (skips weekend gaps); the newest bar is still forming
+    idx = int(np.searchsorted(times, np.datetime64(target)))
+    if idx >= len(times) - 1:
+        raise _Blocked()
+    return float(closes[idx] / row["close"] - 1.0)
+
+def _count(row, realized: str, counts: dict, calibration: dict) -> None:
+    for model, (signal_column, probs_prefix, paths) in MODELS.items():
+        if paths is not None and row["path"] not in paths:
+            continue
+        predicted = row[signal_column]
+        if predicted not in SIGNALS:
+            continue  # not recorded, or the model failed for this request
+        key = (row["symbol"], row["timeframe"], model)
+        counts[key + (predicted, realized)] += 1
+        if probs_prefix is None or row[f"{probs_prefix}_buy"] is None:
+            continue
+        confidence = max(row[f"{probs_prefix}_{c}"] for c in CLASSES)
+        cell = calibration[key + (confidence_bin(confidence),)]
+        cell[0] += 1
+        cell[1] += confidence
+        cell[2] += int(predicted == realized)
+
+def _commit(cursor: Tuple[str, str, str], previous_id: Optional[int], last_id: int, counts: dict,
+            calibration: dict) -> bool:
+    partition, symbol, timeframe = cursor
+    db = SessionLocal()
+    try:
+        if previous_id is None:
+            db.add(OutcomeCursor(partition=partition, symbol=symbol, timeframe=timeframe, last_id=last_id))
+            db.flush()
+        elif db.query(OutcomeCursor).filter(
+            OutcomeCursor.partition == partition, OutcomeCursor.symbol == symbol,
+            OutcomeCursor.timeframe == timeframe, OutcomeCursor.last_id == previous_id
+        ).update({"last_id": last_id}, synchronize_session=False) != 1:
+            db.rollback()
+            return False
+
+        for (symbol, timeframe, model, predicted, realized), n in counts.items():
+            cell = db.get(OutcomeCount, (symbol, timeframe, model, predicted, realized))
+            if cell is None:
+                db.add(OutcomeCount(symbol=symbol, timeframe=timeframe, model=model, predicted=predicted,
+                                    realized=realized, count=n))
+            else:
+                cell.count += n
+        for (symbol, timeframe, model, bin_), (n, confidence_sum, correct) in calibration.items():
+            cell = db.get(CalibrationBin, (symbol, timeframe, model, bin_))
+            if cell is None:
+                db.add(CalibrationBin(symbol=symbol, timeframe=timeframe, model=model, bin=bin_, count=n,
+                                      confidence_sum=confidence_sum, correct=correct))
+            else:
+                cell.count += n
+                cell.confidence_sum += confidence_sum
+                cell.correct += correct
+        db.commit()
+        return True
+    except IntegrityError:
+        # Another worker created the cursor first; it counts these rows
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def migrate_cursors() -> None:
+    """Expand the per-partition cursors of an older release into per (pair, timeframe) cursors"""
+    if LEGACY_CURSOR_TABLE not in inspect(engine).get_table_names():
+        return
+    partitions = {partition_table(day).name for day in partition_days()}
+    try:
+        with engine.begin() as conn:
+            for partition, last_id in conn.execute(text(f"SELECT partition, last_id FROM {LEGACY_CURSOR_TABLE}")).all():
+                if partition not in partitions:
+                    continue
+                table = partition_table(datetime.strptime(partition[-8:], "%Y%m%d").date())
+                # Every row up to last_id was counted, whatever its pair
+                groups = conn.execute(
+                    select(table.c.symbol, table.c.timeframe).where(table.c.id <= last_id).distinct()
+                ).all()
+                if groups:
+                    conn.execute(OutcomeCursor.__table__.insert(), [
+                        {"partition": partition, "symbol": symbol, "timeframe": timeframe, "last_id": last_id}
+                        for symbol, timeframe in groups
+                    ])
+            conn.execute(text(f"DROP TABLE {LEGACY_CURSOR_TABLE}"))
+    except (IntegrityError, OperationalError):
+        # Another worker migrated them first
+        if LEGACY_CURSOR_TABLE in inspect(engine).get_table_names():
+            raise
+
+def _walk(table, cursor: Tuple[str, str, str], previous_id: Optional[int], series: _Series,
+          now: datetime) -> Tuple[Optional[int], int, bool]:
+    """Count one batch of a (pair, timeframe) from its cursor; returns (new cursor, resolved, more to do)"""
+    _, symbol, timeframe = cursor
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(table).where(table.c.symbol == symbol, table.c.timeframe == timeframe,
+                                table.c.id > (previous_id or 0)).order_by(table.c.id).limit(OUTCOME_BATCH_SIZE)
+        ).mappings().all()
+    if not rows:
+        return previous_id, 0, False
+
+    counts, calibration = defaultdict(int), defaultdict(lambda: [0, 0.0, 0])
+    last_id, blocked, n = previous_id or 0, False, 0
+    for row in rows:
+        try:
+            forward_return = _forward_return(row, series, now)
+        except _Blocked:
+            blocked = True
+            break
+        if forward_return is not None:
+            _count(row, realized_signal(forward_return), counts, calibration)
+            n += 1
+        last_id = row["id"]
+
+    if last_id == (previous_id or 0):
+        return previous_id, 0, False
+    if not _commit(cursor, previous_id, last_id, counts, calibration):
+        return previous_id, 0, False  # another worker advanced this cursor; it carries on
+    return last_id, n, not blocked and len(rows) == OUTCOME_BATCH_SIZE
+
+def update_outcomes(now: Optional[datetime] = None) -> int:
+    """Count every prediction whose horizon has closed since the last run; returns how many were resolved"""
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        cursors = {(cursor.partition, cursor.symbol, cursor.timeframe): cursor.last_id
+                   for cursor in db.query(OutcomeCursor).all()}
+    finally:
+        db.close()
+
+    days = partition_days()
+    stale = {partition for partition, _, _ in cursors} - {partition_table(day).name for day in days}
+    if stale:
+        db = SessionLocal()
+        try:
+            db.query(OutcomeCursor).filter(OutcomeCursor.partition.in_(stale)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    series = _Series()
+    resolved = 0
+    for day in days:
+        table = partition_table(day)
+        with engine.connect() as conn:
+            groups = conn.execute(select(table.c.symbol, table.c.timeframe).distinct()).all()
+        for symbol, timeframe in groups:
+            cursor = (table.name, symbol, timeframe)
+            last_id, more = cursors.get(cursor), True
+            while more:
+                last_id, n, more = _walk(table, cursor, last_id, series, now)
+                resolved += n
+    return resolved
+
+def accuracy_report(symbol: Optional[str] = None, timeframe: Optional[str] = None) -> List[dict]:
+    """Accuracy, confusion matrix and calibration per (pair, timeframe, model)"""
+    db = SessionLocal()
+    try:
+        count_query = db.query(OutcomeCount)
+        calibration_query = db.query(CalibrationBin)
+        if symbol:
+            count_query = count_query.filter(OutcomeCount.symbol == symbol)
+            calibration_query = calibration_query.filter(CalibrationBin.symbol == symbol)
+        if timeframe:
+            count_query = count_query.filter(OutcomeCount.timeframe == timeframe)
+            calibration_query = calibration_query.filter(CalibrationBin.timeframe == timeframe)
+        cells, bins = count_query.all(), calibration_query.order_by(CalibrationBin.bin).all()
+    finally:
+        db.close()
+
+    reports: Dict[Tuple[str, str, str], dict] = {}
+    def report(key):
+        if key not in reports:
+            reports[key] = {
+                "pair": key[0], "timeframe": key[1], "model": key[2], "count": 0, "correct": 0,
+                "confusion": {p: {r: 0 for r in SIGNALS} for p in SIGNALS}, "calibration": [],
+            }
+        return reports[key]
+
+    for cell in cells:
+        entry = report((cell.symbol, cell.timeframe, cell.model))
+        entry["confusion"][cell.predicted][cell.realized] = cell.count
+        entry["count"] += cell.count
+        entry["correct"] += cell.count if cell.predicted == cell.realized else 0
+    for cell in bins:
+        report((cell.symbol, cell.timeframe, cell.model))["calibration"].append({
+            "confidence_low": cell.bin / OUTCOME_CALIBRATION_BINS,
+            "confidence_high": (cell.bin + 1) / OUTCOME_CALIBRATION_BINS,
+            "count": cell.count,
+            "mean_confidence": cell.confidence_sum / cell.count if cell.count else None,
+            "accuracy": cell.correct / cell.count if cell.count else None,
+        })
+    for entry in reports.values():
+        entry["accuracy"] = entry["correct"] / entry["count"] if entry["count"] else None
+    return [reports[key] for key in sorted(reports)]
+
+class OutcomeTracker:
+    """Runs `update_outcomes` every OUTCOME_INTERVAL_SECONDS in the app's event loop, while holding the lock"""
+
+    def __init__(self, lock_path: str = OUTCOME_LOCK_PATH):
+        self.lock_path = lock_path
+        self._lock_fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def try_lock(self) -> bool:
+        """Take the host-wide tracker lock unless another process holds it; the OS drops it when we exit"""
+        if self._lock_fd is None:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            logger.info("outcome tracking in this process", extra={"pid": os.getpid()})
+        return True
+
+    def unlock(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if self.try_lock():
+                    resolved = await run_in_threadpool(update_outcomes)
+                    if resolved:
+                        logger.info("prediction outcomes counted", extra={"resolved": resolved})
+            except Exception as e:
+                logger.warning("outcome tracking failed", extra={"error": str(e)})
+            await asyncio.sleep(OUTCOME_INTERVAL_SECONDS)
+
+    async def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.unlock()
+
+tracker = OutcomeTracker()
@@ -0,0 +1,289 @@
+"""Per-day prediction partitions, retention and pre-aggregated rollups.
+
+Every prediction is written to `predictions_YYYYMMDD` (UTC day of the
+request) with probabilities as float columns. A background task:
+
+  * drops partitions older than PREDICTION_RETENTION_DAYS (0 keeps them all)
+  * re-aggregates every partition that gained rows since its last rollup into
+    `prediction_rollups`: signal counts and mean probabilities per
+    (hour | day, pair, timeframe)
+
+A partition's rollup is recomputed as a whole up to the partition's highest id
+and replaced in one transaction together with that id, so several workers
+running the task at once write the same rows instead of double counting, and
+rows inserted meanwhile are left for the next run. Rollups outlive the
+partitions they were built from.
+"""
+import asyncio
+import logging
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import case, func, inspect, select, text
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import PREDICTION_RETENTION_DAYS, ROLLUP_INTERVAL_SECONDS
+from app.db.database import Base, SessionLocal, engine
+from app.models.prediction import CLASSES, PARTITION_PREFIX, PredictionRollup, RollupState, partition_table
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_RE = re.compile(rf"^{PARTITION_PREFIX}(\d{{8}})$")
+_created = set()
+_create_lock = threading.Lock()
+
+def _add_missing_columns(table) -> None:
+    """Bring a partition created by an older release up to the current (nullable-only) additions"""
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                                  f"{column.type.compile(engine.dialect)}"))
+
+def _ensure_partition(day: date):
+    table = partition_table(day)
+    if table.name not in _created:
+        with _create_lock:
+            if table.name not in _created:
+                if inspect(engine).has_table(table.name):
+                    _add_missing_columns(table)
+                else:
+                    try:
+                        table.create(bind=engine, checkfirst=True)
+                    except OperationalError:
+                        # Another worker created it between the check and the CREATE
+                        if not inspect(engine).has_table(table.name):
+                            raise
+                _created.add(table.name)
+    return table
+
+def partition_days() -> List[date]:
+    """Days that have a partition table, oldest first"""
+    days = []
+    for name in inspect(engine).get_table_names():
+        match = _PARTITION_RE.match(name)
+        if match:
+            days.append(datetime.strptime(match.group(1), "%Y%m%d").date())
+    return sorted(days)
+
+def migrate_partitions() -> List[str]:
+    """Add columns of this release to every existing partition, not just the one being written to
+
+    Reads select every column, so a partition from an older release must be
+    migrated before /api/history or the outcome tracker reach it. Run once at
+    startup; returns the partitions checked.
+    """
+    return [_ensure_partition(day).name for day in partition_days()]
+
+def prediction_row(timestamp: datetime, symbol: str, timeframe: str, signal: str, probs: dict,
+                   bar_time: Optional[datetime] = None, close: Optional[float] = None,
+                   raw_signal: Optional[str] = None, rule_signal: Optional[str] = None,
+                   path: Optional[str] = None) -> dict:
+    row = {
+        "timestamp": timestamp,
+        "hour": timestamp.hour,
+        "bar_time": bar_time,
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "signal": signal,
+        "raw_signal": raw_signal,
+        "rule_signal": rule_signal,
+        "path": path,
+        "close": close,
+    }
+    for key in ("hybrid", "xgb", "cnn_lstm"):
+        values = probs.get(f"{key}_probs") or [None] * len(CLASSES)
+        row.update({f"{key}_{c}": None if v is None else float(v) for c, v in zip(CLASSES, values)})
+    return row
+
+def log_prediction(symbol: str, timeframe: str, timestamp: datetime, signal: str, probs: dict,
+                   bar_time: Optional[datetime] = None, close: Optional[float] = None,
+                   raw_signal: Optional[str] = None, rule_signal: Optional[str] = None,
+                   path: Optional[str] = None) -> None:
+    table = _ensure_partition(timestamp.date())
+    row = prediction_row(timestamp, symbol, timeframe, signal, probs, bar_time, close, raw_signal, rule_signal,
+                         path)
+    with engine.begin() as conn:
+        conn.execute(table.insert().values(**row))
+
+def insert_rows(rows: List[dict], conn=None) -> None:
+    """Bulk insert rows built by `prediction_row` into their day partitions
+
+    Missing partitions are created first on their own connection. Pass `conn`
+    to insert inside the caller's transaction; nothing may have run on it yet,
+    or SQLite would block the CREATE TABLE behind its lock.
+    """
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row["timestamp"].date(), []).append(row)
+    tables = {day: _ensure_partition(day) for day in by_day}
+    if conn is None:
+        with engine.begin() as conn:
+            for day, day_rows in by_day.items():
+                conn.execute(tables[day].insert(), day_rows)
+        return
+    for day, day_rows in by_day.items():
+        conn.execute(tables[day].insert(), day_rows)
+
+def _as_probs(row, key: str) -> list:
+    values = [row[f"{key}_{c}"] for c in CLASSES]
+    return [] if values[0] is None else values
+
+def recent_predictions(limit: int = 50) -> List[dict]:
+    """Newest predictions across partitions, newest first"""
+    records = []
+    with engine.connect() as conn:
+        for day in reversed(partition_days()):
+            if len(records) >= limit:
+                break
+            table = partition_table(day)
+            rows = conn.execute(
+                select(table).order_by(table.c.timestamp.desc()).limit(limit - len(records))
+            ).mappings().all()
+            records.extend({
+                "timestamp": row["timestamp"],
+                "bar_time": row["bar_time"],
+                "symbol": row["symbol"],
+                "timeframe": row["timeframe"],
+                "signal": row["signal"],
+                "raw_signal": row["raw_signal"],
+                "rule_signal": row["rule_signal"],
+                "path": row["path"],
+                "close": row["close"],
+                "cnn_lstm_probs": _as_probs(row, "cnn_lstm"),
+                "xgb_probs": _as_probs(row, "xgb"),
+                "hybrid_probs": _as_probs(row, "hybrid"),
+            } for row in rows)
+    return records
+
+def enforce_retention(today: Optional[date] = None) -> List[str]:
+    """Drop partitions older than the retention window; returns the dropped table names"""
+    if PREDICTION_RETENTION_DAYS <= 0:
+        return []
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=PREDICTION_RETENTION_DAYS)
+    dropped = []
+    for day in partition_days():
+        if day >= cutoff:
+            break
+        table = partition_table(day)
+        table.drop(bind=engine, checkfirst=True)
+        Base.metadata.remove(table)
+        _created.discard(table.name)
+        dropped.append(table.name)
+    if dropped:
+        db = SessionLocal()
+        try:
+            db.query(RollupState).filter(RollupState.partition.in_(dropped)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        logger.info("dropped prediction partitions", extra={"partitions": dropped})
+    return dropped
+
+def _aggregate(conn, table, by_hour: bool, last_id: int):
+    keys = [table.c.symbol, table.c.timeframe] + ([table.c.hour] if by_hour else [])
+    columns = keys + [
+        func.count().label("count"),
+        *[func.sum(case((table.c.signal == c.upper(), 1), else_=0)).label(f"{c}_count") for c in CLASSES],
+        *[func.avg(table.c[f"{key}_{c}"]).label(f"{key}_{c}_mean") for key in ("hybrid", "xgb") for c in CLASSES],
+    ]
+    return conn.execute(select(*columns).where(table.c.id <= last_id).group_by(*keys)).mappings().all()
+
+def rollup_partition(day: date) -> int:
+    """Recompute the hourly and daily rollups of one partition; returns the row count rolled up"""
+    table = partition_table(day)
+    start = datetime.combine(day, datetime.min.time())
+    rollups, state = PredictionRollup.__table__, RollupState.__table__
+
+    def rollup(granularity, row, bucket_start):
+        fields = {k: v for k, v in row.items() if k != "hour"}
+        return dict(fields, granularity=granularity, bucket_start=bucket_start)
+
+    with engine.begin() as conn:
+        # The cursor first: only rows up to it are aggregated and recorded as rolled up
+        last_id = conn.execute(select(func.max(table.c.id))).scalar() or 0
+        hourly = _aggregate(conn, table, by_hour=True, last_id=last_id)
+        daily = _aggregate(conn, table, by_hour=False, last_id=last_id)
+        conn.execute(rollups.delete().where(rollups.c.bucket_start >= start,
+                                            rollups.c.bucket_start < start + timedelta(days=1)))
+        rows = ([rollup("hour", row, start + timedelta(hours=row["hour"])) for row in hourly]
+                + [rollup("day", row, start) for row in daily])
+        if rows:
+            conn.execute(rollups.insert(), rows)
+        conn.execute(state.delete().where(state.c.partition == table.name))
+        conn.execute(state.insert().values(partition=table.name, last_id=last_id))
+    return sum(row["count"] for row in daily)
+
+def refresh_rollups() -> List[str]:
+    """Roll up every partition that gained rows since its last rollup; returns their names"""
+    db = SessionLocal()
+    try:
+        done = {state.partition: state.last_id for state in db.query(RollupState).all()}
+    finally:
+        db.close()
+
+    refreshed = []
+    with engine.connect() as conn:
+        pending = []
+        for day in partition_days():
+            table = partition_table(day)
+            if (conn.execute(select(func.max(table.c.id))).scalar() or 0) != done.get(table.name):
+                pending.append(day)
+    for day in pending:
+        rollup_partition(day)
+        refreshed.append(partition_table(day).name)
+    return refreshed
+
+def query_rollups(granularity: str = "hour", symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                  since: Optional[datetime] = None) -> List[dict]:
+    db = SessionLocal()
+    try:
+        query = db.query(PredictionRollup).filter(PredictionRollup.granularity == granularity)
+        if symbol:
+            query = query.filter(PredictionRollup.symbol == symbol)
+        if timeframe:
+            query = query.filter(PredictionRollup.timeframe == timeframe)
+        if since:
+            query = query.filter(PredictionRollup.bucket_start >= since)
+        return [
+            {column.name: getattr(record, column.name) for column in PredictionRollup.__table__.columns}
+            for record in query.order_by(PredictionRollup.bucket_start, PredictionRollup.symbol,
+                                         PredictionRollup.timeframe)
+        ]
+    finally:
+        db.close()
+
+def run_maintenance() -> None:
+    try:
+        enforce_retention()
+        refreshed = refresh_rollups()
+        if refreshed:
+            logger.info("prediction rollups refreshed", extra={"partitions": refreshed})
+    except Exception as e:
+        logger.warning("prediction maintenance failed", extra={"error": str(e)})
+
+class PredictionMaintenance:
+    """Runs retention and rollups every ROLLUP_INTERVAL_SECONDS in the app's event loop"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self) -> None:
+        while True:
+            await run_in_threadpool(run_maintenance)
+            await asyncio.sleep(ROLLUP_INTERVAL_SECONDS)
+
+    async def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+maintenance = PredictionMaintenance()
@@ -1,16 +1,24 @@
+import logging
 import pandas as pd
 import pandas_ta as ta
-from app.ml.data_preparation import prepare_cnn_lstm_input
-from app.ml.models import load_hybrid_model, hybrid_predict
-from app.models.prediction import Prediction
+from app.ml.data_preparation import prepare_last_window, min_max_transform
+from app.ml.feature_frame import FeatureFrame, FEATURE_COLS
+from app.ml.bundle import ModelBundle
+from app.ml.models import hybrid_predict
+from app.ml.student import student_features, student_lags
 from app.db.database import SessionLocal
+from app.services.prediction_store import log_prediction
+from app.services.model_registry import registry
+from app.core.config import CASCADE_ENABLED, CASCADE_SHADOW_RATE
+from app.core.metrics import series_labels, timed, metric_labels, CASCADE_PATH, CASCADE_SHADOW
+import random
 import xgboost as xgb
 import tensorflow as tf
 import numpy as np
-import os
-from sqlalchemy.orm import Session
 from datetime import datetime 
-from joblib import load as joblib_load
+from typing import Optional
+
+logger = logging.getLogger(__name__)
 
 def get_db():
     db = SessionLocal()
@@ -19,49 +27,17 @@ def get_db():
     finally:
         db.close()
 
-def log_prediction(
-    symbol: str, 
-    timeframe: str, 
-    timestamp: str,
-    signal: str, 
-    probs: dict,
-    db: Session
-):
-    timestamp_dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-    
-    new_entry = Prediction(
-        timestamp=timestamp_dt,
-        symbol=symbol,
-        timeframe=timeframe,
-        signal=signal,
-        cnn_lstm_probs=probs.get("cnn_lstm_probs", []),
-        xgb_probs=probs.get("xgb_probs", []),
-        hybrid_probs=probs.get("hybrid_probs", [])
-    )
-    db.add(new_entry)
-    db.commit()
-    db.refresh(new_entry)
-    return new_entry
-
-def raw_xgb_predict(df, symbol, timeframe):
-    pair_name = symbol.lower().replace("/", "")
-    model_dir = os.path.join("app", "ml", "models", f"{pair_name}_{timeframe}")
-    
-    # Load artifacts
-    scaler = joblib_load(os.path.join(model_dir, "xgb_raw_scaler.save"))
-    model = xgb.Booster()
-    model.load_model(os.path.join(model_dir, "xgb_raw_model.json"))
-    le = joblib_load(os.path.join(model_dir, "label_encoder.save"))
+def raw_xgb_predict(frame: FeatureFrame, symbol, timeframe, bundle: Optional[ModelBundle] = None):
+    bundle = bundle or registry.get(symbol, timeframe)
+    if bundle.raw_xgb is None:
+        raise FileNotFoundError(f"No raw XGBoost model for {symbol} {timeframe}")
     
     # Prepare last row
-    feature_cols = ["close", "rsi", "MACD", "MACD_Signal", "BBU_20_2.0", "BBL_20_2.0",
-                "STOCHk_14_3_3", "STOCHd_14_3_3", "ema20", "ema50", "adx", "cci", "atr"]
-    last_row = df[feature_cols].iloc[[-1]]
-    X_scaled = scaler.transform(last_row)
+    X_scaled = min_max_transform(frame.values(FEATURE_COLS)[-1:], bundle.raw_scaler)
     
     # Predict
     dmatrix = xgb.DMatrix(X_scaled)
-    probs = model.predict(dmatrix)[0]
+    probs = bundle.raw_xgb.predict(dmatrix)[0]
     signal_idx = np.argmax(probs)
     
     signal_map = {0: "BUY", 1: "HOLD", 2: "SELL"}
@@ -69,11 +45,21 @@ def raw_xgb_predict(df, symbol, timeframe):
     
     return signal, [float(p) for p in probs]
 
-def make_prediction(df, symbol: str
-                    , timeframe: str):
+def student_predict(frame: FeatureFrame, symbol, timeframe, bundle: Optional[ModelBundle] = None):
+    bundle = bundle or registry.get(symbol, timeframe)
+    if bundle.student is None:
+        raise FileNotFoundError(f"No fast-tier student model for {symbol} {timeframe}")
+
+    lags = student_lags(bundle.student)
+    available = len(frame) - frame.first_complete_row(FEATURE_COLS)
+    if available <= max(lags):
+        raise ValueError(f"Insufficient data points: {available}. Need more than {max(lags)}")
+    X = student_features(frame.values(FEATURE_COLS)[-(max(lags) + 1):], lags)
+    return bundle.student.predict(xgb.DMatrix(X))[0]
+
+def add_indicators(df):
     df = df.copy()
 
-    # Indicators
     df["rsi"] = ta.rsi(df["close"], length=14)
     macd = ta.macd(df["close"])
     macd.columns = ["MACD", "MACD_Hist", "MACD_Signal"]
@@ -85,8 +71,37 @@ def make_prediction(df, symbol: str
     df["adx"] = ta.adx(df["high"], df["low"], df["close"])["ADX_14"]
     df["cci"] = ta.cci(df["high"], df["low"], df["close"], length=20)
     df["atr"] = ta.atr(df["high"], df["low"], df["close"], length=14)
+    return df
+
+def compute_indicators(frame: FeatureFrame) -> FeatureFrame:
+    """Same indicators as `add_indicators`, written into the frame's preallocated columns"""
+    close, high, low = frame.series("close"), frame.series("high"), frame.series("low")
+
+    frame["rsi"] = ta.rsi(close, length=14)
+    macd = ta.macd(close)
+    frame["MACD"] = macd.iloc[:, 0]
+    frame["MACD_Signal"] = macd.iloc[:, 2]
+    bbands = ta.bbands(close, length=20)
+    frame["BBL_20_2.0"] = bbands.iloc[:, 0]
+    frame["BBU_20_2.0"] = bbands.iloc[:, 2]
+    stoch = ta.stoch(high, low, close)
+    frame["STOCHk_14_3_3"] = stoch.iloc[:, 0]
+    frame["STOCHd_14_3_3"] = stoch.iloc[:, 1]
+    frame["ema20"] = ta.ema(close, length=20)
+    frame["ema50"] = ta.ema(close, length=50)
+    frame["adx"] = ta.adx(high, low, close)["ADX_14"]
+    frame["cci"] = ta.cci(high, low, close, length=20)
+    frame["atr"] = ta.atr(high, low, close, length=14)
+    return frame
+
+def make_prediction(df, symbol: str
+                    , timeframe: str, tier: str = "full"):
+    """tier="fast" serves the distilled student (app/ml/student.py) instead of the hybrid"""
+    frame = df if isinstance(df, FeatureFrame) else FeatureFrame.from_dataframe(df)
+    with timed("indicators", symbol, timeframe):
+        compute_indicators(frame)
 
-    latest = df.iloc[-1]
+    latest = frame.row(-1)
     signal_reasons = []
     signal = "HOLD"
     # RSI logic
@@ -152,72 +167,89 @@ def make_prediction(df, symbol: str
     elif any(r in signal_reasons for r in sell_signals) and not any(r in signal_reasons for r in buy_signals):
         signal = "SELL"
 
-    feature_cols = ["close", "rsi", "MACD", "MACD_Signal", "BBU_20_2.0", "BBL_20_2.0",
-                    "STOCHk_14_3_3", "STOCHd_14_3_3", "ema20", "ema50", "adx", "cci", "atr"]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("frame before preparation", extra={
+            "shape": frame.data.shape,
+            "first_complete_row": frame.first_complete_row(FEATURE_COLS),
+        })
     
-    print(f"[DEBUG] DataFrame shape before preparation: {df.shape}")
-    print(f"[DEBUG] DataFrame columns: {df.columns.tolist()}")
-    print(f"[DEBUG] Checking for missing columns: {[col for col in feature_cols if col not in df.columns]}")
-    
-    pair_name = symbol.lower().replace("/", "")
-    scaler_path = os.path.join("app", "ml", "models", f"{pair_name}_{timeframe}", "scaler.save")
-    if not os.path.exists(scaler_path):
-        raise FileNotFoundError(f"Scaler not found at {scaler_path}")
-    scaler = joblib_load(scaler_path)
-    
-    X_input, _ = prepare_cnn_lstm_input(df, feature_cols, scaler=scaler)
-    print(f"[DEBUG] X_input shape: {X_input.shape if X_input is not None else 'None'}")
+    # One bundle for the whole request, even if a new version is swapped in meanwhile
+    with timed("model_load", symbol, timeframe):
+        bundle = registry.get(symbol, timeframe)
 
-    if len(X_input) > 0:
-        X_input = X_input[-1:]
-        print(f"[DEBUG] Using only last sequence: {X_input.shape}")
+    classes = ["BUY", "HOLD", "SELL"]
+    hybrid_probs = None
+    raw_xgb_signal, raw_xgb_probs = None, []
+    if tier == "fast":
+        # Only the student runs; the bundle builds its CNN-LSTM on the first full-tier request
+        with timed("student", symbol, timeframe):
+            student_probs = student_predict(frame, symbol, timeframe, bundle)
+        path, served_signal, served_probs = "student", classes[np.argmax(student_probs)], student_probs
     else:
-        raise ValueError("No valid sequences available for prediction")
+        # The raw XGBoost runs first: in cascade mode a confident raw signal is served
+        # as it is and the CNN-LSTM is skipped
+        try:
+            with timed("raw_xgb", symbol, timeframe):
+                raw_xgb_signal, raw_xgb_probs = raw_xgb_predict(frame, symbol, timeframe, bundle)
+        except Exception as e:
+            logger.warning("raw XGB prediction failed", extra={"pair": symbol, "timeframe": timeframe,
+                                                               "error": str(e)})
+            raw_xgb_signal = "ERROR"
+            raw_xgb_probs = [0.33, 0.33, 0.33]
 
-    cnn_lstm_model, xgb_model = load_hybrid_model(symbol, timeframe)
+        threshold = bundle.cascade_threshold if CASCADE_ENABLED else None
+        skip_cnn = threshold is not None and raw_xgb_signal != "ERROR" and max(raw_xgb_probs) >= threshold
+        # A sample of skipped requests still runs the hybrid, unserved, to measure agreement
+        shadow = skip_cnn and random.random() < CASCADE_SHADOW_RATE
 
-    hybrid_probs_array, _ = hybrid_predict(cnn_lstm_model, xgb_model, X_input)
-    hybrid_probs = hybrid_probs_array[0]
-
-    classes = ["BUY", "HOLD", "SELL"]
-    hybrid_signal = classes[np.argmax(hybrid_probs)]
+        if not skip_cnn or shadow:
+            with timed("scaling", symbol, timeframe):
+                X_input = prepare_last_window(frame, FEATURE_COLS, bundle.scaler)
 
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            with metric_labels(symbol, timeframe):
+                hybrid_probs_array, _ = hybrid_predict(bundle.cnn, bundle.xgb, X_input, bundle.feature_extractor)
+            hybrid_probs = hybrid_probs_array[0]
+            hybrid_signal = classes[np.argmax(hybrid_probs)]
 
-    db = SessionLocal()
+        if skip_cnn:
+            path, served_signal, served_probs = "raw_xgb", raw_xgb_signal, np.asarray(raw_xgb_probs)
+            if shadow:
+                CASCADE_SHADOW.labels(*series_labels(symbol, timeframe), str(hybrid_signal == raw_xgb_signal).lower()).inc()
+        else:
+            path, served_signal, served_probs = "hybrid", hybrid_signal, hybrid_probs
+    CASCADE_PATH.labels(*series_labels(symbol, timeframe), path).inc()
 
-    try:
-        raw_xgb_signal, raw_xgb_probs = raw_xgb_predict(df, symbol, timeframe)
-    except Exception as e:
-        print(f"Raw XGB prediction failed: {str(e)}")
-        raw_xgb_signal = "ERROR"
-        raw_xgb_probs = [0.33, 0.33, 0.33] 
+    now = datetime.utcnow().replace(microsecond=0)
 
-    try:
+    with timed("db_log", symbol, timeframe):
         log_prediction(
             symbol=symbol,
             timeframe=timeframe,
             timestamp=now,
-            signal=hybrid_signal,
+            signal=served_signal,
             probs={
                 "cnn_lstm_probs": [],
                 "xgb_probs": raw_xgb_probs,
-                "hybrid_probs": hybrid_probs.tolist(),
+                # Only when they produced `signal`, so the stored pair stays consistent
+                "hybrid_probs": hybrid_probs.tolist() if path == "hybrid" else [],
             },
-            db=db
+            bar_time=pd.Timestamp(frame.time[-1]).to_pydatetime(),
+            close=latest["close"],
+            raw_signal=raw_xgb_signal,
+            rule_signal=signal,
+            path=path,
         )
-    finally:
-        db.close()
 
     return {
-        "signal": hybrid_signal,
-        "confidence": float(np.max(hybrid_probs)),
+        "signal": served_signal,
+        "path": path,
+        "confidence": float(np.max(served_probs)),
         "probabilities": {
-            "BUY": float(hybrid_probs[0]),
-            "HOLD": float(hybrid_probs[1]),
-            "SELL": float(hybrid_probs[2])
+            "BUY": float(served_probs[0]),
+            "HOLD": float(served_probs[1]),
+            "SELL": float(served_probs[2])
         },
-        "raw_xgb": {
+        "raw_xgb": None if raw_xgb_signal is None else {
             "signal": raw_xgb_signal,
             "probabilities": {
                 "BUY": float(raw_xgb_probs[0]),
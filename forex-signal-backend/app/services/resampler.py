@@ -0,0 +1,83 @@
+"""Build higher-timeframe OHLC bars from the 15min series.
+
+Bars are labelled by their open time (as Twelve Data does) and bucketed
+left-closed from the Unix epoch plus an optional offset, so 30min and 1h
+buckets start on the clock half-hour/hour like the vendor's. A bucket is
+complete when it holds every base bar it spans. The newest bucket is usually
+still forming: `drop_partial=True` drops it (training data), otherwise it is
+kept like the vendor's own forming bar (live signals). Interior buckets with
+vendor gaps (e.g. around the weekend close) are kept with whatever base bars
+exist, matching how the vendor aggregates them.
+"""
+import numpy as np
+import pandas as pd
+
+from fxshared.bar_cache import interval_seconds
+
+OHLC_COLS = ["open", "high", "low", "close"]
+
+def resample_ratio(interval: str, base: str = "15min") -> int:
+    """How many base bars make one `interval` bar; ValueError if it is not a whole multiple"""
+    target_s, base_s = interval_seconds(interval), interval_seconds(base)
+    if target_s < base_s or target_s % base_s:
+        raise ValueError(f"Cannot build {interval} bars from {base} bars")
+    return target_s // base_s
+
+def resample_ohlc(df: pd.DataFrame, interval: str, base: str = "15min",
+                  drop_partial: bool = False, offset: str = "0min") -> pd.DataFrame:
+    """Aggregate a sorted time/open/high/low/close frame of `base` bars into `interval` bars"""
+    ratio = resample_ratio(interval, base)
+    if ratio == 1 or df.empty:
+        return df.reset_index(drop=True)
+
+    step = interval_seconds(interval) * 10**9
+    shift = pd.Timedelta(offset).value
+    times = df["time"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    ohlc = df[OHLC_COLS].to_numpy(dtype=np.float64)
+
+    buckets = (times - shift) // step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    out = np.empty((len(starts), 4))
+    out[:, 0] = ohlc[starts, 0]
+    out[:, 1] = np.maximum.reduceat(ohlc[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(ohlc[:, 2], starts)
+    out[:, 3] = ohlc[ends, 3]
+    bar_times = buckets[starts] * step + shift
+
+    if drop_partial and len(starts):
+        # The newest bucket is complete only once its last base bar is in
+        base_step = interval_seconds(base) * 10**9
+        if times[-1] < bar_times[-1] + step - base_step:
+            out, bar_times = out[:-1], bar_times[:-1]
+
+    resampled = pd.DataFrame(out, columns=OHLC_COLS)
+    resampled.insert(0, "time", bar_times.view("datetime64[ns]"))
+    return resampled
+
+def compare_bars(local: pd.DataFrame, vendor: pd.DataFrame, tolerance: float = 1e-9) -> dict:
+    """Diff locally aggregated bars against the vendor's own bars over their common time range"""
+    start = max(local["time"].iloc[0], vendor["time"].iloc[0])
+    end = min(local["time"].iloc[-1], vendor["time"].iloc[-1])
+    local = local[(local["time"] >= start) & (local["time"] <= end)]
+    vendor = vendor[(vendor["time"] >= start) & (vendor["time"] <= end)]
+
+    merged = local.merge(vendor, on="time", how="outer", suffixes=("_local", "_vendor"), indicator=True)
+    both = merged[merged["_merge"] == "both"]
+    report = {
+        "range": [str(start), str(end)],
+        "matched_bars": int(len(both)),
+        "only_local": [str(t) for t in merged.loc[merged["_merge"] == "left_only", "time"]],
+        "only_vendor": [str(t) for t in merged.loc[merged["_merge"] == "right_only", "time"]],
+        "max_abs_diff": {},
+        "mismatched_bars": 0,
+    }
+    mismatched = np.zeros(len(both), dtype=bool)
+    for col in OHLC_COLS:
+        diff = np.abs(both[f"{col}_local"].to_numpy() - both[f"{col}_vendor"].to_numpy())
+        report["max_abs_diff"][col] = float(diff.max()) if len(diff) else 0.0
+        mismatched |= diff > tolerance
+    report["mismatched_bars"] = int(mismatched.sum())
+    report["mismatched_times"] = [str(t) for t in both.loc[mismatched, "time"].head(20)]
+    return report
@@ -0,0 +1,163 @@
+"""Push signals to subscribers once per bar close.
+
+Each (pair, timeframe) topic runs a single loop that wakes at every bar
+boundary, fetches the closed bars, runs `make_prediction` once and fans the
+encoded payload out to every subscriber. Subscribers hold at most one pending
+update: a slow client skips to the newest bar instead of queueing stale ones.
+Recent events are kept per topic so a reconnecting client can resume from the
+last bar it saw.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import STREAM_HISTORY, STREAM_SETTLE_SECONDS, STREAM_RETRY_SECONDS, STREAM_MAX_RETRIES
+from app.core.metrics import STREAM_SUBSCRIBERS, STREAM_DROPPED, metric_labels
+from app.services.data_fetcher import fetch_ohlcv
+from app.services.predictor import make_prediction
+
+logger = logging.getLogger(__name__)
+
+def timeframe_to_timedelta(timeframe: str) -> timedelta:
+    if timeframe.endswith("min"):
+        return timedelta(minutes=int(timeframe[:-3]))
+    if timeframe.endswith("h"):
+        return timedelta(hours=int(timeframe[:-1]))
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+def floor_to_bar(ts: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    return epoch + ((ts - epoch) // step) * step
+
+class StreamEvent:
+    """One computed signal, encoded once for every transport"""
+    __slots__ = ("bar_time", "json", "sse")
+
+    def __init__(self, pair: str, timeframe: str, bar_time: datetime, prediction: dict):
+        self.bar_time = bar_time
+        self.json = orjson.dumps(
+            {"pair": pair, "timeframe": timeframe, "bar_time": bar_time, "prediction": prediction},
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+        self.sse = b"id: " + bar_time.isoformat().encode() + b"\nevent: signal\ndata: " + self.json + b"\n\n"
+
+class Subscriber:
+    def __init__(self, topic: "Topic", backlog: List[StreamEvent]):
+        self.topic = topic
+        self.backlog = backlog
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    def offer(self, event: StreamEvent) -> None:
+        if self._queue.full():
+            # Drop the stale update; only the newest bar matters
+            self._queue.get_nowait()
+            STREAM_DROPPED.labels(self.topic.pair, self.topic.timeframe).inc()
+        self._queue.put_nowait(event)
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[StreamEvent]:
+        """Backlog first, then live events; None on timeout"""
+        if self.backlog:
+            return self.backlog.pop(0)
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class Topic:
+    def __init__(self, pair: str, timeframe: str):
+        self.pair = pair
+        self.timeframe = timeframe
+        self.step = timeframe_to_timedelta(timeframe)
+        self.subscribers: Set[Subscriber] = set()
+        self.history: Deque[StreamEvent] = deque(maxlen=STREAM_HISTORY)
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def last_bar(self) -> Optional[datetime]:
+        return self.history[-1].bar_time if self.history else None
+
+    def publish(self, event: StreamEvent) -> None:
+        self.history.append(event)
+        for subscriber in self.subscribers:
+            subscriber.offer(event)
+
+    def _predict_closed_bars(self, closed_before: datetime):
+        with metric_labels(self.pair, self.timeframe):
+            df = fetch_ohlcv(self.pair, self.timeframe)
+            # The vendor series ends with the bar still forming; signal on closed bars only
+            df = df[df["time"] < closed_before]
+            bar_time = df["time"].iloc[-1].to_pydatetime()
+            if self.last_bar is not None and bar_time <= self.last_bar:
+                return bar_time, None
+            return bar_time, make_prediction(df, symbol=self.pair, timeframe=self.timeframe)
+
+    async def run(self) -> None:
+        while True:
+            boundary = floor_to_bar(datetime.utcnow(), self.step)
+            expected_bar = boundary - self.step
+
+            for attempt in range(STREAM_MAX_RETRIES + 1):
+                try:
+                    bar_time, prediction = await run_in_threadpool(self._predict_closed_bars, boundary)
+                except Exception as e:
+                    logger.warning("stream computation failed", extra={
+                        "pair": self.pair, "timeframe": self.timeframe, "error": str(e)
+                    })
+                    bar_time, prediction = None, None
+
+                if prediction is not None:
+                    self.publish(StreamEvent(self.pair, self.timeframe, bar_time, prediction))
+                if bar_time is not None and bar_time >= expected_bar:
+                    break
+                # The vendor has not published the closed bar yet
+                await asyncio.sleep(STREAM_RETRY_SECONDS)
+
+            next_close = boundary + self.step + timedelta(seconds=STREAM_SETTLE_SECONDS)
+            await asyncio.sleep(max(0.0, (next_close - datetime.utcnow()).total_seconds()))
+
+class SignalBroadcaster:
+    def __init__(self):
+        self.topics: Dict[Tuple[str, str], Topic] = {}
+
+    def subscribe(self, pair: str, timeframe: str, since: Optional[datetime] = None) -> Subscriber:
+        key = (pair, timeframe)
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = Topic(pair, timeframe)
+
+        if since is not None:
+            backlog = [event for event in topic.history if event.bar_time > since]
+        else:
+            backlog = [topic.history[-1]] if topic.history else []
+
+        subscriber = Subscriber(topic, backlog)
+        topic.subscribers.add(subscriber)
+        STREAM_SUBSCRIBERS.labels(pair, timeframe).inc()
+
+        if topic.task is None or topic.task.done():
+            topic.task = asyncio.get_running_loop().create_task(topic.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        topic = subscriber.topic
+        if subscriber not in topic.subscribers:
+            return
+        topic.subscribers.discard(subscriber)
+        STREAM_SUBSCRIBERS.labels(topic.pair, topic.timeframe).dec()
+        # History is kept so later subscribers can still resume
+        if not topic.subscribers and topic.task is not None:
+            topic.task.cancel()
+            topic.task = None
+
+    async def close(self) -> None:
+        tasks = [topic.task for topic in self.topics.values() if topic.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+broadcaster = SignalBroadcaster()
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import xgboost as xgb
+import joblib
+import tensorflow as tf
+from sklearn.preprocessing import MinMaxScaler, LabelEncoder
+
+from app.ml.data_preparation import prepare_cnn_lstm_input
+from app.ml.train.train_cnn_lstm import create_cnn_lstm_model
+from generate_training_data import label_signal
+
+FEATURE_COLS = ["close", "rsi", "MACD", "MACD_Signal", "BBU_20_2.0", "BBL_20_2.0",
+                "STOCHk_14_3_3", "STOCHd_14_3_3", "ema20", "ema50", "adx", "cci", "atr"]
+
+XGB_PARAMS = {
+    "objective": "multi:softprob",
+    "num_class": 3,
+    "eval_metric": "mlogloss",
+    "eta": 0.1,
+    "max_depth": 4,
+    "seed": 42
+}
+
+def build_fixture_bundle(model_dir: str, df, train_rows: int = 600, boost_rounds: int = 10) -> str:
+    """Write a full model bundle trained for a single pass on a small slice of `df`.
+
+    `df` must already carry indicator columns. The architecture matches the
+    production trainers so inference cost is representative; only fit quality
+    is sacrificed.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    tf.keras.utils.set_random_seed(42)
+
+    df = df.dropna().tail(train_rows).copy()
+    labels = df.apply(label_signal, axis=1).to_numpy()
+
+    # CNN-LSTM + its scaler
+    X, scaler = prepare_cnn_lstm_input(df, FEATURE_COLS)
+    y_seq = np.eye(3)[labels[-len(X):]]
+    cnn_model = create_cnn_lstm_model(input_shape=X.shape[1:], num_classes=3)
+    cnn_model.fit(X, y_seq, epochs=1, batch_size=64, verbose=0)
+    cnn_model.save(os.path.join(model_dir, "cnn_lstm_model.h5"))
+    joblib.dump(scaler, os.path.join(model_dir, "scaler.save"))
+
+    # Hybrid XGBoost on CNN features
+    feature_extractor = tf.keras.Model(
+        inputs=cnn_model.inputs,
+        outputs=cnn_model.layers[-2].output
+    )
+    features = feature_extractor.predict(X, verbose=0)
+    hybrid = xgb.train(XGB_PARAMS, xgb.DMatrix(features, label=labels[-len(X):]), num_boost_round=boost_rounds)
+    hybrid.save_model(os.path.join(model_dir, "xgb_model.json"))
+
+    # Raw XGBoost on tabular features
+    raw_scaler = MinMaxScaler()
+    X_raw = raw_scaler.fit_transform(df[FEATURE_COLS])
+    le = LabelEncoder().fit([0, 1, 2])
+    raw = xgb.train(XGB_PARAMS, xgb.DMatrix(X_raw, label=le.transform(labels)), num_boost_round=boost_rounds)
+    raw.save_model(os.path.join(model_dir, "xgb_raw_model.json"))
+    joblib.dump(raw_scaler, os.path.join(model_dir, "xgb_raw_scaler.save"))
+    joblib.dump(le, os.path.join(model_dir, "label_encoder.save"))
+
+    return model_dir
@@ -0,0 +1,113 @@
+"""Offline benchmarks for the signal hot path.
+
+Runs every stage of a /api/signal request against synthetic bars and a
+fixture model bundle, so no API key, network or trained models are needed:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+PAIR = "EUR/USD"
+TIMEFRAME = "15min"
+
+def run(bars: int, repeat: int, warmup: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="signal-bench-")
+    os.environ["MODEL_DIR"] = os.path.join(workdir, "models")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("TWELVE_DATA_API_KEY", "offline-benchmark")
+
+    from fxshared.bench.synthetic import generate_ohlcv, to_time_series_payload
+    from benchmarks.fixtures import build_fixture_bundle, FEATURE_COLS
+    from fxshared.bench.harness import measure, build_report
+    from app.db.database import Base, engine
+    from app.models.prediction import PredictionRollup  # noqa: F401  (registers the tables)
+    from app.ml.data_preparation import prepare_cnn_lstm_input, prepare_last_window
+    from app.ml.feature_frame import FeatureFrame
+    from app.ml.bundle import BUNDLE_FILE, load_bundle, load_loose_bundle, save_bundle
+    from app.ml.models import load_hybrid_model, hybrid_predict, get_model_dir
+    from app.services.data_fetcher import parse_ohlcv
+    from app.services.predictor import add_indicators, compute_indicators, raw_xgb_predict, make_prediction
+    from joblib import load as joblib_load
+
+    Base.metadata.create_all(bind=engine)
+
+    raw = generate_ohlcv(bars, TIMEFRAME)
+    payload = to_time_series_payload(raw, PAIR, TIMEFRAME)
+    df = parse_ohlcv(payload)
+    indicators = add_indicators(df)
+
+    build_fixture_bundle(get_model_dir(PAIR, TIMEFRAME), indicators)
+    bundle_path = os.path.join(get_model_dir(PAIR, TIMEFRAME), BUNDLE_FILE)
+    save_bundle(bundle_path, load_loose_bundle(get_model_dir(PAIR, TIMEFRAME)))
+    scaler = joblib_load(os.path.join(get_model_dir(PAIR, TIMEFRAME), "scaler.save"))
+    cnn_model, xgb_model = load_hybrid_model(PAIR, TIMEFRAME)
+    X_input, _ = prepare_cnn_lstm_input(indicators, FEATURE_COLS, scaler=scaler)
+    X_input = X_input[-1:]
+    frame = compute_indicators(FeatureFrame.from_dataframe(df))
+
+    stages = {
+        "fetch_ohlcv_parse": lambda: parse_ohlcv(payload),
+        "add_indicators": lambda: add_indicators(df),
+        "feature_frame": lambda: FeatureFrame.from_dataframe(df),
+        "compute_indicators": lambda: compute_indicators(FeatureFrame.from_dataframe(df)),
+        "prepare_cnn_lstm_input": lambda: prepare_cnn_lstm_input(indicators, FEATURE_COLS, scaler=scaler),
+        "prepare_last_window": lambda: prepare_last_window(frame, FEATURE_COLS, scaler),
+        "load_hybrid_model": lambda: load_hybrid_model(PAIR, TIMEFRAME),
+        "load_bundle": lambda: load_bundle(bundle_path),
+        "hybrid_predict": lambda: hybrid_predict(cnn_model, xgb_model, X_input),
+        "raw_xgb_predict": lambda: raw_xgb_predict(frame, PAIR, TIMEFRAME),
+        "make_prediction": lambda: make_prediction(df, symbol=PAIR, timeframe=TIMEFRAME),
+    }
+
+    results = {name: measure(fn, repeat=repeat, warmup=warmup) for name, fn in stages.items()}
+
+    return build_report(results, app="forex-signal-backend", pair=PAIR, timeframe=TIMEFRAME,
+                        bars=bars, repeat=repeat)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline signal hot-path benchmarks")
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", default="signal_bench.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float,
+                        default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.2")),
+                        help="Allowed relative slowdown of the median per stage")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="Allowed relative growth of peak traced memory per stage")
+    args = parser.parse_args()
+
+    from fxshared.bench.harness import save_report, compare_reports, print_report
+
+    report = run(args.bars, args.repeat, args.warmup)
+    save_report(report, args.output)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(report, baseline)
+    print(f"\nResults saved to {args.output}")
+
+    if baseline is not None:
+        regressions = compare_reports(report, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Fill the shared-memory bar cache for both services.
+
+Run one feeder per host; start the apps with BAR_CACHE_ENABLED=1 and every
+uvicorn worker of the signal backend and the forecast service reads bars from
+shared memory instead of calling Twelve Data itself:
+
+    python feed_bars.py --pairs EUR/USD GBP/USD --intervals 15min 30min 1h
+
+Each series is polled once per bar, --settle-seconds after the bar closes, so
+one pair costs 96 credits a day at 15min. The first poll loads
+BAR_CACHE_CAPACITY bars; later polls only ask for the bars missed since the
+last one (at least 50, the fetcher minimum). A failed poll is retried after
+the vendor's retry hint or --retry-seconds, never later than the next close.
+Segments are unlinked when the feeder exits. With RESAMPLE_ENABLED=1 the apps
+derive 30min/1h from the 15min segment, so the feeder defaults to feeding
+RESAMPLE_BASE_INTERVAL alone.
+"""
+import argparse
+import math
+import os
+import signal
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fxshared.bar_cache import BarRing, segment_name, interval_seconds
+from fxshared.credit_governor import BATCH, UpstreamUnavailable
+from app.core.config import BAR_CACHE_PREFIX, BAR_CACHE_CAPACITY, RESAMPLE_ENABLED, RESAMPLE_BASE_INTERVAL
+from app.services.data_fetcher import fetch_ohlcv
+
+MIN_OUTPUTSIZE = 50
+
+def bars_to_request(ring: BarRing, interval: str) -> int:
+    if ring.seq == 0:
+        return ring.capacity
+    missed = math.ceil((time.time() - ring.updated_at) / interval_seconds(interval)) + 2
+    return max(MIN_OUTPUTSIZE, min(ring.capacity, missed))
+
+def next_close(interval: str, now: float, settle_seconds: float) -> float:
+    """Unix time settle_seconds after the bar forming at `now` closes"""
+    step = interval_seconds(interval)
+    return (now // step + 1) * step + settle_seconds
+
+def feed(pairs, intervals, settle_seconds: float, retry_seconds: float, capacity: int):
+    rings = {(pair, interval): BarRing.create(segment_name(BAR_CACHE_PREFIX, pair, interval), capacity)
+             for pair in pairs for interval in intervals}
+    print(f"✅ Created {len(rings)} segments ({capacity} bars each)")
+    due = {key: time.time() for key in rings}
+    try:
+        while True:
+            time.sleep(max(0.0, min(due.values()) - time.time()))
+            for (pair, interval), ring in rings.items():
+                now = time.time()
+                if due[(pair, interval)] > now:
+                    continue
+                due[(pair, interval)] = next_close(interval, now, settle_seconds)
+                try:
+                    # BATCH never falls back to the last good bars: publishing those would stamp stale bars
+                    # as fresh, so a failed fetch leaves the segment to age out instead
+                    df = fetch_ohlcv(pair, interval, outputsize=bars_to_request(ring, interval), use_cache=False,
+                                     resample=False, priority=BATCH)
+                    added = ring.publish(df)
+                    if added:
+                        print(f"{pair} {interval}: +{added} bars (seq {ring.seq}, last {df['time'].iloc[-1]})")
+                except Exception as e:
+                    print(f"❌ {pair} {interval}: {e}")
+                    retry = e.retry_after if isinstance(e, UpstreamUnavailable) else retry_seconds
+                    due[(pair, interval)] = min(due[(pair, interval)], time.time() + max(retry, 1.0))
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish vendor bars into the shared-memory cache")
+    parser.add_argument("--pairs", nargs="+", default=["EUR/USD"])
+    parser.add_argument("--intervals", nargs="+",
+                        default=[RESAMPLE_BASE_INTERVAL] if RESAMPLE_ENABLED else ["15min", "30min", "1h"])
+    parser.add_argument("--settle-seconds", type=float, default=5.0,
+                        help="Delay after each bar close before polling, so the vendor has the closed bar")
+    parser.add_argument("--retry-seconds", type=float, default=60.0)
+    parser.add_argument("--capacity", type=int, default=BAR_CACHE_CAPACITY)
+    args = parser.parse_args()
+
+    # Unlink the segments on SIGTERM too, not just Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        feed(args.pairs, args.intervals, args.settle_seconds, args.retry_seconds, args.capacity)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 import os
 import sys
+import json
+import argparse
 import pandas as pd
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import pandas_ta as ta
 from tqdm import tqdm
+from fxshared.bar_cache import interval_seconds
+from fxshared.credit_governor import BATCH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.services.data_fetcher import fetch_ohlcv
+from app.services.resampler import OHLC_COLS, resample_ohlc, resample_ratio, compare_bars
 
 # --- CONFIG ---
 SYMBOLS = [
@@ -28,6 +35,11 @@ HISTORY_SIZE = 5000
 OUTPUT_SIZE = 10000 
 OUTPUT_FILE = "app/ml/data/training_data.csv"
 SEQUENCE_LENGTH = 100
+BASE_TIMEFRAME = "15min"
+DATA_DIR = "app/ml/data"
+STATE_FILE = os.path.join(DATA_DIR, "generation_state.json")
+WARMUP_ROWS = 300  # stored bars indicators are recomputed over before appending
+DEFAULT_WORKERS = 4
 
 def add_indicators(df):
     try:
@@ -78,43 +90,223 @@ def label_signal(row):
         return 2  # SELL
     return 1  # HOLD
 
-def generate_data():
-    batch_size = 2
-    delay_seconds = 60  # Wait 1 minute between batches
-    
-    for i in range(0, len(SYMBOLS), batch_size):
-        batch = SYMBOLS[i:i + batch_size]
-        print(f"\nProcessing batch {i//batch_size + 1}: {batch}")
-        
-        for symbol in batch:
-            for timeframe in TIMEFRAMES:
-                pair_name = symbol.lower().replace("/", "")
-                output_file = f"app/ml/data/{pair_name}_{timeframe}.csv"
-                
-                try:
-                    print(f"Fetching {symbol} {timeframe}...")
-                    df = fetch_ohlcv(symbol, timeframe, HISTORY_SIZE)
-                    df = add_indicators(df)
-                    df.dropna(inplace=True)
-                    
-                    if len(df) < SEQUENCE_LENGTH:
-                        print(f"⚠️ Insufficient data for {symbol} {timeframe} ({len(df)} rows)")
-                        continue
-                        
-                    df["label"] = df.apply(label_signal, axis=1)
-                    df.to_csv(output_file, index=False)
-                    print(f"✅ Saved {len(df)} rows to {output_file}")
-                    
-                except Exception as e:
-                    print(f"❌ Failed {symbol} {timeframe}: {str(e)}")
-        
-        # Delay between batches (only if more batches remain)
-        if i + batch_size < len(SYMBOLS):
-            print(f"\n⏳ Waiting {delay_seconds} seconds to avoid rate limits...")
-            time.sleep(delay_seconds)
-    
-    print("\nData generation completed")
-    return True
+def validate_resampling(symbols, output=None):
+    """Diff locally aggregated bars against the vendor's bars for every higher timeframe"""
+    reports = {}
+    for symbol in symbols:
+        base = fetch_ohlcv(symbol, BASE_TIMEFRAME, HISTORY_SIZE, resample=False, priority=BATCH)
+        for timeframe in TIMEFRAMES:
+            if timeframe == BASE_TIMEFRAME:
+                continue
+            vendor = fetch_ohlcv(symbol, timeframe, HISTORY_SIZE, resample=False, priority=BATCH)
+            report = compare_bars(resample_ohlc(base, timeframe, BASE_TIMEFRAME, drop_partial=True), vendor)
+            reports[f"{symbol} {timeframe}"] = report
+            status = "✅" if report["mismatched_bars"] == 0 and not report["only_local"] and not report["only_vendor"] else "❌"
+            print(f"{status} {symbol} {timeframe}: {report['matched_bars']} bars matched, "
+                  f"{report['mismatched_bars']} differ, {len(report['only_local'])} only local, "
+                  f"{len(report['only_vendor'])} only vendor, max diff {report['max_abs_diff']}")
+    if output:
+        with open(output, "w") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+def dataset_path(symbol, timeframe):
+    return os.path.join(DATA_DIR, f"{symbol.lower().replace('/', '')}_{timeframe}.csv")
+
+def closed_bars(df, timeframe, now):
+    """Drop the still-forming newest bar: appended rows are never revisited"""
+    step = pd.Timedelta(seconds=interval_seconds(timeframe))
+    return df[df["time"] + step <= now].reset_index(drop=True)
+
+def newest_closed(timeframe, now):
+    step = interval_seconds(timeframe)
+    return pd.Timestamp((int(now.timestamp()) // step - 1) * step, unit="s")
+
+class Checkpoints:
+    """Per-dataset progress in STATE_FILE, rewritten atomically after every dataset.
+
+    `bytes` is the CSV size after the last completed write. A larger file means
+    an append was cut short, and is truncated back; no `bytes` means the file
+    was written whole (os.replace) and is taken as it is.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        with self._lock:
+            return dict(self.entries.get(key, {}))
+
+    def update(self, key, **fields):
+        with self._lock:
+            entry = self.entries.setdefault(key, {})
+            entry.update(fields)
+            for name in [name for name, value in fields.items() if value is None]:
+                entry.pop(name)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(self.path + ".tmp", self.path)
+
+def load_dataset(path, entry):
+    """The stored dataset with any uncheckpointed tail cut off; None if it has to be rebuilt"""
+    if not os.path.exists(path):
+        return None
+    size = os.path.getsize(path)
+    if entry.get("bytes") is not None:
+        if size < entry["bytes"]:
+            return None
+        if size > entry["bytes"]:
+            os.truncate(path, entry["bytes"])
+    df = pd.read_csv(path, parse_dates=["time"])
+    return df if len(df) else None
+
+def plan_fetch(symbol, timeframe, stored, now, force):
+    """Bars to request for one dataset: 0 if it is up to date, HISTORY_SIZE to rebuild it"""
+    if stored is None or force:
+        return HISTORY_SIZE
+    last = stored["time"].iloc[-1]
+    if last >= newest_closed(timeframe, now):
+        return 0
+    # The still-forming bar plus slack for the overlap check; the vendor returns at least 50
+    missing = int((now - last).total_seconds() // interval_seconds(timeframe)) + 3
+    return HISTORY_SIZE if missing >= HISTORY_SIZE else max(50, missing)
+
+def write_dataset(symbol, timeframe, bars, stored, checkpoints, now, full_history=False):
+    """Append the new closed bars to the stored dataset, or rebuild it from `bars`; returns the action taken"""
+    key = f"{symbol} {timeframe}"
+    path = dataset_path(symbol, timeframe)
+    bars = closed_bars(bars, timeframe, now)
+
+    if stored is not None:
+        last = stored["time"].iloc[-1]
+        new = bars[bars["time"] > last]
+        if new.empty:
+            checkpoints.update(key, checked_at=now.isoformat())
+            return "up to date"
+        if bars["time"].iloc[0] <= last:
+            # Indicators restart from the stored bars so EMA/ADX carry on from their settled values
+            context = stored[["time"] + OHLC_COLS].tail(WARMUP_ROWS)
+            df = add_indicators(pd.concat([context, new[["time"] + OHLC_COLS]], ignore_index=True))
+            df = df.tail(len(new)).dropna()
+            df["label"] = df.apply(label_signal, axis=1)
+            with open(path, "a", newline="") as f:
+                df[stored.columns].to_csv(f, header=False, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+            checkpoints.update(key, bytes=os.path.getsize(path), last_bar=str(df["time"].iloc[-1]),
+                               rows=len(stored) + len(df), checked_at=now.isoformat())
+            return f"appended {len(df)} rows"
+        if not full_history:
+            raise ValueError(f"fetched bars start after the stored dataset ends ({last}); rerun with --force")
+
+    df = add_indicators(bars)
+    df.dropna(inplace=True)
+    if len(df) < SEQUENCE_LENGTH:
+        raise ValueError(f"Insufficient data ({len(df)} rows)")
+    df["label"] = df.apply(label_signal, axis=1)
+    # A whole-file write carries no size; a crash before the next line leaves the old or the new file
+    checkpoints.update(key, bytes=None)
+    df.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    checkpoints.update(key, bytes=os.path.getsize(path), last_bar=str(df["time"].iloc[-1]), rows=len(df),
+                       checked_at=now.isoformat())
+    return f"rebuilt with {len(df)} rows"
+
+def generate_symbol(symbol, timeframes, resample, checkpoints, force):
+    """Bring every dataset of one symbol up to date; returns {timeframe: action or error}"""
+    now = pd.Timestamp(datetime.utcnow())
+    stored, sizes, results = {}, {}, {}
+    for timeframe in timeframes:
+        try:
+            stored[timeframe] = None if force else load_dataset(dataset_path(symbol, timeframe),
+                                                                checkpoints.get(f"{symbol} {timeframe}"))
+        except Exception as e:
+            print(f"⚠️ {symbol} {timeframe}: unreadable dataset, rebuilding ({e})")
+            stored[timeframe] = None
+        sizes[timeframe] = plan_fetch(symbol, timeframe, stored[timeframe], now, force)
+        if sizes[timeframe] == 0:
+            results[timeframe] = "up to date"
+    pending = [timeframe for timeframe in timeframes if sizes[timeframe]]
+    if not pending:
+        return results
+
+    base = None
+    if resample:
+        # One vendor call per symbol, sized for the dataset furthest behind
+        ratios = {tf: resample_ratio(tf, BASE_TIMEFRAME) for tf in pending}
+        base_size = min(HISTORY_SIZE, max((sizes[tf] + 1) * ratios[tf] for tf in pending))
+        try:
+            base = fetch_ohlcv(symbol, BASE_TIMEFRAME, max(50, base_size), resample=False, priority=BATCH)
+        except Exception as e:
+            return {**results, **{timeframe: e for timeframe in pending}}
+
+    for timeframe in pending:
+        try:
+            if base is not None:
+                # Training uses closed bars only, so drop the still-forming bucket
+                bars = resample_ohlc(base, timeframe, BASE_TIMEFRAME, drop_partial=True)
+            else:
+                bars = fetch_ohlcv(symbol, timeframe, sizes[timeframe], resample=False, priority=BATCH)
+            results[timeframe] = write_dataset(symbol, timeframe, bars, stored[timeframe], checkpoints, now,
+                                               full_history=sizes[timeframe] == HISTORY_SIZE)
+        except Exception as e:
+            results[timeframe] = e
+    return results
+
+def generate_data(symbols=SYMBOLS, resample=False, workers=DEFAULT_WORKERS, force=False, timeframes=TIMEFRAMES):
+    """Update every (symbol, timeframe) dataset, `workers` symbols at a time.
+
+    Datasets whose newest closed bar is already stored cost no API call; the
+    others fetch only the bars they are missing and append them. Pacing comes
+    from the credit governor: batch fetches wait for budget left over after
+    the live reserve, so more workers only help until the quota is the limit.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    checkpoints = Checkpoints()
+    started = time.monotonic()
+    summary = {"up to date": 0, "appended": 0, "rebuilt": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(generate_symbol, symbol, timeframes, resample, checkpoints, force): symbol
+                   for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                results = {timeframe: e for timeframe in timeframes}
+            for timeframe, result in results.items():
+                if isinstance(result, Exception):
+                    summary["failed"] += 1
+                    print(f"❌ Failed {symbol} {timeframe}: {result}")
+                else:
+                    summary["up to date" if result == "up to date" else result.split()[0]] += 1
+                    print(f"✅ {symbol} {timeframe}: {result}")
+
+    print(f"\nData generation completed in {time.monotonic() - started:.0f}s: "
+          + ", ".join(f"{n} {name}" for name, n in summary.items()))
+    return summary
 
 if __name__ == "__main__":
-    generate_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch bars, add indicators and label training data")
+    parser.add_argument("--resample", action="store_true",
+                        help=f"Fetch {BASE_TIMEFRAME} once per symbol and build the other timeframes locally")
+    parser.add_argument("--validate", action="store_true",
+                        help="Only diff locally resampled bars against the vendor's bars")
+    parser.add_argument("--symbols", nargs="+", default=SYMBOLS)
+    parser.add_argument("--timeframes", nargs="+", default=TIMEFRAMES)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Symbols processed concurrently")
+    parser.add_argument("--force", action="store_true", help="Rebuild every dataset instead of appending")
+    parser.add_argument("--output", help="Validation report JSON path")
+    args = parser.parse_args()
+    
+    if args.validate:
+        validate_resampling(args.symbols, args.output)
+    else:
+        generate_data(args.symbols, resample=args.resample, workers=args.workers, force=args.force,
+                      timeframes=args.timeframes)
\ No newline at end of file
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.core.config and app.db.database read these at import time
+_DB_DIR = tempfile.mkdtemp(prefix="signal-tests-")
+os.environ.setdefault("TWELVE_DATA_API_KEY", "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def db():
+    """Empty tables for one test; prediction partitions it creates are dropped afterwards"""
+    from sqlalchemy import inspect, text
+    from app.db.database import Base, engine
+    from app.models import PredictionRollup, OutcomeCount  # noqa: F401  (registers the tables)
+    from app.models.prediction import PARTITION_PREFIX
+    from app.services import prediction_store
+
+    static = [table for name, table in Base.metadata.tables.items() if not name.startswith(PARTITION_PREFIX)]
+    Base.metadata.create_all(bind=engine, tables=static)
+    yield engine
+
+    with engine.begin() as conn:
+        for name in inspect(engine).get_table_names():
+            conn.execute(text(f'DROP TABLE "{name}"'))
+    for name in [name for name in Base.metadata.tables if name.startswith(PARTITION_PREFIX)]:
+        Base.metadata.remove(Base.metadata.tables[name])
+    prediction_store._created.clear()
@@ -0,0 +1,122 @@
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fxshared import bar_cache
+from fxshared.bar_cache import UPDATED_SLOT, BarRing, read_bars, segment_name
+
+def _bars(start, n, price=1.0):
+    """n 15min bars from bar index `start`; every OHLC value of bar k is price + k"""
+    index = np.arange(start, start + n)
+    values = price + index.astype(float)
+    return pd.DataFrame({"time": pd.Timestamp("2026-03-02") + pd.to_timedelta(index * 15, unit="min"),
+                         "open": values, "high": values, "low": values, "close": values})
+
+@pytest.fixture
+def prefix(monkeypatch):
+    # The writer and its readers share this process; a reader unregistering the segment from the resource
+    # tracker, as separate worker processes must, would make the tracker forget the writer's registration too
+    monkeypatch.setattr(bar_cache, "resource_tracker", SimpleNamespace(unregister=lambda name, rtype: None))
+    return f"fxtest{uuid.uuid4().hex[:8]}"
+
+@pytest.fixture
+def ring(prefix):
+    ring = BarRing.create(segment_name(prefix, "EUR/USD", "15min"), capacity=8)
+    yield ring
+    bar_cache._rings.pop(ring.shm.name, None)
+    ring.close()
+
+def test_publish_appends_only_newer_bars(ring):
+    assert ring.publish(_bars(0, 5)) == 5
+    assert ring.publish(_bars(2, 5)) == 2  # bars 2-4 are already stored
+    seq, df = ring.read()
+    assert seq == 4 and list(df["close"]) == [1.0 + k for k in range(7)]
+
+def test_publish_wraps_around_and_stays_contiguous(ring):
+    ring.publish(_bars(0, 6))
+    ring.publish(_bars(6, 5))
+    _, df = ring.read()
+    assert list(df["close"]) == [1.0 + k for k in range(3, 11)]
+    assert df["time"].is_monotonic_increasing
+
+    _, times, ohlc = ring.view(4)
+    assert ohlc.base is not None  # a view into the segment, not a copy
+    assert list(ohlc[:, 3]) == [8.0, 9.0, 10.0, 11.0]
+
+    # More new bars than the ring holds keeps the newest `capacity`
+    assert ring.publish(_bars(11, 20)) == 20
+    _, df = ring.read()
+    assert list(df["close"]) == [1.0 + k for k in range(23, 31)]
+
+def test_forming_bar_is_replaced_in_place(ring):
+    ring.publish(_bars(0, 4))
+    seq = ring.seq
+    assert ring.publish(_bars(3, 1, price=5.0)) == 0  # bar 3 again, still forming when first published
+    _, df = ring.read()
+    assert ring.seq == seq + 2
+    assert list(df["close"]) == [1.0, 2.0, 3.0, 8.0]
+
+    # Both copies were rewritten: the bar reads the same from the other half once the ring wraps
+    ring.publish(_bars(4, 7))
+    _, df = ring.read()
+    assert list(df["close"]) == [8.0] + [1.0 + k for k in range(4, 11)]
+
+def test_read_bars_checks_length_and_staleness(ring, prefix, monkeypatch):
+    assert read_bars("EUR/USD", "15min", 4, prefix, grace_seconds=60) is None  # never published
+    ring.publish(_bars(0, 6))
+    assert list(read_bars("EUR/USD", "15min", 4, prefix, 60)["close"]) == [3.0, 4.0, 5.0, 6.0]
+    assert read_bars("EUR/USD", "15min", 7, prefix, 60) is None
+
+    now = time.time()
+    monkeypatch.setattr(bar_cache.time, "time", lambda: now + 15 * 60 + 61)
+    assert read_bars("EUR/USD", "15min", 4, prefix, 60) is None
+    assert read_bars("GBP/USD", "15min", 4, prefix, 60) is None
+
+def test_read_bars_reattaches_to_a_recreated_segment(prefix):
+    name = segment_name(prefix, "EUR/USD", "15min")
+    old = BarRing.create(name, capacity=8)
+    old.publish(_bars(0, 6))
+    assert read_bars("EUR/USD", "15min", 4, prefix, 60) is not None
+    first = bar_cache._rings[name]
+
+    # The feeder dies with its last publish going stale, then restarts with a new segment under the same name
+    old._header[UPDATED_SLOT] -= (15 * 60 + 61) * 10 ** 9
+    old.close()
+    new = BarRing.create(name, capacity=8)
+    try:
+        new.publish(_bars(100, 6))
+        df = read_bars("EUR/USD", "15min", 4, prefix, 60)
+        assert list(df["close"]) == [103.0, 104.0, 105.0, 106.0]
+        assert bar_cache._rings[name] is not first
+    finally:
+        bar_cache._rings.pop(name).close()
+        new.close()
+
+def test_reads_during_concurrent_writes_are_never_torn(ring):
+    reader = BarRing.attach(ring.shm.name)
+    stop, torn, reads = threading.Event(), [], [0]
+
+    def read_loop():
+        while not stop.is_set():
+            _, df = reader.read(8)
+            closes, times = df["close"].to_numpy(), df["time"].to_numpy()
+            steps = np.diff(times).astype("timedelta64[m]").astype(int)
+            if len(df) and not ((np.diff(closes) == 1.0).all() and (steps == 15).all()):
+                torn.append(df)
+            reads[0] += 1
+
+    thread = threading.Thread(target=read_loop)
+    thread.start()
+    try:
+        for k in range(0, 3000, 3):
+            ring.publish(_bars(k, 3))
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+    assert reads[0] > 0 and not torn
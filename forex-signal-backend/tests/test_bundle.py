@@ -0,0 +1,157 @@
+import os
+
+import numpy as np
+import pytest
+import tensorflow as tf
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder, MinMaxScaler
+
+from app.ml.bundle import BUNDLE_FILE, BundleError, ModelBundle, load_bundle, read_manifest, save_bundle, write_bundle
+from app.services import model_registry
+from app.services.catalog import ModelCatalog
+from app.services.model_registry import ModelRegistry
+
+SEQUENCE, INPUTS, FEATURES = 6, 4, 8
+PARAMS = {"objective": "multi:softprob", "num_class": 3, "max_depth": 2, "seed": 0}
+
+def _booster(X, rounds=3):
+    labels = np.arange(len(X)) % 3
+    return xgb.train(PARAMS, xgb.DMatrix(X, label=labels), num_boost_round=rounds)
+
+@pytest.fixture(scope="module")
+def bundle():
+    """A tiny but complete bundle: CNN-LSTM, hybrid and raw XGBoost, scalers, label encoder and student"""
+    tf.keras.utils.set_random_seed(0)
+    cnn = tf.keras.Sequential([
+        tf.keras.Input(shape=(SEQUENCE, INPUTS)),
+        tf.keras.layers.LSTM(4),
+        tf.keras.layers.Dense(FEATURES, activation="relu"),
+        tf.keras.layers.Dense(3, activation="softmax"),
+    ])
+    rng = np.random.default_rng(0)
+    rows = rng.normal(size=(60, INPUTS))
+    student = _booster(rng.normal(size=(30, INPUTS * 2)))
+    student.set_attr(lags="1", fidelity='{"agreement": 0.9}')
+    return ModelBundle(
+        cnn=cnn,
+        xgb_model=_booster(rng.normal(size=(30, FEATURES))),
+        scaler=MinMaxScaler().fit(rows),
+        raw_xgb=_booster(rows),
+        raw_scaler=MinMaxScaler().fit(rows * 2),
+        label_encoder=LabelEncoder().fit([0, 1, 2]),
+        student=student,
+    )
+
+def _pack(bundle, model_dir, **meta) -> str:
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, BUNDLE_FILE)
+    save_bundle(path, bundle, **meta)
+    return path
+
+def test_round_trip_matches_the_source_models(bundle, tmp_path):
+    path = _pack(bundle, tmp_path, cascade={"threshold": 0.8})
+    loaded = load_bundle(path)
+
+    assert loaded.version == 1 and loaded.cascade_threshold == 0.8
+    assert loaded.manifest["sequence_length"] == SEQUENCE and loaded.manifest["n_inputs"] == INPUTS
+    assert loaded.manifest["feature_size"] == FEATURES
+    assert loaded.manifest["student"] == {"lags": [1], "fidelity": {"agreement": 0.9}}
+
+    X = np.random.default_rng(1).normal(size=(5, INPUTS))
+    np.testing.assert_array_equal(loaded.scaler.transform(X), bundle.scaler.transform(X))
+    np.testing.assert_array_equal(loaded.raw_scaler.transform(X), bundle.raw_scaler.transform(X))
+    np.testing.assert_array_equal(loaded.label_encoder.classes_, bundle.label_encoder.classes_)
+    np.testing.assert_allclose(loaded.raw_xgb.predict(xgb.DMatrix(X)), bundle.raw_xgb.predict(xgb.DMatrix(X)))
+    features = np.random.default_rng(2).normal(size=(5, FEATURES))
+    np.testing.assert_allclose(loaded.xgb.predict(xgb.DMatrix(features)), bundle.xgb.predict(xgb.DMatrix(features)))
+    assert loaded.student.attr("lags") == "1"
+
+def test_cnn_is_built_on_first_use(bundle, tmp_path):
+    loaded = load_bundle(_pack(bundle, tmp_path))
+    assert not loaded.cnn_loaded
+
+    window = np.random.default_rng(3).normal(size=(2, SEQUENCE, INPUTS)).astype(np.float32)
+    np.testing.assert_allclose(loaded.cnn.predict(window, verbose=0), bundle.cnn.predict(window, verbose=0),
+                               rtol=1e-5)
+    assert loaded.cnn_loaded
+    assert loaded.feature_extractor.predict(window, verbose=0).shape == (2, FEATURES)
+
+def test_versions_increase_on_every_save(bundle, tmp_path):
+    path = _pack(bundle, tmp_path)
+    _pack(bundle, tmp_path)
+    assert read_manifest(path)["version"] == 2
+    assert not os.path.exists(f"{path}.tmp")
+
+def test_damaged_files_raise_bundle_error(bundle, tmp_path):
+    path = _pack(bundle, tmp_path)
+    data = bytearray(open(path, "rb").read())
+    data[-100] ^= 0xFF
+    with open(path, "wb") as f:
+        f.write(data)
+    with pytest.raises(BundleError, match="checksum mismatch"):
+        load_bundle(path)
+
+    with open(path, "wb") as f:
+        f.write(data[:100])
+    with pytest.raises(BundleError):
+        load_bundle(path)
+
+    with open(path, "wb") as f:
+        f.write(b"not a bundle at all, just some bytes")
+    with pytest.raises(BundleError, match="not a model bundle"):
+        load_bundle(path)
+
+def test_catalog_lists_bad_bundles_as_invalid(bundle, tmp_path):
+    _pack(bundle, tmp_path / "eurusd_15min")
+    write_bundle(str(tmp_path / "gbpusd_15min.fxb"), {"xgb": b"garbage"}, {"n_inputs": INPUTS})
+    os.makedirs(tmp_path / "gbpusd_15min")
+    os.replace(tmp_path / "gbpusd_15min.fxb", tmp_path / "gbpusd_15min" / BUNDLE_FILE)
+    os.makedirs(tmp_path / "usdjpy_1h")
+    # A complete manifest, but the hybrid booster section is not a model
+    write_bundle(str(tmp_path / "usdjpy_1h" / BUNDLE_FILE), {"xgb": b"garbage", "scaler/scale_": np.ones(INPUTS)},
+                 {"n_inputs": INPUTS, "feature_size": FEATURES, "feature_columns": None, "sequence_length": SEQUENCE,
+                  "raw_xgb": False, "created_at": "2026-03-02T00:00:00", "version": 1})
+
+    catalog = ModelCatalog(str(tmp_path))
+    catalog.scan()
+
+    assert list(catalog.bundles) == [("EUR/USD", "15min")]
+    assert set(catalog.invalid) == {"gbpusd_15min", "usdjpy_1h"}
+    assert "manifest has no" in catalog.invalid["gbpusd_15min"]
+    assert "unreadable" in catalog.invalid["usdjpy_1h"] and "\n" not in catalog.invalid["usdjpy_1h"]
+    info = catalog.bundles[("EUR/USD", "15min")]
+    assert info.version == 1 and info.student["lags"] == [1]
+    assert catalog.validate("EUR/USD", "15min", "fast") is None
+    assert catalog.validate("EUR/USD", "1h").startswith("Unsupported pair/timeframe")
+
+def test_catalog_rejects_fast_tier_without_student(bundle, tmp_path):
+    bundle_without_student = ModelBundle(cnn=bundle.cnn, xgb_model=bundle.xgb, scaler=bundle.scaler)
+    _pack(bundle_without_student, tmp_path / "eurusd_15min")
+    catalog = ModelCatalog(str(tmp_path))
+    catalog.scan()
+
+    assert catalog.validate("EUR/USD", "15min") is None
+    assert catalog.validate("EUR/USD", "15min", "fast") == "No fast-tier student model for EUR/USD 15min"
+
+def test_registry_swaps_new_versions_and_survives_removal(bundle, tmp_path, monkeypatch):
+    model_dir = tmp_path / "eurusd_15min"
+    monkeypatch.setattr(model_registry, "get_model_dir", lambda pair, timeframe: str(model_dir))
+    path = _pack(bundle, model_dir)
+    registry = ModelRegistry()
+
+    first = registry.get("EUR/USD", "15min")
+    assert first.version == 1 and registry.poll() == 0
+
+    _pack(bundle, model_dir)
+    assert registry.poll() == 1
+    assert registry.get("EUR/USD", "15min").version == 2 and first.version == 1
+
+    os.remove(path)
+    assert registry.poll() == 0
+    assert ("EUR/USD", "15min") in registry._failed
+    assert registry.get("EUR/USD", "15min").version == 2
+
+    with open(path, "wb") as f:
+        f.write(b"truncated")
+    assert registry.poll() == 0
+    assert registry.get("EUR/USD", "15min").version == 2
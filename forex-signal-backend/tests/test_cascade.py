@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from app.ml import cascade
+from app.ml.bundle import ModelBundle
+from app.ml.cascade import calibrate, calibrate_threshold
+from app.ml.feature_frame import FEATURE_COLS
+from app.ml.training_state import load_state, mark_trained, training_rows, unseen_since
+
+def _probs(confidences, signals):
+    """Probability rows whose top class is `signals[i]` with probability `confidences[i]`"""
+    rows = []
+    for confidence, signal in zip(confidences, signals):
+        row = np.full(3, (1 - confidence) / 2)
+        row[signal] = confidence
+        rows.append(row)
+    return np.array(rows)
+
+def test_threshold_is_the_lowest_confidence_meeting_the_target():
+    raw = _probs([0.9, 0.6, 0.8, 0.7], [0, 2, 1, 0])
+    hybrid = _probs([0.5] * 4, [0, 2, 1, 1])  # the 0.7 row disagrees
+
+    result = calibrate_threshold(raw, hybrid, target_agreement=1.0, min_skipped=1)
+    assert result == {"target": 1.0, "holdout_rows": 4, "threshold": 0.8, "agreement": 1.0, "skip_rate": 0.5}
+
+    result = calibrate_threshold(raw, hybrid, target_agreement=0.75, min_skipped=1)
+    assert result["threshold"] == 0.6 and result["skip_rate"] == 1.0 and result["agreement"] == 0.75
+
+def test_equal_confidences_are_skipped_together():
+    raw = _probs([0.9, 0.8, 0.8, 0.6], [0, 0, 1, 2])
+    hybrid = _probs([0.5] * 4, [0, 0, 0, 2])  # one of the two 0.8 rows disagrees
+
+    result = calibrate_threshold(raw, hybrid, target_agreement=1.0, min_skipped=1)
+    assert result["threshold"] == 0.9 and result["skip_rate"] == 0.25
+
+def test_no_threshold_when_too_few_rows_would_be_skipped():
+    raw = _probs([0.9, 0.8, 0.7], [0, 1, 2])
+    hybrid = _probs([0.5] * 3, [0, 2, 2])
+
+    result = calibrate_threshold(raw, hybrid, target_agreement=1.0, min_skipped=2)
+    assert result["threshold"] is None and result["agreement"] is None and result["skip_rate"] == 0.0
+
+def test_bundle_without_raw_xgboost_is_not_calibrated():
+    bundle = ModelBundle(cnn=None, xgb_model=None, scaler=None)
+    assert calibrate(bundle, df=None, since="2026-03-02") is None
+
+def _rows(n):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n, len(FEATURE_COLS))), columns=FEATURE_COLS)
+    df.insert(0, "time", pd.date_range("2026-03-02", periods=n, freq="15min"))
+    return df
+
+def test_calibration_sees_only_rows_after_since(monkeypatch):
+    df = _rows(200)
+    since = df["time"].iloc[139]
+    seen = []
+
+    class RawXGB:
+        def predict(self, dmatrix):
+            seen.append(dmatrix.num_row())
+            return _probs([0.9] * dmatrix.num_row(), [0] * dmatrix.num_row())
+
+    def teacher(bundle, frame, rows):
+        assert frame["time"].iloc[-1] == df["time"].iloc[-1]
+        return _probs([0.5] * rows, [0] * rows)
+
+    monkeypatch.setattr(cascade, "teacher_probabilities", teacher)
+    bundle = ModelBundle(cnn=None, xgb_model=None, scaler=None, raw_xgb=RawXGB(),
+                         raw_scaler=MinMaxScaler().fit(df[FEATURE_COLS]))
+    result = calibrate(bundle, df.sample(frac=1, random_state=0), str(since), target_agreement=1.0, min_skipped=10)
+
+    assert seen == [60] and result["holdout_rows"] == 60 and result["skip_rate"] == 1.0
+    assert result["since"] == str(since) and result["through"] == str(df["time"].iloc[-1])
+    with pytest.raises(ValueError, match="No holdout rows"):
+        calibrate(bundle, df, str(df["time"].iloc[-1]))
+
+def test_full_retrains_leave_the_newest_rows_out(tmp_path):
+    df = _rows(100)
+    kept, through = training_rows(df.iloc[::-1], holdout_rows=10)
+    assert len(kept) == 90 and through == str(df["time"].iloc[89])
+    assert len(training_rows(df, holdout_rows=50)[0]) == 80  # never more than a fifth
+
+    assert unseen_since(load_state(str(tmp_path))) is None
+    mark_trained(str(tmp_path), "hybrid", through)
+    assert unseen_since(load_state(str(tmp_path))) is None  # the raw XGBoost may have seen anything
+    mark_trained(str(tmp_path), "raw_xgb", str(df["time"].iloc[79]))
+    assert unseen_since(load_state(str(tmp_path))) == through
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from fxshared import credit_governor
+from fxshared.credit_governor import (
+    BATCH, LIVE, CreditGovernor, LastGood, UpstreamUnavailable, quota_retry_after
+)
+
+NOW = datetime(2026, 3, 2, 10, 30, 15)
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return NOW
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    """Keep every reservation in one minute window, however long the test takes"""
+    monkeypatch.setattr(credit_governor, "datetime", _FrozenDatetime)
+
+@pytest.fixture
+def governor(tmp_path):
+    return CreditGovernor(str(tmp_path / "credits.db"), per_minute=5, per_day=100, live_reserve_minute=2,
+                          live_reserve_day=10, failure_threshold=3, cooldown_seconds=60)
+
+def test_batch_callers_leave_the_live_reserve(governor):
+    assert [governor.try_acquire(1, BATCH) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert governor.try_acquire(1, BATCH) == pytest.approx(45)  # until the next minute
+    assert governor.try_acquire(2, LIVE) == 0.0
+    assert governor.try_acquire(1, LIVE) == pytest.approx(45)
+    assert governor.status()["minute"]["spent"] == 5
+
+def test_day_budget_waits_until_midnight(tmp_path):
+    governor = CreditGovernor(str(tmp_path / "credits.db"), per_minute=50, per_day=2)
+    governor.try_acquire(2)
+    assert governor.try_acquire(1) == pytest.approx((24 * 60 - 10 * 60 - 30) * 60 - 15)
+
+def test_acquire_without_wait_raises_budget(governor):
+    governor.acquire(5)
+    with pytest.raises(UpstreamUnavailable) as raised:
+        governor.acquire(1, max_wait=0.0)
+    assert raised.value.kind == "budget"
+
+def test_acquire_async_reserves_off_the_loop(governor):
+    async def reserve():
+        await asyncio.gather(*[governor.acquire_async(1) for _ in range(5)])
+        with pytest.raises(UpstreamUnavailable):
+            await governor.acquire_async(1)
+
+    asyncio.run(reserve())
+    assert governor.status()["minute"]["spent"] == 5
+
+def test_processes_share_one_budget(governor):
+    other = CreditGovernor(governor.path, per_minute=5, per_day=100)
+    governor.acquire(3)
+    assert other.try_acquire(3) > 0
+    assert other.try_acquire(2) == 0.0
+
+def test_consecutive_failures_open_the_breaker(governor):
+    governor.record_failure("timeout")
+    governor.record_failure("timeout")
+    governor.record_success()
+    governor.record_failure("timeout")
+    governor.record_failure("timeout")
+    assert governor.try_acquire(1) == 0.0
+
+    governor.record_failure("timeout")
+    with pytest.raises(UpstreamUnavailable) as raised:
+        governor.try_acquire(1)
+    assert raised.value.kind == "circuit_open"
+    assert raised.value.retry_after == pytest.approx(60, abs=1)
+    breaker = governor.status()["breaker"]
+    assert breaker["open"] and breaker["reason"] == "upstream failing: timeout"
+    assert breaker["consecutive_failures"] == 3
+
+def test_failures_never_shorten_a_quota_window(governor):
+    governor.record_response({"code": 429, "message": "You have run out of API credits for the day"})
+    for _ in range(3):
+        governor.record_failure("timeout")
+    assert governor.status()["breaker"]["retry_after"] > 3600
+
+def test_response_classification(governor):
+    governor.record_response({"code": 400, "message": "symbol not found"})
+    assert governor.status()["breaker"]["consecutive_failures"] == 0
+    governor.record_response({"code": 500, "message": "internal error"})
+    assert governor.status()["breaker"]["consecutive_failures"] == 1
+    governor.record_response({"values": []})
+    assert governor.status()["breaker"]["consecutive_failures"] == 0
+
+    governor.record_response({"code": 429, "message": "per minute limit reached"})
+    with pytest.raises(UpstreamUnavailable):
+        governor.try_acquire(1)
+
+def test_quota_retry_after():
+    assert quota_retry_after({"code": 429, "message": "limit for the minute"}, NOW) == pytest.approx(45)
+    assert quota_retry_after({"code": 429, "message": "credits for the day"}, NOW) == pytest.approx(
+        (13 * 60 + 29) * 60 + 45)
+    assert quota_retry_after({"code": 400, "message": "bad symbol"}, NOW) is None
+    assert quota_retry_after({"values": []}, NOW) is None
+
+def test_last_good_keeps_the_longer_history():
+    last_good = LastGood(max_series=2)
+    times = pd.date_range("2026-03-02", periods=10, freq="15min")
+    full = pd.DataFrame({"time": times, "close": range(10)})
+    last_good.remember("EUR/USD", "15min", full)
+    refresh = pd.DataFrame({"time": times[8:].append(pd.DatetimeIndex([times[-1] + pd.Timedelta("15min")])),
+                            "close": [80, 90, 100]})
+    last_good.remember("EUR/USD", "15min", refresh)
+
+    recalled = last_good.recall("EUR/USD", "15min", 100)
+    assert len(recalled) == 11 and list(recalled["close"].tail(3)) == [80, 90, 100]
+    assert len(last_good.recall("EUR/USD", "15min", 4)) == 4
+
+    last_good.remember("GBP/USD", "15min", full)
+    last_good.remember("USD/JPY", "15min", full)
+    assert last_good.recall("EUR/USD", "15min", 5) is None
+    assert last_good.recall("USD/JPY", "15min", 5) is not None
+
+def test_upstream_unavailable_message():
+    error = UpstreamUnavailable("credits exhausted", 12.4, "quota")
+    assert str(error) == "Upstream unavailable (credits exhausted), retry in 12s"
+    assert error.kind == "quota" and error.retry_after == 12.4
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import inspect, text
+
+from app.db.database import SessionLocal
+from app.models.outcome import OutcomeCursor
+from app.services import outcome_tracker
+from app.services.outcome_tracker import (
+    OutcomeTracker, accuracy_report, confidence_bin, migrate_cursors, realized_signal, update_outcomes
+)
+from app.services.prediction_store import insert_rows, prediction_row
+
+START = datetime(2026, 3, 2, 8, 0)
+STEP = {"15min": timedelta(minutes=15), "1h": timedelta(hours=1)}
+PROBS = {"hybrid_probs": [0.72, 0.18, 0.1], "xgb_probs": [0.1, 0.25, 0.65]}
+
+def _closes(timeframe, bars=200):
+    """Bars from START rising 0.1% each, so every horizon realizes BUY"""
+    return pd.DataFrame({
+        "time": [START + i * STEP[timeframe] for i in range(bars)],
+        "close": 1.0 * 1.001 ** np.arange(bars),
+    })
+
+@pytest.fixture
+def market(monkeypatch):
+    """Fake bar source; pairs listed in `failing` raise like an unavailable upstream"""
+    calls, failing = [], set()
+
+    def fetch(symbol, timeframe, outputsize=5000, priority=None):
+        calls.append((symbol, timeframe))
+        if symbol in failing:
+            raise RuntimeError("upstream unavailable")
+        return _closes(timeframe)
+
+    monkeypatch.setattr(outcome_tracker, "fetch_ohlcv", fetch)
+    return calls, failing
+
+def _prediction(bar, symbol="EUR/USD", timeframe="15min", signal="BUY", raw_signal="BUY", rule_signal=None,
+                path="hybrid", probs=PROBS):
+    bar_time = START + bar * STEP[timeframe]
+    return prediction_row(bar_time + timedelta(seconds=5), symbol, timeframe, signal, probs, bar_time=bar_time,
+                          close=float(1.001 ** bar), raw_signal=raw_signal, rule_signal=rule_signal, path=path)
+
+def _reports():
+    return {(r["pair"], r["timeframe"], r["model"]): r for r in accuracy_report()}
+
+def test_realized_signal_and_confidence_bins():
+    assert realized_signal(0.001, 0.0005) == "BUY"
+    assert realized_signal(-0.001, 0.0005) == "SELL"
+    assert realized_signal(0.0005, 0.0005) == "HOLD"
+    assert confidence_bin(0.05, 10) == 0
+    assert confidence_bin(0.72, 10) == 7
+    assert confidence_bin(1.0, 10) == 9
+
+def test_each_model_counts_only_the_rows_it_served(db, market):
+    insert_rows([
+        _prediction(0, signal="BUY", raw_signal="SELL", rule_signal="BUY", path="hybrid"),
+        _prediction(1, signal="SELL", raw_signal="SELL", path="raw_xgb"),  # cascade skipped the hybrid
+        _prediction(2, signal="SELL", raw_signal=None, path="student", probs={}),
+        _prediction(3, signal="HOLD", raw_signal="BUY", path=None),  # before the cascade existed
+    ])
+
+    assert update_outcomes(now=START + timedelta(days=1)) == 4
+    reports = _reports()
+    hybrid = reports[("EUR/USD", "15min", "hybrid")]
+    assert hybrid["count"] == 2 and hybrid["confusion"]["BUY"]["BUY"] == 1 and hybrid["confusion"]["HOLD"]["BUY"] == 1
+    assert hybrid["calibration"] == [{"confidence_low": 0.7, "confidence_high": 0.8, "count": 2,
+                                      "mean_confidence": pytest.approx(0.72), "accuracy": 0.5}]
+    raw = reports[("EUR/USD", "15min", "raw_xgb")]
+    assert raw["count"] == 3 and raw["confusion"]["SELL"]["BUY"] == 2 and raw["accuracy"] == pytest.approx(1 / 3)
+    student = reports[("EUR/USD", "15min", "student")]
+    assert student["count"] == 1 and student["confusion"]["SELL"]["BUY"] == 1 and student["calibration"] == []
+    assert reports[("EUR/USD", "15min", "rule")]["count"] == 1
+
+def test_open_horizons_wait_and_rows_are_counted_once(db, market):
+    insert_rows([_prediction(0), _prediction(1)])
+    # Bar 0's horizon bar (4) has closed once bar 5 opens; bar 1's has not
+    assert update_outcomes(now=START + 5 * STEP["15min"]) == 1
+    assert update_outcomes(now=START + 5 * STEP["15min"]) == 0
+
+    assert update_outcomes(now=START + timedelta(days=1)) == 1
+    assert update_outcomes(now=START + timedelta(days=1)) == 0
+    assert _reports()[("EUR/USD", "15min", "hybrid")]["count"] == 2
+
+def test_blocked_series_does_not_hold_back_the_others(db, market):
+    calls, failing = market
+    failing.add("GBP/USD")
+    insert_rows([
+        _prediction(0, symbol="GBP/USD"),
+        _prediction(1, symbol="GBP/USD"),
+        _prediction(0, timeframe="1h"),  # horizon still open
+        _prediction(0),
+        _prediction(1),
+    ])
+
+    assert update_outcomes(now=START + timedelta(hours=2)) == 2
+    assert calls.count(("GBP/USD", "15min")) == 1  # one failed fetch per run is enough
+    reports = _reports()
+    assert ("GBP/USD", "15min", "hybrid") not in reports
+    assert ("EUR/USD", "1h", "hybrid") not in reports
+    assert reports[("EUR/USD", "15min", "hybrid")]["count"] == 2
+
+    failing.clear()
+    assert update_outcomes(now=START + timedelta(days=1)) == 3
+    assert _reports()[("GBP/USD", "15min", "hybrid")]["count"] == 2
+
+def test_long_backlogs_are_walked_in_batches(db, market, monkeypatch):
+    monkeypatch.setattr(outcome_tracker, "OUTCOME_BATCH_SIZE", 2)
+    insert_rows([_prediction(bar) for bar in range(7)])
+
+    assert update_outcomes(now=START + timedelta(days=1)) == 7
+    db_session = SessionLocal()
+    try:
+        assert [(c.symbol, c.timeframe, c.last_id) for c in db_session.query(OutcomeCursor)] == [
+            ("EUR/USD", "15min", 7)]
+    finally:
+        db_session.close()
+
+def test_legacy_partition_cursors_are_expanded_per_series(db, market):
+    insert_rows([
+        _prediction(0), _prediction(0, symbol="GBP/USD"),  # ids 1, 2: counted by the old release
+        _prediction(1), _prediction(1, symbol="GBP/USD"),
+    ])
+    with db.begin() as conn:
+        conn.execute(text("CREATE TABLE outcome_cursor (partition VARCHAR PRIMARY KEY, last_id INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO outcome_cursor VALUES ('predictions_20260302', 2)"))
+
+    migrate_cursors()
+    migrate_cursors()  # a second worker finds nothing left to do
+    assert "outcome_cursor" not in inspect(db).get_table_names()
+    assert update_outcomes(now=START + timedelta(days=1)) == 2
+    reports = _reports()
+    assert reports[("EUR/USD", "15min", "hybrid")]["count"] == 1
+    assert reports[("GBP/USD", "15min", "hybrid")]["count"] == 1
+
+def test_one_tracker_per_host(tmp_path):
+    path = str(tmp_path / "outcomes.lock")
+    first, second = OutcomeTracker(path), OutcomeTracker(path)
+    try:
+        assert first.try_lock() and first.try_lock()
+        assert not second.try_lock()
+        first.unlock()
+        assert second.try_lock()
+        assert not first.try_lock()
+    finally:
+        first.unlock()
+        second.unlock()
@@ -0,0 +1,120 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.services import prediction_store
+from app.services.prediction_store import (
+    insert_rows, migrate_partitions, partition_days, prediction_row, query_rollups, recent_predictions,
+    refresh_rollups, rollup_partition
+)
+
+BUY = {"hybrid_probs": [0.7, 0.2, 0.1], "xgb_probs": [0.6, 0.3, 0.1], "cnn_lstm_probs": [0.5, 0.3, 0.2]}
+SELL = {"hybrid_probs": [0.1, 0.2, 0.7], "xgb_probs": [0.2, 0.2, 0.6], "cnn_lstm_probs": [0.2, 0.3, 0.5]}
+
+def _row(timestamp, signal="BUY", symbol="EUR/USD", timeframe="15min", probs=BUY):
+    return prediction_row(timestamp, symbol, timeframe, signal, probs, bar_time=timestamp, close=1.1)
+
+def test_rows_land_in_their_day_partition(db):
+    insert_rows([_row(datetime(2026, 3, 1, 23, 59)), _row(datetime(2026, 3, 2, 0, 1), "SELL", probs=SELL)])
+
+    assert partition_days() == [date(2026, 3, 1), date(2026, 3, 2)]
+    recent = recent_predictions(10)
+    assert [r["timestamp"] for r in recent] == [datetime(2026, 3, 2, 0, 1), datetime(2026, 3, 1, 23, 59)]
+    assert recent[0]["hybrid_probs"] == SELL["hybrid_probs"]
+    assert recent_predictions(1)[0]["signal"] == "SELL"
+
+def test_missing_probabilities_read_back_empty(db):
+    insert_rows([prediction_row(datetime(2026, 3, 1, 9), "EUR/USD", "15min", "HOLD", {"xgb_probs": [0.2, 0.5, 0.3]},
+                                path="raw_xgb")])
+
+    row = recent_predictions(1)[0]
+    assert row["hybrid_probs"] == [] and row["cnn_lstm_probs"] == []
+    assert row["xgb_probs"] == [0.2, 0.5, 0.3]
+    assert row["path"] == "raw_xgb"
+
+def test_rollup_counts_and_means(db):
+    day = date(2026, 3, 1)
+    insert_rows([
+        _row(datetime(2026, 3, 1, 9, 0)),
+        _row(datetime(2026, 3, 1, 9, 15), "SELL", probs=SELL),
+        _row(datetime(2026, 3, 1, 10, 0)),
+        _row(datetime(2026, 3, 1, 10, 0), timeframe="1h"),
+    ])
+
+    assert rollup_partition(day) == 4
+    hourly = query_rollups("hour", "EUR/USD", "15min")
+    assert [(r["bucket_start"].hour, r["count"], r["buy_count"], r["sell_count"]) for r in hourly] == [
+        (9, 2, 1, 1), (10, 1, 1, 0)]
+    assert hourly[0]["hybrid_buy_mean"] == pytest.approx(0.4)
+    daily = query_rollups("day", timeframe="15min")
+    assert len(daily) == 1 and daily[0]["count"] == 3 and daily[0]["bucket_start"] == datetime(2026, 3, 1)
+
+def test_rollup_is_recomputed_not_added(db):
+    insert_rows([_row(datetime(2026, 3, 1, 9)), _row(datetime(2026, 3, 1, 9, 30))])
+    rollup_partition(date(2026, 3, 1))
+    rollup_partition(date(2026, 3, 1))
+
+    assert [r["count"] for r in query_rollups("day")] == [2]
+
+def test_refresh_rolls_up_only_partitions_with_new_rows(db):
+    insert_rows([_row(datetime(2026, 3, 1, 9)), _row(datetime(2026, 3, 2, 9))])
+    assert refresh_rollups() == ["predictions_20260301", "predictions_20260302"]
+    assert refresh_rollups() == []
+
+    insert_rows([_row(datetime(2026, 3, 2, 11))])
+    assert refresh_rollups() == ["predictions_20260302"]
+    assert [r["count"] for r in query_rollups("day")] == [1, 2]
+
+def test_retention_drops_old_partitions_but_keeps_rollups(db, monkeypatch):
+    monkeypatch.setattr(prediction_store, "PREDICTION_RETENTION_DAYS", 7)
+    insert_rows([_row(datetime(2026, 3, 1, 9)), _row(datetime(2026, 3, 10, 9))])
+    refresh_rollups()
+
+    assert prediction_store.enforce_retention(today=date(2026, 3, 10)) == ["predictions_20260301"]
+    assert partition_days() == [date(2026, 3, 10)]
+    assert len(query_rollups("day")) == 2
+    # The dropped partition can be written to again
+    insert_rows([_row(datetime(2026, 3, 1, 12))])
+    assert partition_days() == [date(2026, 3, 1), date(2026, 3, 10)]
+
+def test_old_partitions_gain_new_columns(db):
+    with db.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE predictions_20260101 (id INTEGER PRIMARY KEY, timestamp TIMESTAMP NOT NULL, "
+            "hour SMALLINT NOT NULL, symbol VARCHAR NOT NULL, timeframe VARCHAR NOT NULL, signal VARCHAR NOT NULL, "
+            "hybrid_buy FLOAT, hybrid_hold FLOAT, hybrid_sell FLOAT)"
+        ))
+        conn.execute(text(
+            "INSERT INTO predictions_20260101 (timestamp, hour, symbol, timeframe, signal, hybrid_buy, hybrid_hold, "
+            "hybrid_sell) VALUES ('2026-01-01 08:00:00', 8, 'EUR/USD', '15min', 'BUY', 0.6, 0.3, 0.1)"
+        ))
+
+    assert migrate_partitions() == ["predictions_20260101"]
+    columns = {column["name"] for column in inspect(db).get_columns("predictions_20260101")}
+    assert {"bar_time", "path", "close", "raw_signal", "xgb_buy"} <= columns
+    row = recent_predictions(5)[0]
+    assert row["signal"] == "BUY" and row["path"] is None and row["xgb_probs"] == []
+
+def test_legacy_table_is_moved_in_batches(db, monkeypatch):
+    from app.db import init_db
+
+    with db.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE predictions (id INTEGER PRIMARY KEY, timestamp TIMESTAMP, symbol VARCHAR, "
+            "timeframe VARCHAR, signal VARCHAR, cnn_lstm_probs JSON, xgb_probs JSON, hybrid_probs JSON)"
+        ))
+        for i in range(7):
+            conn.execute(text(
+                "INSERT INTO predictions (timestamp, symbol, timeframe, signal, cnn_lstm_probs, xgb_probs, "
+                "hybrid_probs) VALUES (:ts, 'EUR/USD', '15min', 'BUY', '[0.5, 0.3, 0.2]', '[0.6, 0.3, 0.1]', "
+                "'[0.7, 0.2, 0.1]')"
+            ), {"ts": f"2026-02-0{1 + i % 2} 0{i}:00:00"})
+    monkeypatch.setattr(init_db, "BATCH_SIZE", 3)
+
+    assert init_db.migrate_legacy_predictions() == 7
+    assert "predictions" not in inspect(db).get_table_names()
+    assert partition_days() == [date(2026, 2, 1), date(2026, 2, 2)]
+    assert len(recent_predictions(10)) == 7
+    assert recent_predictions(1)[0]["hybrid_probs"] == [0.7, 0.2, 0.1]
+    assert init_db.migrate_legacy_predictions() == 0
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+
+TOKEN = {"X-Profile-Token": "secret"}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A small app with one profiled and one unprofiled endpoint behind the middleware"""
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    app = FastAPI()
+
+    @app.get("/profiled")
+    @profiling.profiled
+    def profiled_endpoint():
+        return {"ok": True}
+
+    @app.get("/plain")
+    def plain_endpoint():
+        return {"ok": True}
+
+    app.add_middleware(profiling.ProfileRequestMiddleware)
+    return TestClient(app)
+
+def test_captured_requests_report_their_id(client, tmp_path):
+    response = client.get("/profiled", headers=TOKEN)
+    assert response.headers["x-profile-status"] == "captured"
+    assert f"{response.headers['x-profile-id']}.prof" in os.listdir(tmp_path)
+
+def test_uncaptured_requests_get_no_id(client, tmp_path):
+    response = client.get("/plain", headers=TOKEN)
+    assert response.headers["x-profile-status"] == "unprofiled" and "x-profile-id" not in response.headers
+
+    with profiling._capture_lock:
+        response = client.get("/profiled", headers=TOKEN)
+    assert response.headers["x-profile-status"] == "busy" and "x-profile-id" not in response.headers
+    assert os.listdir(tmp_path) == []
+
+def test_requests_without_the_token_are_untouched(client):
+    for headers in ({}, {"X-Profile-Token": "wrong"}):
+        response = client.get("/profiled", headers=headers)
+        assert "x-profile-status" not in response.headers and "x-profile-id" not in response.headers
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.resampler import compare_bars, resample_ohlc, resample_ratio
+
+def _base(start, n):
+    """n 15min bars from `start`; bar k opens at k, closes at k + 0.5, spans [k - 1, k + 1]"""
+    k = np.arange(n, dtype=float)
+    return pd.DataFrame({"time": pd.date_range(start, periods=n, freq="15min"),
+                         "open": k, "high": k + 1, "low": k - 1, "close": k + 0.5})
+
+def test_ratio_must_be_a_whole_multiple_of_the_base():
+    assert resample_ratio("1h") == 4 and resample_ratio("15min") == 1
+    with pytest.raises(ValueError):
+        resample_ratio("20min")
+    with pytest.raises(ValueError):
+        resample_ratio("5min")
+
+def test_buckets_start_on_the_clock_hour():
+    # 10:45 belongs to the 10:00 bucket; 11:00-11:45 is complete; 12:00-12:15 is still forming
+    out = resample_ohlc(_base("2026-03-02 10:45", 7), "1h")
+    assert list(out["time"]) == list(pd.to_datetime(["2026-03-02 10:00", "2026-03-02 11:00", "2026-03-02 12:00"]))
+    assert out.iloc[0].tolist()[1:] == [0.0, 1.0, -1.0, 0.5]
+    assert out.iloc[1].tolist()[1:] == [1.0, 5.0, 0.0, 4.5]
+    assert out.iloc[2].tolist()[1:] == [5.0, 7.0, 4.0, 6.5]
+
+def test_offset_shifts_the_bucket_boundaries():
+    out = resample_ohlc(_base("2026-03-02 10:00", 8), "1h", offset="30min")
+    assert list(out["time"].dt.strftime("%H:%M")) == ["09:30", "10:30", "11:30"]
+    assert list(out["open"]) == [0.0, 2.0, 6.0]
+
+def test_drop_partial_drops_only_an_incomplete_newest_bucket():
+    forming = _base("2026-03-02 10:00", 6)
+    assert len(resample_ohlc(forming, "1h")) == 2
+    assert len(resample_ohlc(forming, "1h", drop_partial=True)) == 1
+
+    complete = _base("2026-03-02 10:00", 8)
+    assert len(resample_ohlc(complete, "1h", drop_partial=True)) == 2
+
+def test_interior_gaps_keep_the_bars_that_exist():
+    df = _base("2026-03-02 10:00", 8).drop(index=[1, 2]).reset_index(drop=True)
+    out = resample_ohlc(df, "1h", drop_partial=True)
+    assert len(out) == 2
+    assert out.iloc[0].tolist()[1:] == [0.0, 4.0, -1.0, 3.5]
+
+def test_compare_bars_reports_diffs_over_the_common_range():
+    local = resample_ohlc(_base("2026-03-02 10:00", 16), "1h")
+    vendor = local.iloc[1:].copy().reset_index(drop=True)
+    vendor.loc[1, "close"] += 0.25
+    vendor = vendor.drop(index=0)
+    vendor = pd.concat([vendor, pd.DataFrame({"time": [pd.Timestamp("2026-03-02 14:00")],
+                                              "open": [0.0], "high": [0.0], "low": [0.0], "close": [0.0]})])
+
+    report = compare_bars(local, vendor)
+    # 10:00 and 11:00 are before the vendor's range and 14:00 is after the local one
+    assert report["range"] == ["2026-03-02 12:00:00", "2026-03-02 13:00:00"]
+    assert report["matched_bars"] == 2 and report["only_local"] == [] and report["only_vendor"] == []
+    assert report["mismatched_bars"] == 1 and report["mismatched_times"] == ["2026-03-02 12:00:00"]
+    assert report["max_abs_diff"]["close"] == 0.25 and report["max_abs_diff"]["open"] == 0.0
+
+    vendor = local.drop(index=2)
+    report = compare_bars(local, vendor)
+    assert report["only_local"] == ["2026-03-02 12:00:00"] and report["mismatched_bars"] == 0
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from app.ml.student import LAGS, fidelity_report, fit_student, student_features, student_lags
+
+def _values(rows=30, columns=3):
+    # Distinct values per cell, so any misaligned lag shows up
+    return np.arange(rows * columns, dtype=np.float32).reshape(rows, columns) ** 1.5
+
+def test_features_are_the_row_and_its_changes_over_each_lag():
+    values, lags = _values(), (1, 5, 20)
+    X = student_features(values, lags)
+
+    assert X.shape == (len(values) - 20, values.shape[1] * (1 + len(lags)))
+    assert X.dtype == np.float32
+    for i, row in enumerate(X):
+        t = 20 + i
+        current, changes = row[:3], row[3:].reshape(len(lags), 3)
+        np.testing.assert_array_equal(current, values[t])
+        for change, lag in zip(changes, lags):
+            np.testing.assert_allclose(change, values[t] - values[t - lag])
+
+def test_serving_window_matches_the_training_row():
+    """/api/signal?tier=fast builds one row from the newest max(lags) + 1 bars; distillation builds them all"""
+    values = _values()
+    served = student_features(values[-(max(LAGS) + 1):], LAGS)
+
+    assert served.shape[0] == 1
+    np.testing.assert_array_equal(served[0], student_features(values, LAGS)[-1])
+
+def test_too_short_history_is_rejected():
+    with pytest.raises(ValueError, match="Insufficient data points"):
+        student_features(_values(rows=20), (1, 20))
+
+def test_student_carries_its_lags():
+    X = student_features(_values(rows=40), (1, 2))
+    teacher = np.tile([0.6, 0.3, 0.1], (len(X), 1))
+    student = fit_student(X, teacher, rounds=2, lags=(1, 2))
+
+    assert student_lags(student) == (1, 2)
+    assert student.predict(xgb.DMatrix(X)).shape == (len(X), 3)
+    student.set_attr(lags=None)
+    assert student_lags(student) == LAGS
+
+def test_fidelity_report():
+    teacher = np.array([[0.8, 0.1, 0.1], [0.1, 0.8, 0.1], [0.2, 0.2, 0.6], [0.4, 0.3, 0.3]])
+    exact = fidelity_report(teacher, teacher, labels=np.array([0, 1, 2, 1]))
+    assert exact["agreement"] == 1.0 and exact["kl_divergence"] == pytest.approx(0, abs=1e-6)
+    assert exact["teacher_accuracy"] == exact["student_accuracy"] == 0.75
+
+    student = teacher[[0, 1, 2, 1]]
+    report = fidelity_report(student, teacher)
+    assert report["agreement"] == 0.75 and report["agreement_confident_half"] == 1.0
+    assert report["kl_divergence"] > 0 and "teacher_accuracy" not in report
@@ -0,0 +1,221 @@
+"""Load driver for the signal backend and the forecast service.
+
+Replays a realistic request mix against a running app and reports throughput,
+latency percentiles and error rates. Start the app against the stand-in
+(loadtest/stub_server.py) so no API credits are spent:
+
+    # steady polling from 50 clients over 22 pairs for two minutes
+    python loadtest/load_driver.py --target signal --base-url http://127.0.0.1:8000 \\
+        --clients 50 --duration 120
+
+    # every client fires within 500 ms of each 15 s boundary, like dashboards polling on a timer
+    python loadtest/load_driver.py --target forecast --base-url http://127.0.0.1:8001 \\
+        --pattern bursty --burst-period 15 --burst-spread 0.5
+
+    # push history through the live pipeline: one request per (pair, timeframe)
+    # each time the stand-in's replay clock closes a bar, signals saved to JSONL
+    python loadtest/load_driver.py --target signal --replay --stub-url http://127.0.0.1:9000 \\
+        --pairs EUR/USD GBP/USD --replay-output replay.jsonl
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_PAIRS = [
+    "EUR/USD", "USD/JPY", "GBP/USD", "XAU/USD", "AUD/USD", "USD/CAD", "USD/CHF", "NZD/USD",
+    "EUR/GBP", "EUR/JPY", "GBP/JPY", "EUR/AUD", "EUR/CAD", "EUR/CHF", "GBP/CAD", "GBP/AUD",
+    "AUD/CAD", "AUD/JPY", "CAD/JPY", "CHF/JPY", "USD/THB", "USD/INR",
+]
+DEFAULT_TIMEFRAMES = {"signal": ["15min", "30min", "1h"], "forecast": ["15min", "30min"]}
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.by_pair: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, pair: str, latency: float, error: Optional[str]) -> None:
+        self.latencies.append(latency)
+        self.by_pair[pair].append(latency)
+        if error:
+            self.errors[error] += 1
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        total = len(self.latencies)
+        error_count = sum(self.errors.values())
+        return {
+            "requests": total,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(error_count / total, 4) if total else 0.0,
+            "errors": dict(self.errors),
+            "latency_ms": percentiles(self.latencies),
+            "by_pair": {pair: percentiles(values) for pair, values in sorted(self.by_pair.items())},
+        }
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 2),
+            "count": len(ordered)}
+
+def weighted_pairs(pairs: List[str]) -> List[float]:
+    """Zipf-like weights: the first pairs in the list get most of the traffic"""
+    return [1.0 / (rank + 1) for rank in range(len(pairs))]
+
+async def send(client: httpx.AsyncClient, target: str, pair: str, timeframe: str) -> Tuple[float, Optional[str], dict]:
+    start = time.perf_counter()
+    body: dict = {}
+    try:
+        if target == "signal":
+            response = await client.get("/api/signal", params={"pair": pair, "tf": timeframe})
+        else:
+            response = await client.post("/api/forecast", json={"pair": pair, "interval": timeframe})
+        latency = time.perf_counter() - start
+        if response.status_code != 200:
+            return latency, f"http_{response.status_code}", body
+        body = response.json()
+        # The signal backend reports failures as {"error": ...} with HTTP 200
+        if isinstance(body, dict) and "error" in body:
+            return latency, "app_error", body
+        return latency, None, body
+    except httpx.HTTPError as e:
+        return time.perf_counter() - start, type(e).__name__, body
+
+async def client_loop(client_id: int, args, client: httpx.AsyncClient, recorder: Recorder, deadline: float):
+    rng = random.Random(args.seed + client_id)
+    weights = weighted_pairs(args.pairs)
+
+    # Stagger steady clients so they do not all start in lockstep
+    if args.pattern == "steady":
+        await asyncio.sleep(rng.uniform(0, args.poll_interval))
+
+    while time.perf_counter() < deadline:
+        if args.pattern == "bursty":
+            now = time.time()
+            next_burst = (now // args.burst_period + 1) * args.burst_period
+            await asyncio.sleep(next_burst - now + rng.uniform(0, args.burst_spread))
+            if time.perf_counter() >= deadline:
+                break
+
+        pair = rng.choices(args.pairs, weights=weights)[0]
+        timeframe = rng.choice(args.timeframes)
+        latency, error, _ = await send(client, args.target, pair, timeframe)
+        recorder.record(pair, latency, error)
+
+        if args.pattern == "steady":
+            await asyncio.sleep(max(0.0, args.poll_interval * rng.uniform(0.8, 1.2) - latency))
+
+async def run_load(args) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*[
+            client_loop(i, args, client, recorder, deadline) for i in range(args.clients)
+        ])
+    recorder.finished = time.perf_counter()
+    return recorder.summary()
+
+async def run_replay(args) -> dict:
+    """Request each topic once per newly closed bar on the stand-in's replay clock"""
+    recorder = Recorder()
+    topics = [(pair, tf) for pair in args.pairs for tf in args.timeframes]
+    last_seen: Dict[Tuple[str, str], Optional[str]] = {topic: None for topic in topics}
+    out = open(args.replay_output, "w") if args.replay_output else None
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client, \
+            httpx.AsyncClient(base_url=args.stub_url, timeout=args.timeout) as stub:
+        deadline = time.perf_counter() + args.duration
+        sem = asyncio.Semaphore(args.clients)
+
+        async def poll_topic(pair: str, tf: str):
+            clock = (await stub.get("/stub/clock", params={"symbol": pair, "interval": tf})).json()
+            if clock["last_bar"] is None or clock["last_bar"] == last_seen[(pair, tf)]:
+                return clock
+            last_seen[(pair, tf)] = clock["last_bar"]
+            async with sem:
+                latency, error, body = await send(client, args.target, pair, tf)
+            recorder.record(pair, latency, error)
+            if out is not None:
+                out.write(json.dumps({"pair": pair, "timeframe": tf, "bar": clock["last_bar"],
+                                      "latency_ms": round(latency * 1000, 2), "error": error,
+                                      "response": body}) + "\n")
+            return clock
+
+        while time.perf_counter() < deadline:
+            clocks = await asyncio.gather(*[poll_topic(pair, tf) for pair, tf in topics])
+            if all(c["remaining_bars"] == 0 for c in clocks):
+                break
+            await asyncio.sleep(args.replay_poll)
+
+    if out is not None:
+        out.close()
+    recorder.finished = time.perf_counter()
+    summary = recorder.summary()
+    summary["bars_replayed"] = summary["requests"]
+    return summary
+
+def print_summary(summary: dict) -> None:
+    lat = summary["latency_ms"]
+    print(f"requests     {summary['requests']}")
+    print(f"duration     {summary['duration_s']} s")
+    print(f"throughput   {summary['throughput_rps']} req/s")
+    print(f"error rate   {summary['error_rate'] * 100:.2f}%  {summary['errors'] or ''}")
+    if lat:
+        print(f"latency ms   p50={lat['p50']}  p90={lat['p90']}  p99={lat['p99']}  max={lat['max']}")
+    print("\nper pair (p50 / p99 ms, count):")
+    for pair, stats in summary["by_pair"].items():
+        print(f"  {pair:<9} {stats['p50']:>9} / {stats['p99']:>9}  {stats['count']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load driver for the signal and forecast apps")
+    parser.add_argument("--target", choices=["signal", "forecast"], default="signal")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--pairs", nargs="+", default=DEFAULT_PAIRS)
+    parser.add_argument("--timeframes", nargs="+", default=None)
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+    parser.add_argument("--pattern", choices=["steady", "bursty"], default="steady")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between polls (steady)")
+    parser.add_argument("--burst-period", type=float, default=15.0, help="Seconds between bursts (bursty)")
+    parser.add_argument("--burst-spread", type=float, default=0.5, help="Seconds each burst is spread over")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--replay", action="store_true", help="Follow the stand-in's replay clock")
+    parser.add_argument("--stub-url", default="http://127.0.0.1:9000")
+    parser.add_argument("--replay-poll", type=float, default=0.2, help="Seconds between replay clock checks")
+    parser.add_argument("--replay-output", help="JSONL file receiving every replayed response")
+    parser.add_argument("--output", help="Write the summary as JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.timeframes = args.timeframes or DEFAULT_TIMEFRAMES[args.target]
+
+    summary = asyncio.run(run_replay(args) if args.replay else run_load(args))
+    summary.update(target=args.target, pattern="replay" if args.replay else args.pattern,
+                   clients=args.clients, pairs=len(args.pairs))
+
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary saved to {args.output}")
+
+    return 1 if summary["requests"] == 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
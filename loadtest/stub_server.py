@@ -0,0 +1,249 @@
+"""Local stand-in for the Twelve Data REST API.
+
+Serves `time_series` and `forex_pairs` from recorded or synthetic bars so the
+signal backend and the forecast service can be load-tested without spending
+API credits. Point either app at it with TWELVE_DATA_BASE_URL:
+
+    python loadtest/stub_server.py --port 9000 --latency-ms 120 --error-rate 0.02
+    TWELVE_DATA_BASE_URL=http://127.0.0.1:9000 uvicorn app.main:app
+
+Recordings are read from --recordings: either raw time_series JSON payloads or
+CSVs with time/open/high/low/close columns, named `{pair}_{interval}.json|csv`
+(e.g. eurusd_15min.csv, the same naming as app/ml/data).
+
+With --replay-speed the stand-in runs a simulated clock that starts at
+--replay-start bars into each series and advances `speed` times faster than
+real time; only bars closed before the simulated clock are served, so the live
+pipeline sees history arrive bar by bar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import zlib
+from datetime import timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+PAIRS = [
+    "AUD/CAD", "AUD/JPY", "AUD/USD", "CAD/JPY", "CHF/JPY",
+    "EUR/AUD", "EUR/CAD", "EUR/CHF", "EUR/GBP", "EUR/JPY", "EUR/USD",
+    "GBP/AUD", "GBP/CAD", "GBP/JPY", "GBP/USD", "NZD/USD",
+    "USD/CAD", "USD/CHF", "USD/JPY", "USD/THB", "USD/INR", "XAU/USD",
+]
+
+# Rough price levels so synthetic series look like the real instrument
+BASE_PRICES = {"JPY": 150.0, "XAU": 2300.0, "INR": 83.0, "THB": 36.0}
+
+SYNTHETIC_BARS = 20000
+
+class StubSettings:
+    def __init__(self):
+        self.recordings_dir: Optional[str] = None
+        self.latency_ms = 0.0
+        self.jitter_ms = 0.0
+        self.error_rate = 0.0
+        self.quota_error_rate = 0.0
+        self.replay_speed: Optional[float] = None
+        self.replay_start = 500
+        self.seed = 42
+
+settings = StubSettings()
+app = FastAPI(title="Twelve Data stand-in")
+
+_series: Dict[tuple, pd.DataFrame] = {}
+_stats = {"time_series": 0, "forex_pairs": 0, "errors": 0, "quota_errors": 0}
+_clock_started = time.monotonic()
+
+def interval_delta(interval: str) -> timedelta:
+    if interval.endswith("min"):
+        return timedelta(minutes=int(interval[:-3]))
+    if interval.endswith("h"):
+        return timedelta(hours=int(interval[:-1]))
+    if interval.endswith("day"):
+        return timedelta(days=int(interval[:-3] or 1))
+    raise ValueError(f"Unsupported interval: {interval}")
+
+def _synthetic(pair: str, interval: str) -> pd.DataFrame:
+    seed = zlib.crc32(f"{settings.seed}:{pair}:{interval}".encode())
+    rng = np.random.default_rng(seed)
+    price = next((p for code, p in BASE_PRICES.items() if code in pair), 1.1)
+    delta = interval_delta(interval)
+
+    returns = rng.normal(0.0, 0.0008, SYNTHETIC_BARS)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[price], close[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.0004, SYNTHETIC_BARS)) * close
+    # Outside replay the series ends at the last closed bar before now
+    end = pd.Timestamp.utcnow().tz_localize(None).floor(delta) - delta
+    times = pd.date_range(end=end, periods=SYNTHETIC_BARS, freq=delta)
+
+    return pd.DataFrame({
+        "time": times,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+    })
+
+def _recorded(pair: str, interval: str) -> Optional[pd.DataFrame]:
+    if not settings.recordings_dir:
+        return None
+    stem = os.path.join(settings.recordings_dir, f"{pair.lower().replace('/', '')}_{interval}")
+    if os.path.exists(stem + ".json"):
+        with open(stem + ".json") as f:
+            df = pd.DataFrame(json.load(f)["values"]).rename(columns={"datetime": "time"})
+    elif os.path.exists(stem + ".csv"):
+        df = pd.read_csv(stem + ".csv")
+    else:
+        return None
+    df["time"] = pd.to_datetime(df["time"])
+    for col in ["open", "high", "low", "close"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df[["time", "open", "high", "low", "close"]].dropna().sort_values("time").reset_index(drop=True)
+
+def get_series(pair: str, interval: str) -> pd.DataFrame:
+    key = (pair, interval)
+    if key not in _series:
+        df = _recorded(pair, interval)
+        _series[key] = df if df is not None else _synthetic(pair, interval)
+    return _series[key]
+
+def replay_clock(df: pd.DataFrame, interval: str) -> pd.Timestamp:
+    """Simulated 'now' for a series: start bar + elapsed wall time * speed"""
+    start_idx = min(settings.replay_start, len(df) - 1)
+    elapsed = (time.monotonic() - _clock_started) * settings.replay_speed
+    return df["time"].iloc[start_idx] + interval_delta(interval) + timedelta(seconds=elapsed)
+
+def visible_bars(pair: str, interval: str) -> pd.DataFrame:
+    df = get_series(pair, interval)
+    if settings.replay_speed:
+        # A bar is served once it has closed on the simulated clock
+        cutoff = replay_clock(df, interval) - interval_delta(interval)
+        df = df[df["time"] <= cutoff]
+    return df
+
+async def _inject_faults() -> Optional[JSONResponse]:
+    delay = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    roll = random.random()
+    if roll < settings.quota_error_rate:
+        _stats["quota_errors"] += 1
+        # Twelve Data reports quota errors in the body of an HTTP 200
+        return JSONResponse({
+            "code": 429,
+            "message": "You have run out of API credits for the current minute.",
+            "status": "error",
+        })
+    if roll < settings.quota_error_rate + settings.error_rate:
+        _stats["errors"] += 1
+        return JSONResponse({"code": 500, "message": "Internal error (injected)", "status": "error"},
+                            status_code=500)
+    return None
+
+@app.get("/time_series")
+async def time_series(symbol: str,
+                      interval: str,
+                      outputsize: int = Query(30, ge=1, le=5000),
+                      apikey: Optional[str] = None,
+                      format: str = "JSON"):
+    _stats["time_series"] += 1
+    fault = await _inject_faults()
+    if fault is not None:
+        return fault
+
+    try:
+        df = visible_bars(symbol, interval).tail(outputsize)
+    except ValueError as e:
+        return JSONResponse({"code": 400, "message": str(e), "status": "error"})
+
+    values = [
+        {
+            "datetime": row.time.strftime("%Y-%m-%d %H:%M:%S"),
+            "open": f"{row.open:.5f}",
+            "high": f"{row.high:.5f}",
+            "low": f"{row.low:.5f}",
+            "close": f"{row.close:.5f}",
+        }
+        for row in df.iloc[::-1].itertuples(index=False)
+    ]
+    return {
+        "meta": {"symbol": symbol, "interval": interval, "type": "Physical Currency"},
+        "values": values,
+        "status": "ok",
+    }
+
+@app.get("/forex_pairs")
+async def forex_pairs(apikey: Optional[str] = None):
+    _stats["forex_pairs"] += 1
+    fault = await _inject_faults()
+    if fault is not None:
+        return fault
+
+    data = [
+        {
+            "symbol": pair,
+            "currency_group": "Major",
+            "currency_base": pair.split("/")[0],
+            "currency_quote": pair.split("/")[1],
+        }
+        for pair in PAIRS
+    ]
+    return {"data": data, "status": "ok"}
+
+@app.get("/stub/clock")
+async def clock(symbol: str = "EUR/USD", interval: str = "15min"):
+    """Latest served bar for a series; the load driver's replay mode polls this"""
+    df = visible_bars(symbol, interval)
+    return {
+        "replay_speed": settings.replay_speed,
+        "last_bar": df["time"].iloc[-1].isoformat() if len(df) else None,
+        "remaining_bars": len(get_series(symbol, interval)) - len(df),
+    }
+
+@app.get("/stub/stats")
+async def stats():
+    return _stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Twelve Data stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--recordings", help="Directory of recorded {pair}_{interval}.json|csv series")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with HTTP 500")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with an out-of-credits error")
+    parser.add_argument("--replay-speed", type=float, default=None,
+                        help="Serve history on a simulated clock running this many times faster than real time")
+    parser.add_argument("--replay-start", type=int, default=500,
+                        help="Bars of history visible when the replay clock starts")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    settings.recordings_dir = args.recordings
+    settings.latency_ms = args.latency_ms
+    settings.jitter_ms = args.jitter_ms
+    settings.error_rate = args.error_rate
+    settings.quota_error_rate = args.quota_error_rate
+    settings.replay_speed = args.replay_speed
+    settings.replay_start = args.replay_start
+    settings.seed = args.seed
+    random.seed(args.seed)
+
+    print(f"Twelve Data stand-in on http://{args.host}:{args.port} "
+          f"(latency={args.latency_ms}ms, errors={args.error_rate}, replay={args.replay_speed})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
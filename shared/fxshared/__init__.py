@@ -0,0 +1,6 @@
+"""Code shared by forex-signal-backend and forecast-system.
+
+Both apps are packaged as `app`, so anything they must run identically (the
+shared-memory bar cache layout, the credit accounting) lives here and is
+installed into each app's environment from requirements.txt (`-e ../shared`).
+"""
@@ -0,0 +1,206 @@
+"""Shared-memory ring buffer of recent bars per (pair, interval).
+
+One feeder process (forex-signal-backend/feed_bars.py) fetches each series
+from the vendor and publishes it into a named shared-memory segment; every
+uvicorn worker of both apps attaches to the segment and reads the bars without
+an API call or a private copy of the series. Both apps import this module, so
+writer and readers always agree on the layout below; it takes all settings as
+arguments.
+
+Layout (all little-endian int64/float64):
+
+    header   8 x int64: magic, capacity, total bars written, seq, updated_ns
+    times    2 * capacity int64 (ns since epoch)
+    ohlc     2 * capacity x 4 float64 (open, high, low, close)
+
+Every bar is written twice, at slot k % capacity and k % capacity + capacity,
+so the newest n <= capacity bars always form one contiguous slice and can be
+handed out as numpy views. `seq` is a seqlock: odd while the writer is
+mid-update, bumped to the next even value when done. Readers retry while it
+is odd or changed under them, and can compare it across calls to tell when
+new bars arrived.
+"""
+import sys
+import time
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAGIC = 0x3130535241425846  # b"FXBARS01"
+HEADER_SLOTS = 8
+HEADER_BYTES = HEADER_SLOTS * 8
+MAGIC_SLOT, CAPACITY_SLOT, TOTAL_SLOT, SEQ_SLOT, UPDATED_SLOT = range(5)
+OHLC_COLS = ["open", "high", "low", "close"]
+READ_RETRIES = 1000
+
+def segment_name(prefix: str, pair: str, interval: str) -> str:
+    return f"{prefix}_{pair.lower().replace('/', '')}_{interval}"
+
+def interval_seconds(interval: str) -> int:
+    if interval.endswith("min"):
+        return int(interval[:-3]) * 60
+    if interval.endswith("h"):
+        return int(interval[:-1]) * 3600
+    raise ValueError(f"Unsupported interval: {interval}")
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """Attach without letting this process's resource tracker unlink the segment at exit"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+class BarRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        if self._header[MAGIC_SLOT] != MAGIC:
+            raise ValueError(f"{shm.name} is not a bar cache segment")
+        self.capacity = int(self._header[CAPACITY_SLOT])
+        self._times = np.ndarray((2 * self.capacity,), dtype=np.int64, buffer=shm.buf, offset=HEADER_BYTES)
+        self._ohlc = np.ndarray((2 * self.capacity, len(OHLC_COLS)), dtype=np.float64, buffer=shm.buf,
+                                offset=HEADER_BYTES + 2 * self.capacity * 8)
+
+    @classmethod
+    def create(cls, name: str, capacity: int) -> "BarRing":
+        """Create (or recreate) the segment; the creator owns it and unlinks it on close"""
+        size = HEADER_BYTES + 2 * capacity * 8 * (1 + len(OHLC_COLS))
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a feeder that did not exit cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[CAPACITY_SLOT] = capacity
+        header[MAGIC_SLOT] = MAGIC
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "BarRing":
+        return cls(_attach_segment(name), owner=False)
+
+    @property
+    def seq(self) -> int:
+        return int(self._header[SEQ_SLOT])
+
+    @property
+    def updated_at(self) -> float:
+        """Unix time of the last publish"""
+        return self._header[UPDATED_SLOT] / 1e9
+
+    def publish(self, df: pd.DataFrame) -> int:
+        """Append bars newer than the last stored one; the last bar is overwritten when it reappears
+        (the vendor's forming bar). Older bars are never rewritten. Returns the number of new bars."""
+        times = df["time"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        ohlc = df[OHLC_COLS].to_numpy(dtype=np.float64)
+        header, cap = self._header, self.capacity
+        total = int(header[TOTAL_SLOT])
+
+        start = 0
+        replace_last = False
+        if total:
+            last = self._times[(total - 1) % cap]
+            start = int(np.searchsorted(times, last, side="left"))
+            replace_last = start < len(times) and times[start] == last
+
+        header[SEQ_SLOT] += 1
+        try:
+            if replace_last:
+                slot = (total - 1) % cap
+                self._times[[slot, slot + cap]] = times[start]
+                self._ohlc[[slot, slot + cap]] = ohlc[start]
+                start += 1
+
+            new_times, new_ohlc = times[start:][-cap:], ohlc[start:][-cap:]
+            added = len(times) - start
+            if len(new_times):
+                slots = (total + added - len(new_times) + np.arange(len(new_times))) % cap
+                for offset in (0, cap):
+                    self._times[slots + offset] = new_times
+                    self._ohlc[slots + offset] = new_ohlc
+            header[TOTAL_SLOT] = total + added
+            header[UPDATED_SLOT] = time.time_ns()
+        finally:
+            header[SEQ_SLOT] += 1
+        return added
+
+    def view(self, n: Optional[int] = None) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Zero-copy (seq, times, ohlc) of the newest n bars.
+
+        The views stay valid until capacity - n more bars are published, and the
+        newest bar may be overwritten in place; compare `seq` after use to know
+        whether anything changed underneath.
+        """
+        header, cap = self._header, self.capacity
+        for _ in range(READ_RETRIES):
+            seq = int(header[SEQ_SLOT])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            available = min(int(header[TOTAL_SLOT]), cap)
+            count = available if n is None else min(n, available)
+            first = (int(header[TOTAL_SLOT]) - count) % cap
+            times, ohlc = self._times[first:first + count], self._ohlc[first:first + count]
+            if int(header[SEQ_SLOT]) == seq:
+                return seq, times, ohlc
+        raise RuntimeError(f"{self.shm.name}: writer did not settle")
+
+    def read(self, n: Optional[int] = None) -> Tuple[int, pd.DataFrame]:
+        """Consistent copy of the newest n bars as a time/open/high/low/close frame"""
+        for _ in range(READ_RETRIES):
+            seq, times, ohlc = self.view(n)
+            df = pd.DataFrame(ohlc.copy(), columns=OHLC_COLS)
+            df.insert(0, "time", times.copy().view("datetime64[ns]"))
+            if self.seq == seq:
+                return seq, df
+        raise RuntimeError(f"{self.shm.name}: writer did not settle")
+
+    def close(self) -> None:
+        del self._header, self._times, self._ohlc
+        try:
+            self.shm.close()
+        except BufferError:
+            # A caller still holds views; leave the mapping to the garbage collector
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+_rings: Dict[str, BarRing] = {}
+
+def _attached(name: str, reattach: bool = False) -> Optional[BarRing]:
+    ring = _rings.pop(name, None) if reattach else _rings.get(name)
+    if reattach and ring is not None:
+        ring.close()
+        ring = None
+    if ring is None:
+        try:
+            ring = _rings[name] = BarRing.attach(name)
+        except (FileNotFoundError, ValueError):
+            return None
+    return ring
+
+def read_bars(pair: str, interval: str, n: int, prefix: str, grace_seconds: float) -> Optional[pd.DataFrame]:
+    """Newest n bars from the shared cache, or None when it is missing, short or stale.
+
+    A segment that has not been updated within one bar plus `grace_seconds` is
+    re-attached once, in case the feeder restarted and recreated it.
+    """
+    name = segment_name(prefix, pair, interval)
+    max_age = interval_seconds(interval) + grace_seconds
+    for reattach in (False, True):
+        ring = _attached(name, reattach)
+        if ring is None:
+            return None
+        if time.time() - ring.updated_at <= max_age:
+            _, df = ring.read(n)
+            return df if len(df) >= n else None
+    return None
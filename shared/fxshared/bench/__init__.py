@@ -0,0 +1 @@
+"""Timing harness and synthetic Twelve Data bars for both apps' benchmarks/run_benchmarks.py"""
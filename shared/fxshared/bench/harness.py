@@ -0,0 +1,88 @@
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+def measure(fn: Callable, repeat: int = 10, warmup: int = 1) -> Dict[str, float]:
+    """Wall-clock timings over `repeat` calls plus one traced call for allocations"""
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p90_ms": timings[min(len(timings) - 1, int(len(timings) * 0.9))],
+        "min_ms": timings[0],
+        "peak_kib": peak / 1024,
+        "net_alloc_blocks": sum(stat.count_diff for stat in diff),
+        "net_alloc_kib": sum(stat.size_diff for stat in diff) / 1024,
+    }
+
+def build_report(stages: Dict[str, Dict[str, float]], **meta) -> dict:
+    return {
+        "meta": {
+            "created": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta,
+        },
+        "stages": stages,
+    }
+
+def save_report(report: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def compare_reports(current: dict,
+                    baseline: dict,
+                    threshold: float,
+                    memory_threshold: Optional[float] = None) -> List[str]:
+    """Return a line per stage whose median time (or peak memory) regressed past the threshold"""
+    regressions = []
+    for stage, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+
+        checks = [("median_ms", threshold)]
+        if memory_threshold is not None:
+            checks.append(("peak_kib", memory_threshold))
+
+        for metric, limit in checks:
+            if base[metric] > 0 and cur[metric] > base[metric] * (1 + limit):
+                regressions.append(
+                    f"{stage}.{metric}: {base[metric]:.2f} -> {cur[metric]:.2f} "
+                    f"(+{(cur[metric] / base[metric] - 1) * 100:.1f}%, limit {limit * 100:.0f}%)"
+                )
+    return regressions
+
+def print_report(report: dict, baseline: Optional[dict] = None) -> None:
+    print(f"{'stage':<26}{'median ms':>12}{'p90 ms':>10}{'peak KiB':>12}{'blocks':>10}{'vs base':>10}")
+    for stage, stats in report["stages"].items():
+        delta = ""
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base and base["median_ms"] > 0:
+            delta = f"{(stats['median_ms'] / base['median_ms'] - 1) * 100:+.1f}%"
+        print(f"{stage:<26}{stats['median_ms']:>12.2f}{stats['p90_ms']:>10.2f}"
+              f"{stats['peak_kib']:>12.1f}{stats['net_alloc_blocks']:>10}{delta:>10}")
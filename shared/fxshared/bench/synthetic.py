@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+def generate_ohlcv(n_bars: int = 5000,
+                   interval: str = "15min",
+                   seed: int = 42,
+                   start: str = "2024-01-01",
+                   price: float = 1.10,
+                   volatility: float = 0.0008) -> pd.DataFrame:
+    """Geometric random walk shaped like a parsed Twelve Data series (oldest first)"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, volatility, n_bars)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[price], close[:-1]])
+    spread = np.abs(rng.normal(0.0, volatility / 2, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+
+    return pd.DataFrame({
+        "time": pd.date_range(start, periods=n_bars, freq=interval),
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+    })
+
+def to_time_series_payload(df: pd.DataFrame, pair: str = "EUR/USD", interval: str = "15min") -> dict:
+    """Encode bars the way the time_series endpoint returns them: strings, newest first"""
+    values = [
+        {
+            "datetime": row.time.strftime("%Y-%m-%d %H:%M:%S"),
+            "open": f"{row.open:.5f}",
+            "high": f"{row.high:.5f}",
+            "low": f"{row.low:.5f}",
+            "close": f"{row.close:.5f}",
+        }
+        for row in df.iloc[::-1].itertuples(index=False)
+    ]
+    return {
+        "meta": {"symbol": pair, "interval": interval, "type": "Physical Currency"},
+        "values": values,
+        "status": "ok",
+    }
@@ -0,0 +1,221 @@
+"""Twelve Data credit accounting and circuit breaker shared by every fetcher.
+
+The signal backend, generate_training_data.py and the forecast service spend
+the same API key. Each call goes through a CreditGovernor first:
+
+  * credits spent per UTC minute and day are counted in a small SQLite file
+    (WAL, one IMMEDIATE transaction per reservation), so every process on the
+    host sees the same totals
+  * live serving may use the whole budget; batch jobs stop short of it by the
+    live reserve, and wait for the next minute instead of failing
+  * a quota response from the vendor opens the breaker until the quota resets;
+    `failure_threshold` consecutive errors open it for `cooldown_seconds`.
+    While it is open no request is sent, and fetchers serve the last good
+    series they hold (see LastGood) or fail fast
+
+Every process must run the same accounting code, so both apps import this
+module; it takes all settings as arguments.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+import pandas as pd
+
+LIVE = "live"
+BATCH = "batch"
+
+class UpstreamUnavailable(Exception):
+    """The upstream cannot be used now; `kind` is "circuit_open", "budget" or "quota" (safe as a metric label)"""
+
+    def __init__(self, reason: str, retry_after: float, kind: str = "circuit_open"):
+        super().__init__(f"Upstream unavailable ({reason}), retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.kind = kind
+
+def quota_retry_after(payload: dict, now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds until the quota resets if `payload` is Twelve Data's out-of-credits error, else None"""
+    if not isinstance(payload, dict) or payload.get("code") != 429:
+        return None
+    now = now or datetime.utcnow()
+    if "day" in str(payload.get("message", "")).lower():
+        return (datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds()
+    return 60 - now.second - now.microsecond / 1e6
+
+class CreditGovernor:
+    def __init__(self, path: str, per_minute: int, per_day: int, live_reserve_minute: int = 0,
+                 live_reserve_day: int = 0, failure_threshold: int = 3, cooldown_seconds: float = 60.0):
+        self.path = path
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.live_reserve_minute = live_reserve_minute
+        self.live_reserve_day = live_reserve_day
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with self._init_lock:
+                if not self._initialised:
+                    conn.execute("CREATE TABLE IF NOT EXISTS spend (window TEXT PRIMARY KEY, credits INTEGER NOT NULL)")
+                    conn.execute("CREATE TABLE IF NOT EXISTS breaker (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                                 "open_until REAL NOT NULL, reason TEXT, failures INTEGER NOT NULL)")
+                    conn.execute("INSERT OR IGNORE INTO breaker VALUES (1, 0, NULL, 0)")
+                    self._initialised = True
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _windows(now: datetime) -> Tuple[str, str]:
+        return f"m:{now:%Y-%m-%dT%H:%M}", f"d:{now:%Y-%m-%d}"
+
+    def try_acquire(self, credits: int = 1, priority: str = LIVE) -> float:
+        """Reserve `credits`; 0.0 when granted, else seconds until the budget allows it.
+        Raises UpstreamUnavailable while the breaker is open."""
+        conn = self._conn()
+        now = datetime.utcnow()
+        minute_key, day_key = self._windows(now)
+        minute_limit = self.per_minute - (0 if priority == LIVE else self.live_reserve_minute)
+        day_limit = self.per_day - (0 if priority == LIVE else self.live_reserve_day)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            open_until, reason = conn.execute("SELECT open_until, reason FROM breaker WHERE id = 1").fetchone()
+            if open_until > time.time():
+                raise UpstreamUnavailable(reason or "circuit open", open_until - time.time())
+            spent = dict(conn.execute("SELECT window, credits FROM spend WHERE window IN (?, ?)",
+                                      (minute_key, day_key)).fetchall())
+            if spent.get(day_key, 0) + credits > day_limit:
+                wait = (datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds()
+            elif spent.get(minute_key, 0) + credits > minute_limit:
+                wait = 60 - now.second - now.microsecond / 1e6
+            else:
+                wait = 0.0
+                conn.executemany(
+                    "INSERT INTO spend VALUES (?, ?) ON CONFLICT(window) DO UPDATE SET credits = credits + ?",
+                    [(minute_key, credits, credits), (day_key, credits, credits)],
+                )
+                if minute_key not in spent:
+                    # First call of a new minute: forget minute windows of earlier days
+                    conn.execute("DELETE FROM spend WHERE window LIKE 'm:%' AND window < ?", (f"m:{now:%Y-%m-%d}",))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, credits: int = 1, priority: str = LIVE, max_wait: float = 0.0) -> None:
+        """Reserve credits, sleeping up to `max_wait` seconds for the budget; raises UpstreamUnavailable"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire(credits, priority)
+            if wait == 0.0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise UpstreamUnavailable(f"{priority} credit budget spent", wait, "budget")
+            time.sleep(wait)
+
+    async def acquire_async(self, credits: int = 1, priority: str = LIVE, max_wait: float = 0.0) -> None:
+        """acquire() for event-loop callers; the SQLite reservation runs in the loop's default executor"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = await loop.run_in_executor(None, self.try_acquire, credits, priority)
+            if wait == 0.0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise UpstreamUnavailable(f"{priority} credit budget spent", wait, "budget")
+            await asyncio.sleep(wait)
+
+    def _open(self, seconds: float, reason: str) -> None:
+        self._conn().execute("UPDATE breaker SET open_until = MAX(open_until, ?), reason = ? WHERE id = 1",
+                             (time.time() + seconds, reason))
+
+    def record_response(self, payload: dict) -> None:
+        """Inspect a decoded vendor payload: open the breaker on a quota error, reset it on success.
+        Client errors (unknown symbol, bad interval) say nothing about upstream health."""
+        retry_after = quota_retry_after(payload)
+        if retry_after is not None:
+            self._open(retry_after, "credits exhausted")
+        elif "values" in payload or "data" in payload:
+            self.record_success()
+        elif int(payload.get("code") or 0) >= 500:
+            self.record_failure(str(payload.get("message", "error response")))
+
+    def record_success(self) -> None:
+        self._conn().execute("UPDATE breaker SET failures = 0 WHERE id = 1 AND failures != 0")
+
+    def record_failure(self, reason: str) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE breaker SET failures = failures + 1 WHERE id = 1")
+            failures = conn.execute("SELECT failures FROM breaker WHERE id = 1").fetchone()[0]
+            if failures >= self.failure_threshold:
+                # Stays at/above the threshold until a success, so one more failure after the
+                # cooldown reopens it at once (half-open)
+                conn.execute("UPDATE breaker SET open_until = MAX(open_until, ?), reason = ? WHERE id = 1",
+                             (time.time() + self.cooldown_seconds, f"upstream failing: {reason}"))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def status(self) -> dict:
+        conn = self._conn()
+        now = datetime.utcnow()
+        minute_key, day_key = self._windows(now)
+        spent = dict(conn.execute("SELECT window, credits FROM spend WHERE window IN (?, ?)",
+                                  (minute_key, day_key)).fetchall())
+        open_until, reason, failures = conn.execute(
+            "SELECT open_until, reason, failures FROM breaker WHERE id = 1").fetchone()
+        is_open = open_until > time.time()
+        return {
+            "minute": {"spent": spent.get(minute_key, 0), "limit": self.per_minute,
+                       "live_reserve": self.live_reserve_minute},
+            "day": {"spent": spent.get(day_key, 0), "limit": self.per_day, "live_reserve": self.live_reserve_day},
+            "breaker": {"open": is_open, "reason": reason if is_open else None,
+                        "retry_after": max(0.0, open_until - time.time()), "consecutive_failures": failures},
+        }
+
+class LastGood:
+    """Newest successfully fetched series per (pair, interval), served while the upstream is unavailable"""
+
+    def __init__(self, max_series: int = 64):
+        self.max_series = max_series
+        self._series: "OrderedDict[Tuple[str, str], pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, pair: str, interval: str, df: pd.DataFrame) -> None:
+        with self._lock:
+            key = (pair, interval)
+            previous = self._series.get(key)
+            # Keep the longer history when a short refresh arrives for the same series
+            if previous is None or len(df) >= len(previous) or df["time"].iloc[0] <= previous["time"].iloc[0]:
+                self._series[key] = df
+            else:
+                self._series[key] = pd.concat([previous[previous["time"] < df["time"].iloc[0]], df],
+                                              ignore_index=True)
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+
+    def recall(self, pair: str, interval: str, n: int) -> Optional[pd.DataFrame]:
+        with self._lock:
+            df = self._series.get((pair, interval))
+        return None if df is None else df.tail(n).reset_index(drop=True)
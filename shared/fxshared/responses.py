@@ -0,0 +1,42 @@
+"""JSON and MessagePack responses used by both apps' endpoints"""
+from datetime import date, datetime
+from typing import Any, Optional
+import msgpack
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+class FastJSONResponse(Response):
+    """orjson-encoded JSON that accepts NumPy arrays/scalars and writes NaN as null.
+
+    Endpoints return this directly so FastAPI skips its jsonable_encoder pass.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+class MsgPackResponse(Response):
+    """Compact binary alternative to JSON for bulk endpoints"""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+def negotiated_response(content: Any, request: Request, fmt: Optional[str] = None, status_code: int = 200) -> Response:
+    """MessagePack when asked for via ?format=msgpack or the Accept header, JSON otherwise"""
+    if fmt == "msgpack" or (fmt is None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")):
+        return MsgPackResponse(content, status_code=status_code)
+    return FastJSONResponse(content, status_code=status_code)